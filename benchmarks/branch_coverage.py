@@ -0,0 +1,79 @@
+"""Compare the running time of a workload with and without branch coverage probes."""
+
+import timeit
+
+from discover_test_coverage import instrumentation
+from discover_test_coverage import recorder
+from discover_test_coverage import transform
+
+# a workload with the kinds of branches that the transformer instruments
+WORKLOAD_SOURCE_CODE = """
+def classify(number):
+    if number % 15 == 0:
+        return "fizzbuzz"
+    elif number % 5 == 0:
+        return "buzz"
+    elif number % 3 == 0:
+        return "fizz"
+    return str(number)
+
+
+def total(numbers):
+    result = 0
+    for number in numbers:
+        result += number if number > 0 and number % 2 else 0
+    index = 0
+    while index < len(numbers):
+        index += 1
+    try:
+        result = result // len(numbers)
+    except ZeroDivisionError:
+        result = 0
+    return result
+
+
+def run():
+    for number in range(1000):
+        classify(number)
+    total(list(range(-50, 50)))
+"""
+
+# the number of times that the workload runs for each measurement
+REPEAT = 5
+NUMBER = 100
+
+
+def measure(instrumentation_types) -> float:
+    """Measure the fastest running time of the workload with instrumentation."""
+    source_code = WORKLOAD_SOURCE_CODE
+    if len(instrumentation_types) > 0:
+        source_code = transform.transform_source(source_code, instrumentation_types)
+    namespace = {"__name__": "workload"}
+    exec(compile(source_code, "workload.py", "exec"), namespace)
+    return min(timeit.repeat(namespace["run"], repeat=REPEAT, number=NUMBER))
+
+
+def main() -> None:
+    """Display the running time of the workload for each type of instrumentation."""
+    baseline = measure([])
+    print(f"uninstrumented: {baseline:.4f}s")
+    for instrumentation_types in (
+        [instrumentation.InstrumentationType.BRANCH],
+        [
+            instrumentation.InstrumentationType.FUNCTION,
+            instrumentation.InstrumentationType.BRANCH,
+        ],
+    ):
+        running_time = measure(instrumentation_types)
+        description = instrumentation.describe_instrumentation_types(
+            instrumentation_types
+        )
+        print(
+            f"{description}: {running_time:.4f}s "
+            f"({running_time / baseline:.2f}x the uninstrumented time)"
+        )
+        recorder.reset()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Flood the syslog server on localhost and measure the messages that it sustains."""
+
+import asyncio
+import multiprocessing
+import socket
+import tempfile
+import time
+from pathlib import Path
+from typing import Tuple
+
+from discover_test_coverage import server
+
+# the number of processes that send messages, like the workers of a parallel
+# test suite, the total rates at which they send, and how long they send for
+SENDERS = 4
+RATES = (10000, 20000, 40000, 80000, 160000)
+DURATION = 1.0
+
+# the senders pause after each burst of messages to keep to their rate
+BURST = 100
+
+# a message with the length of a typical line of debugging output
+MESSAGE = b"<15>discover-richlog: DEBUG Transformed the source code of a module"
+
+
+def flood(address: Tuple[str, int], rate: float) -> None:
+    """Send messages to the syslog server at a rate for the duration of a measurement."""
+    count = int(rate * DURATION)
+    start_time = time.perf_counter()
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client_socket:
+        for sent in range(0, count, BURST):
+            for _ in range(min(BURST, count - sent)):
+                client_socket.sendto(MESSAGE, address)
+            delay = start_time + (sent + BURST) / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+
+async def measure(log_file: Path, rate: int) -> bool:
+    """Flood the syslog server from several processes and display its throughput."""
+    syslog_server = server.SyslogServer(log_file, display=False)
+    address = await syslog_server.start(port=0)
+    senders = [
+        multiprocessing.Process(target=flood, args=(address, rate / SENDERS))
+        for _ in range(SENDERS)
+    ]
+    start_time = time.perf_counter()
+    for sender in senders:
+        sender.start()
+    # wait for the senders without blocking the event loop of the server
+    while any(sender.is_alive() for sender in senders):
+        await asyncio.sleep(0.01)
+    await syslog_server.stop()
+    elapsed = time.perf_counter() - start_time
+    counters = syslog_server.counters
+    sent = SENDERS * int(rate / SENDERS * DURATION)
+    lost = sent - counters.received
+    print(
+        f"offered {rate:>7}/s: {counters.written / elapsed:>8.0f} written/s, "
+        f"{counters.dropped} dropped from the queue, {lost} lost in the kernel"
+    )
+    return counters.dropped == 0 and lost == 0
+
+
+def main() -> None:
+    """Display the throughput at each rate and the highest rate without any losses."""
+    sustained = 0
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        log_file = Path(temporary_directory) / server.LOG_FILE
+        for rate in RATES:
+            if asyncio.run(measure(log_file, rate)):
+                sustained = rate
+    print(f"sustained: {sustained} messages/s without any losses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Pack and unpack sequences of flags and positions as compact bitsets."""
+
+from typing import Iterable
+from typing import List
+
+from discover_test_coverage import constants
+
+
+def pack(flags: Iterable) -> bytes:
+    """Pack truthy and falsy flags into a bitset, storing the first flag in the lowest bit."""
+    flags = list(flags)
+    # build the bits as a binary number whose lowest bit is the first flag
+    bit_string = constants.markers.Nothing.join(
+        constants.bitset.One if flag else constants.bitset.Zero
+        for flag in reversed(flags)
+    )
+    number = int(bit_string or constants.bitset.Zero, 2)
+    return number.to_bytes(size(len(flags)), constants.bitset.Byte_Order)
+
+
+def unpack(data: bytes, length: int) -> List[bool]:
+    """Unpack a bitset into the specified number of flags."""
+    number = int.from_bytes(data, constants.bitset.Byte_Order)
+    return [bool(number >> position & 1) for position in range(length)]
+
+
+def size(length: int) -> int:
+    """Compute the number of bytes in a bitset with the specified number of flags."""
+    return (
+        length + constants.bitset.Bits_Per_Byte - 1
+    ) // constants.bitset.Bits_Per_Byte
+
+
+def count(data: bytes) -> int:
+    """Count the number of flags that are set in a bitset."""
+    return bin(int.from_bytes(data, constants.bitset.Byte_Order)).count(
+        constants.bitset.One
+    )
+
+
+def write_varint(output: bytearray, number: int) -> None:
+    """Write a non-negative integer with seven bits in each byte, lowest bits first."""
+    while number >= constants.bitset.Varint_Continue:
+        output.append(
+            number & constants.bitset.Varint_Mask | constants.bitset.Varint_Continue
+        )
+        number >>= constants.bitset.Varint_Shift
+    output.append(number)
+
+
+def encode_positions(positions: Iterable[int]) -> bytes:
+    """Compress sorted positions into runs that each store a gap and a length as varints."""
+    # the size of the encoding grows with the number of runs of consecutive
+    # positions, and thus with the number of hits, instead of with the number
+    # of probes, which keeps sparse hits small no matter how many probes exist
+    output = bytearray()
+    run_start = run_end = previous_end = 0
+    in_run = False
+    for position in positions:
+        if in_run and position == run_end:
+            run_end += 1
+            continue
+        if in_run:
+            write_varint(output, run_start - previous_end)
+            write_varint(output, run_end - run_start)
+            previous_end = run_end
+        run_start, run_end, in_run = position, position + 1, True
+    if in_run:
+        write_varint(output, run_start - previous_end)
+        write_varint(output, run_end - run_start)
+    return bytes(output)
+
+
+def decode_positions(data: bytes) -> List[int]:
+    """Decompress the runs of positions that encode_positions created."""
+    numbers = []
+    number = shift = 0
+    for byte in data:
+        number |= (byte & constants.bitset.Varint_Mask) << shift
+        if byte & constants.bitset.Varint_Continue:
+            shift += constants.bitset.Varint_Shift
+            continue
+        numbers.append(number)
+        number = shift = 0
+    positions: List[int] = []
+    previous_end = 0
+    for index in range(0, len(numbers) - 1, 2):
+        run_start = previous_end + numbers[index]
+        previous_end = run_start + numbers[index + 1]
+        positions.extend(range(run_start, previous_end))
+    return positions
@@ -0,0 +1,161 @@
+"""Cache the compiled code of instrumented modules in the format of .pyc files."""
+
+import hashlib
+import importlib.util
+import marshal
+import os
+from pathlib import Path
+from types import CodeType
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from discover_test_coverage import constants
+from discover_test_coverage import instrumentation
+from discover_test_coverage import manifest
+from discover_test_coverage import output
+
+
+class BytecodeCache:
+    """Store the compiled code of instrumented modules, evicting the least recently used."""
+
+    def __init__(self, cache_directory: Path, maximum_size: int):
+        """Construct a BytecodeCache in a directory with a maximum size in bytes."""
+        self.cache_directory = Path(cache_directory)
+        self.maximum_size = maximum_size
+        # compute the version of the transformers once since the cached code
+        # is only valid for the transformers that created the instrumentation
+        self.transformer_version = manifest.compute_transformer_version()
+        # the total size of the cached code, which is measured once and then
+        # tracked as code is stored so that storing never scans the cache
+        self.total_size: Optional[int] = None
+
+    def compute_key(
+        self,
+        source_bytes: bytes,
+        instrumentation_types: Sequence[instrumentation.InstrumentationType],
+        source_path: str,
+        module_name: str,
+    ) -> str:
+        """Compute the key of the cached code for a module's source code and instrumentation."""
+        # the key changes when the source code, the types of instrumentation,
+        # the transformers, or the version of the bytecode format change; note
+        # that identical modules (e.g., empty __init__.py files) do not share
+        # code since the code records its file and the instrumentation its module
+        key_hash = hashlib.new(constants.manifest.Hash_Algorithm, source_bytes)
+        for key_part in (
+            source_path,
+            module_name,
+            instrumentation.describe_instrumentation_types(instrumentation_types),
+            self.transformer_version,
+            importlib.util.MAGIC_NUMBER.hex(),
+        ):
+            key_hash.update(constants.markers.Pipe.encode())
+            key_hash.update(key_part.encode())
+        return key_hash.hexdigest()
+
+    def get_cached_file(self, key: str) -> Path:
+        """Get the path of the file that stores the cached code for a key."""
+        return self.cache_directory / (key + constants.bytecode.Suffix)
+
+    def load(self, key: str, source_bytes: bytes) -> Optional[CodeType]:
+        """Load the cached code for a key, returning None when it is not available."""
+        cached_file = self.get_cached_file(key)
+        try:
+            data = cached_file.read_bytes()
+        except OSError:
+            return None
+        # the header of a hash-based .pyc file contains the magic number, the
+        # flags, and the hash of the source code; a file with a different header
+        # was written by another version of Python or it was not fully written
+        header = (
+            importlib.util.MAGIC_NUMBER
+            + constants.bytecode.Hash_Flags.to_bytes(4, "little")
+            + importlib.util.source_hash(source_bytes)
+        )
+        header_length = len(header)
+        if data[:header_length] != header:
+            return None
+        try:
+            code = marshal.loads(data[header_length:])
+        except (EOFError, ValueError, TypeError):
+            return None
+        # mark the cached code as recently used so that it is evicted last
+        os.utime(cached_file)
+        return code
+
+    def store(self, key: str, source_bytes: bytes, code: CodeType) -> None:
+        """Store the compiled code for a key, evicting old code when the cache is full."""
+        if self.maximum_size <= 0:
+            return
+        self.cache_directory.mkdir(parents=True, exist_ok=True)
+        cached_file = self.get_cached_file(key)
+        # write the code to a temporary file and then replace the cached file
+        # so that concurrent test processes never read a partially written file
+        temporary_cached_file = cached_file.with_suffix(
+            constants.manifest.Temporary + str(os.getpid())
+        )
+        data = (
+            importlib.util.MAGIC_NUMBER
+            + constants.bytecode.Hash_Flags.to_bytes(4, "little")
+            + importlib.util.source_hash(source_bytes)
+            + marshal.dumps(code)
+        )
+        try:
+            try:
+                replaced_size = cached_file.stat().st_size
+            except FileNotFoundError:
+                replaced_size = 0
+            temporary_cached_file.write_bytes(data)
+            os.replace(temporary_cached_file, cached_file)
+        # a cache that cannot be written only makes the next run slower
+        except OSError:
+            output.logger.debug(f"Could not cache the code in: {cached_file}")
+            temporary_cached_file.unlink(missing_ok=True)
+            return
+        if self.total_size is None:
+            self.total_size = self.scan()[1]
+        else:
+            self.total_size += len(data) - replaced_size
+        # the cache is only scanned again once the tracked size is too large,
+        # which also corrects the size for the code that other processes stored
+        if self.total_size > self.maximum_size:
+            self.evict()
+
+    def scan(self) -> Tuple[List[Tuple[float, str]], int]:
+        """Scan the cache for the time each file was last used and for its total size."""
+        cached_files = []
+        total_size = 0
+        with os.scandir(self.cache_directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(constants.bytecode.Suffix):
+                    stat_result = entry.stat()
+                    cached_files.append((stat_result.st_mtime, entry.path))
+                    total_size += stat_result.st_size
+        return cached_files, total_size
+
+    def evict(self) -> int:
+        """Delete the least recently used code until the cache fits in its maximum size."""
+        cached_files, total_size = self.scan()
+        self.total_size = total_size
+        # the cache already fits and thus there is no need to sort the files
+        if total_size <= self.maximum_size:
+            return 0
+        # evict below the maximum size so that the next few stores do not
+        # immediately scan the cache and evict another file again
+        target_size = self.maximum_size * constants.bytecode.Evict_Fraction
+        evicted_file_count = 0
+        for _, cached_file_path in sorted(cached_files):
+            if total_size <= target_size:
+                break
+            try:
+                total_size -= os.stat(cached_file_path).st_size
+                os.unlink(cached_file_path)
+                evicted_file_count += 1
+            # another test process already evicted the same file
+            except FileNotFoundError:
+                continue
+        self.total_size = total_size
+        output.logger.debug(f"Evicted {evicted_file_count} files from the cache")
+        return evicted_file_count
@@ -0,0 +1,737 @@
+"""Disable the program's code, one unit at a time, and run the test suite against it."""
+
+import json
+import os
+import queue
+import subprocess
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from enum import Enum
+from pathlib import Path
+from pathlib import PurePosixPath
+from shutil import rmtree
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+import libcst as cst
+from rich.progress import Progress
+
+from discover_test_coverage import constants
+from discover_test_coverage import file
+from discover_test_coverage import forkclient
+from discover_test_coverage import impact
+from discover_test_coverage import instrumentation
+from discover_test_coverage import journal
+from discover_test_coverage import manifest
+from discover_test_coverage import output
+from discover_test_coverage import run
+from discover_test_coverage import selection
+from discover_test_coverage import store
+from discover_test_coverage import timing
+from discover_test_coverage.transformers import disablefunction
+
+# define the type of a point at which the program's code can be disabled, which
+# is the path of a module relative to the project directory, the canonical name
+# of a function, and the number of earlier functions in the module with that name
+DisablePointType = Tuple[str, str, int]
+
+# define the type of the result of running the test suite against a disabled
+# point, which is the point, the outcome, the number of seconds it took, and
+# the number of tests that ran, or None when the whole test suite ran
+CampaignResultType = Tuple[DisablePointType, "Outcome", float, Optional[int]]
+
+# define the type of the tests that cover each point, which are the node
+# identifiers of the tests or None when any of the tests could cover it
+CoveringTestsType = Dict[DisablePointType, Optional[List[str]]]
+
+
+class Outcome(str, Enum):
+    """The outcomes of running the test suite against a program with disabled code."""
+
+    DETECTED = "detected"
+    UNDETECTED = "undetected"
+    TIMEOUT = "timeout"
+    ERRORED = "errored"
+
+
+def describe_point(point: DisablePointType) -> str:
+    """Describe a disable point with a single string that identifies it."""
+    return constants.campaign.Point_Id.format(*point)
+
+
+def find_disable_points(
+    project_directory: Path, program_directory: Path
+) -> List[DisablePointType]:
+    """Find the functions of the program that can be disabled, in a stable order."""
+    disable_points = []
+    for program_file in file.find_python_files(project_directory / program_directory):
+        try:
+            source_tree = cst.parse_module(program_file.read_text())
+        except (cst.ParserSyntaxError, UnicodeDecodeError):
+            output.logger.debug(f"Skipping the unparsable module: {program_file}")
+            continue
+        relative_path = program_file.relative_to(project_directory).as_posix()
+        for function_name, occurrence in disablefunction.find_functions(source_tree):
+            disable_points.append((relative_path, function_name, occurrence))
+    return disable_points
+
+
+def disable_source(
+    source_text: str, function_name: str, occurrence: int
+) -> Optional[str]:
+    """Disable a function in source code, returning None when it cannot be found."""
+    source_tree = cst.parse_module(source_text)
+    transformer = disablefunction.DisableFunctionTransformer(
+        source_tree.config_for_parsing, function_name, occurrence
+    )
+    modified_tree = source_tree.visit(transformer)
+    if not transformer.disabled:
+        return None
+    return modified_tree.code
+
+
+def get_unit_name(point: DisablePointType, program_directory: Path) -> str:
+    """Get the name of the unit that disables a point in a program with the schema."""
+    # the program is imported from the directory that contains it and
+    # thus the name of each module starts with the name of the program
+    relative_path = Path(point[0]).relative_to(program_directory.parent).as_posix()
+    module_name = constants.markers.Dot.join(
+        impact.get_module_name_parts(relative_path)
+    )
+    return constants.campaign.Point_Id.format(module_name, point[1], point[2])
+
+
+def find_schema_files(
+    project_directory: Path, program_directory: Path
+) -> List[Tuple[Path, Path]]:
+    """Find the file that instrument-program created with the schema for each program file."""
+    fully_qualified_program_directory = project_directory / program_directory
+    hidden_program_directory = file.get_hidden_directory(
+        project_directory, fully_qualified_program_directory
+    )
+    program_manifest = manifest.load_manifest(hidden_program_directory)
+    schema_files = []
+    for program_file in file.find_python_files(fully_qualified_program_directory):
+        hidden_file = file.get_hidden_file(
+            hidden_program_directory, fully_qualified_program_directory, program_file
+        )
+        entry = manifest.find_current_entry(
+            program_manifest,
+            hidden_program_directory,
+            str(hidden_file.relative_to(hidden_program_directory)),
+        )
+        # every variant runs against the same instrumented files and thus each
+        # of them must have the schema and match the current program file
+        if (
+            instrumentation.InstrumentationType.SCHEMA.value
+            not in entry.get("kind", constants.markers.Nothing).split(
+                constants.markers.Plus
+            )
+            or entry.get("source_hash") != manifest.hash_file_contents(program_file)
+            or not hidden_file.exists()
+        ):
+            raise ValueError(
+                f"There is no current schema instrumentation for {program_file}; "
+                "run instrument-program with --instrumentation-type schema"
+            )
+        schema_files.append((hidden_file, program_file.relative_to(project_directory)))
+    return schema_files
+
+
+def get_exclude_patterns(
+    project_directory: Path, discover_dir: Path
+) -> Tuple[str, ...]:
+    """Get the patterns of the files in the project that are not part of a workspace."""
+    # never mirror the workspaces into themselves when the
+    # discover directory is inside of the project directory
+    exclude_patterns = constants.wildcards.Excluded
+    try:
+        exclude_patterns = exclude_patterns + (
+            discover_dir.resolve().relative_to(project_directory.resolve()).as_posix(),
+        )
+    except ValueError:
+        pass
+    return exclude_patterns
+
+
+def create_workspace(
+    project_directory: Path,
+    workspace_directory: Path,
+    program_directory: Path,
+    discover_dir: Path,
+) -> None:
+    """Create an isolated workspace that mirrors the project, linking its program's modules."""
+    if workspace_directory.exists():
+        rmtree(workspace_directory)
+    exclude_patterns = get_exclude_patterns(project_directory, discover_dir)
+    program_files = set(file.find_python_files(project_directory / program_directory))
+    # each module of the program in the workspace is a link to the module in the
+    # project so that creating a workspace is inexpensive; note that a disabled
+    # module is always written with write_file_replacing and thus never changes
+    # the project's module, while every other file (e.g., a test or a data
+    # file) is a clone or a copy since the tests can write to those files
+    for project_file in file.walk_files(
+        project_directory, (constants.wildcards.All_Files,), exclude_patterns
+    ):
+        workspace_file = workspace_directory / project_file.relative_to(
+            project_directory
+        )
+        if project_file in program_files:
+            file.link_or_copy_file(project_file, workspace_file)
+        else:
+            file.clone_or_copy_file(project_file, workspace_file)
+    # the virtual environment is not mirrored and thus a test run command like
+    # ".venv/bin/pytest" runs the project's environment through a symbolic link
+    for environment_name in constants.campaign.Environment_Directories:
+        if (project_directory / environment_name).is_dir():
+            (workspace_directory / environment_name).symlink_to(
+                (project_directory / environment_name).resolve()
+            )
+
+
+def install_schema_files(
+    workspace_directory: Path, schema_files: List[Tuple[Path, Path]]
+) -> None:
+    """Replace the program files of a workspace with the files that have the schema."""
+    for hidden_file, relative_path in schema_files:
+        file.link_or_copy_file(hidden_file, workspace_directory / relative_path)
+
+
+def create_environment(
+    workspace_directory: Path,
+    program_directory: Path,
+    disabled_unit: Optional[str] = None,
+) -> Dict[str, str]:
+    """Create the environment in which the tests run against the program in a workspace."""
+    environment = dict(os.environ)
+    # the tests do not collect coverage while running against disabled code
+    environment.pop(constants.importhook.Configuration_Variable, None)
+    # a program with the schema disables the function of the unit, if any,
+    # and otherwise runs exactly like the original program
+    environment.pop(constants.schema.Disabled_Variable, None)
+    if disabled_unit is not None:
+        environment[constants.schema.Disabled_Variable] = disabled_unit
+    # import the program from the workspace even when the project is installed in
+    # its environment (e.g., as an editable package) and never write the bytecode,
+    # since the disabled and the original module can have the same size and time
+    source_directory = str((workspace_directory / program_directory).parent)
+    environment[constants.campaign.Path_Variable] = os.pathsep.join(
+        [source_directory]
+        + (
+            [environment[constants.campaign.Path_Variable]]
+            if constants.campaign.Path_Variable in environment
+            else []
+        )
+    )
+    environment[constants.campaign.Bytecode_Variable] = constants.bitset.One
+    return environment
+
+
+def run_test_command(
+    test_run_command: str,
+    workspace_directory: Path,
+    environment: Mapping[str, str],
+    timeout: Optional[float],
+) -> Tuple[Optional[int], float]:
+    """Run the tests in a workspace, returning the exit code or None when they time out."""
+    start_time = time.perf_counter()
+    return_code = run.run_process_group(
+        test_run_command,
+        timeout,
+        cwd=workspace_directory,
+        env=dict(environment),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return return_code, time.perf_counter() - start_time
+
+
+def classify_exit_code(return_code: Optional[int]) -> Outcome:
+    """Classify the exit code of a test run against disabled code."""
+    if return_code is None:
+        return Outcome.TIMEOUT
+    # the test suite passed even though the code was disabled
+    if return_code == constants.campaign.Exit_Code_Passed:
+        return Outcome.UNDETECTED
+    # at least one of the tests failed because the code was disabled
+    if return_code == constants.campaign.Exit_Code_Failed:
+        return Outcome.DETECTED
+    # the test suite could not run (e.g., it did not collect any tests)
+    return Outcome.ERRORED
+
+
+def find_original_test_file(project_directory: Path, relative_path: str) -> str:
+    """Find the original test file of an instrumented test file in a hidden directory."""
+    # the hidden mode runs the instrumented tests from a hidden directory at the
+    # top of the project, which is never mirrored into a workspace, and thus
+    # its node identifiers must refer to the original tests to run them there
+    original_path = impact.get_test_file(relative_path)
+    if original_path == PurePosixPath(relative_path):
+        return relative_path
+    if (project_directory / original_path).is_file():
+        return original_path.as_posix()
+    # the test directory is inside of another directory (e.g., "src/tests")
+    # while its hidden directory is always at the top of the project
+    for project_file in file.walk_files(project_directory, (original_path.name,)):
+        project_path = project_file.relative_to(project_directory).as_posix()
+        if project_path.endswith(
+            constants.markers.Forward_Slash + original_path.as_posix()
+        ):
+            return project_path
+    return relative_path
+
+
+def find_covering_tests(
+    coverage_store: store.CoverageStore,
+    points: List[DisablePointType],
+    project_directory: Path,
+) -> CoveringTestsType:
+    """Find the tests that called the function of each point in their latest coverage."""
+    covering_tests: CoveringTestsType = {point: [] for point in points}
+    # find the recorded modules that each of the program's files could be
+    module_names = coverage_store.list_files()
+    module_points: Dict[str, List[DisablePointType]] = {}
+    for point in points:
+        for module_name in impact.match_module_names(point[0], module_names):
+            module_points.setdefault(module_name, []).append(point)
+    # the original test file of each file of the recorded tests
+    test_files: Dict[str, str] = {}
+    for (
+        context_name,
+        module_name,
+        kind,
+        probe_names,
+    ) in coverage_store.iterate_latest_context_hits(list(module_points)):
+        # the name of a branch arm starts with the name of its function
+        if kind == constants.store.Kind_Branch:
+            probe_names = [
+                probe_name.split(constants.markers.Colon)[0]
+                for probe_name in probe_names
+            ]
+        hit_function_names = set(probe_names)
+        relative_path, separator, test_name = context_name.partition(
+            constants.impact.Node_Separator
+        )
+        if relative_path not in test_files:
+            test_files[relative_path] = find_original_test_file(
+                project_directory, relative_path
+            )
+        test_id = test_files[relative_path] + separator + test_name
+        for point in module_points[module_name]:
+            point_tests = covering_tests[point]
+            if point[1] not in hit_function_names or point_tests is None:
+                continue
+            # the function ran outside of the test cases (e.g., while the
+            # modules were imported) and thus any of the tests could detect it
+            if context_name == constants.store.Unattributed_Context:
+                covering_tests[point] = None
+            elif test_id not in point_tests:
+                point_tests.append(test_id)
+    return covering_tests
+
+
+def run_disabled_point(
+    point: DisablePointType,
+    project_directory: Path,
+    workspace_directory: Path,
+    program_directory: Path,
+    test_run_command: str,
+    timeout: Optional[float],
+    test_ids: Optional[List[str]] = None,
+    use_schema: bool = False,
+    fork_client: Optional[forkclient.ForkClient] = None,
+    timings_file: Optional[Path] = None,
+) -> CampaignResultType:
+    """Run the test suite in a workspace while a point of the program is disabled."""
+    # none of the tests call the disabled function and thus
+    # none of them could detect it, without running any of them
+    if test_ids is not None and len(test_ids) == 0:
+        return point, Outcome.UNDETECTED, 0.0, 0
+    # only run the tests that call the disabled function, when they are known,
+    # which the plugin selects from a file instead of the command line, and
+    # stop each test that runs much longer than it did in the baseline run
+    if test_ids is not None or timings_file is not None:
+        test_run_command = (
+            test_run_command + constants.markers.Space + constants.importhook.Plugin
+        )
+    timeout_environment = timing.create_timeout_environment(timings_file, False)
+    test_count = len(test_ids) if test_ids is not None else None
+    with selection.TestSelection(test_ids) as test_selection:
+        # the workspace already has the program with the schema and thus
+        # the environment selects the disabled function without writing a file
+        if use_schema:
+            unit = get_unit_name(point, program_directory)
+            # run the tests in a forked copy of the test session that the fork
+            # server already collected, falling back to a new test run when the
+            # fork server stopped (e.g., because a test broke its pipes); note
+            # that a failed fork server is stopped so that the later points in
+            # its workspace run the tests without first retrying its pipes
+            if fork_client is not None and not fork_client.stopped:
+                try:
+                    return_code, duration = fork_client.run(unit, test_ids, timeout)
+                    return point, classify_exit_code(return_code), duration, test_count
+                except (OSError, ValueError) as error:
+                    fork_client.close()
+                    output.console.print(
+                        f":person_shrugging: The fork server in {workspace_directory} "
+                        f"stopped while running {unit} ({error}) and thus the tests "
+                        "in this workspace run without it"
+                    )
+            return_code, duration = run_test_command(
+                test_run_command,
+                workspace_directory,
+                {
+                    **create_environment(workspace_directory, program_directory, unit),
+                    **timeout_environment,
+                    **test_selection.environment,
+                },
+                timeout,
+            )
+            return point, classify_exit_code(return_code), duration, test_count
+        relative_path, function_name, occurrence = point
+        project_file = project_directory / relative_path
+        workspace_file = workspace_directory / relative_path
+        disabled_source_text = disable_source(
+            project_file.read_text(), function_name, occurrence
+        )
+        if disabled_source_text is None:
+            return point, Outcome.ERRORED, 0.0, test_count
+        file.write_file_replacing(workspace_file, disabled_source_text)
+        # always put the original module back so that the workspace
+        # is ready for the next point, even when the test run crashes
+        try:
+            return_code, duration = run_test_command(
+                test_run_command,
+                workspace_directory,
+                {
+                    **create_environment(workspace_directory, program_directory),
+                    **timeout_environment,
+                    **test_selection.environment,
+                },
+                timeout,
+            )
+        finally:
+            file.link_or_copy_file(project_file, workspace_file)
+    return point, classify_exit_code(return_code), duration, test_count
+
+
+def run_points_in_workspaces(
+    points: List[DisablePointType],
+    project_directory: Path,
+    workspace_directories: List[Path],
+    program_directory: Path,
+    test_run_command: str,
+    timeout: Optional[float],
+    covering_tests: Optional[CoveringTestsType] = None,
+    use_schema: bool = False,
+    use_fork_server: bool = False,
+    timings_file: Optional[Path] = None,
+) -> Iterator[CampaignResultType]:
+    """Run the points in a pool of workspaces, yielding each result once it finishes."""
+    # each worker borrows a workspace for a single point and then returns it,
+    # which guarantees that two points never run in the same workspace at once
+    available_workspaces: "queue.Queue[Path]" = queue.Queue()
+    for workspace_directory in workspace_directories:
+        available_workspaces.put(workspace_directory)
+    # each workspace has its own fork server that imports the program and
+    # collects the tests once, instead of once for every disabled point
+    fork_clients: Dict[Path, forkclient.ForkClient] = {}
+    if use_fork_server:
+        for workspace_directory in workspace_directories:
+            fork_clients[workspace_directory] = forkclient.ForkClient(
+                test_run_command
+                + constants.markers.Space
+                + constants.importhook.Plugin,
+                workspace_directory,
+                {
+                    **create_environment(workspace_directory, program_directory),
+                    **timing.create_timeout_environment(timings_file, False),
+                },
+            )
+    # the timeout of each point comes from the baseline durations of the tests
+    # that it runs, unless the campaign has a timeout for all of the points
+    timings = timing.load_timings(timings_file) if timings_file is not None else {}
+
+    def run_point(point: DisablePointType) -> CampaignResultType:
+        """Run a point in the next available workspace."""
+        test_ids = covering_tests[point] if covering_tests is not None else None
+        workspace_directory = available_workspaces.get()
+        try:
+            return run_disabled_point(
+                point,
+                project_directory,
+                workspace_directory,
+                program_directory,
+                test_run_command,
+                (
+                    timeout
+                    if timeout is not None
+                    else timing.compute_run_timeout(timings, test_ids)
+                ),
+                test_ids,
+                use_schema,
+                fork_clients.get(workspace_directory),
+                timings_file,
+            )
+        finally:
+            available_workspaces.put(workspace_directory)
+
+    # the work happens in the processes that run the test suite and thus a thread
+    # per workspace is enough to keep all of them busy; bound the points in
+    # flight so that the pending results for a large program do not use memory
+    maximum_in_flight = (
+        len(workspace_directories) * constants.parallel.In_Flight_Per_Job
+    )
+    pending_points: Set[Future] = set()
+    try:
+        with ThreadPoolExecutor(max_workers=len(workspace_directories)) as executor:
+            for point in points:
+                if len(pending_points) >= maximum_in_flight:
+                    finished_points, pending_points = wait(
+                        pending_points, return_when=FIRST_COMPLETED
+                    )
+                    for finished_point in finished_points:
+                        yield finished_point.result()
+                pending_points.add(executor.submit(run_point, point))
+            for finished_point in wait(pending_points).done:
+                yield finished_point.result()
+    finally:
+        for fork_client in fork_clients.values():
+            fork_client.close()
+
+
+def count_saved_executions(
+    results: List[CampaignResultType], test_count: Optional[int]
+) -> int:
+    """Count the test executions that running only the covering tests avoided."""
+    if test_count is None:
+        return 0
+    return sum(
+        test_count - executed_test_count
+        for _, _, _, executed_test_count in results
+        if executed_test_count is not None
+    )
+
+
+def save_campaign_report(
+    report_file: Path, results: List[CampaignResultType], test_count: Optional[int]
+) -> None:
+    """Save the results of a campaign as a JSON report."""
+    report_file.parent.mkdir(parents=True, exist_ok=True)
+    report_file.write_text(
+        json.dumps(
+            {
+                "test_count": test_count,
+                "saved_test_executions": count_saved_executions(results, test_count),
+                "points": [
+                    {
+                        "point": describe_point(point),
+                        "module": point[0],
+                        "function": point[1],
+                        "occurrence": point[2],
+                        "outcome": outcome.value,
+                        "duration": round(duration, 3),
+                        "executed_tests": executed_test_count,
+                    }
+                    for point, outcome, duration, executed_test_count in sorted(results)
+                ],
+            },
+            indent=2,
+        )
+    )
+
+
+def summarize_outcomes(results: List[CampaignResultType]) -> Dict[Outcome, int]:
+    """Count the number of points with each of the outcomes."""
+    outcome_counts = {outcome: 0 for outcome in Outcome}
+    for _, outcome, _, _ in results:
+        outcome_counts[outcome] += 1
+    return outcome_counts
+
+
+def run_remaining_points(
+    points: List[DisablePointType],
+    project_directory: Path,
+    program_directory: Path,
+    discover_dir: Path,
+    test_run_command: str,
+    jobs: int,
+    timeout: Optional[float],
+    covering_tests: Optional[CoveringTestsType],
+    schema_files: List[Tuple[Path, Path]],
+    use_schema: bool,
+    use_fork_server: bool,
+) -> Iterator[CampaignResultType]:
+    """Run the points in new workspaces, after checking the test suite, yielding each result."""
+    # create one isolated workspace for each of the concurrent test runs
+    campaign_directory = discover_dir / constants.campaign.Directory
+    workspace_directories = [
+        campaign_directory / constants.campaign.Workspace.format(index)
+        for index in range(max(1, min(jobs, len(points))))
+    ]
+    for workspace_directory in workspace_directories:
+        create_workspace(
+            project_directory, workspace_directory, program_directory, discover_dir
+        )
+        install_schema_files(workspace_directory, schema_files)
+    # the test suite must pass against the original program since otherwise
+    # every disabled point would look like it was detected by the tests; note
+    # that the plugin records the duration of each test in this baseline run,
+    # from which the timeouts of the tests and of the runs of the points derive
+    timings_file = discover_dir / constants.timing.File
+    return_code, _ = run_test_command(
+        test_run_command + constants.markers.Space + constants.importhook.Plugin,
+        workspace_directories[0],
+        {
+            **create_environment(workspace_directories[0], program_directory),
+            **timing.create_timeout_environment(timings_file, True),
+        },
+        timing.compute_run_timeout(timing.load_timings(timings_file)),
+    )
+    if return_code != constants.campaign.Exit_Code_Passed:
+        raise ValueError(
+            f"The test suite must pass before disabling code but it exited with {return_code}"
+        )
+    output.logger.debug(
+        f"Running each disabled point with the timings in {timings_file}"
+    )
+    with Progress() as progress:
+        task = progress.add_task(
+            f":sparkles: Disable functions in {len(workspace_directories)} workspaces",
+            total=len(points),
+        )
+        for result in run_points_in_workspaces(
+            points,
+            project_directory,
+            workspace_directories,
+            program_directory,
+            test_run_command,
+            timeout,
+            covering_tests,
+            use_schema,
+            use_fork_server,
+            timings_file,
+        ):
+            point, outcome, _, _ = result
+            progress.console.print(f"{describe_point(point)}: {outcome.value}")
+            progress.advance(task)
+            yield result
+
+
+def run_campaign(
+    project_directory: Path,
+    program_directory: Path,
+    discover_dir: Path,
+    test_run_command: str,
+    jobs: int,
+    timeout: Optional[float] = None,
+    select_covering_tests: bool = False,
+    use_schema: bool = False,
+    use_fork_server: bool = False,
+    resume: bool = False,
+) -> Tuple[List[CampaignResultType], Optional[int]]:
+    """Disable each point of the program and run the test suite against it, in parallel."""
+    # a forked copy of a test session can only disable a point in its memory
+    if use_fork_server and not use_schema:
+        raise ValueError("The fork server needs the program with the schema")
+    if use_fork_server and not forkclient.is_available():
+        output.console.print(
+            ":person_shrugging: Run the tests in new processes since forking is not available"
+        )
+        use_fork_server = False
+    project_directory = project_directory.resolve()
+    points = find_disable_points(project_directory, program_directory)
+    output.console.print(f":sparkles: Found {len(points)} functions to disable")
+    if len(points) == 0:
+        return [], None
+    # a single program with the schema, which instrument-program created,
+    # serves every point instead of writing a disabled module for each one
+    schema_files = (
+        find_schema_files(project_directory, program_directory) if use_schema else []
+    )
+    # find the tests that called each of the functions in the coverage that
+    # test-coverage recorded, since only they could detect the disabled function
+    covering_tests = None
+    test_count = None
+    if select_covering_tests:
+        store_file = discover_dir / constants.store.File
+        if not store_file.exists():
+            raise ValueError(f"There is no coverage in {store_file} to select tests")
+        with store.CoverageStore(store_file) as coverage_store:
+            covering_tests = find_covering_tests(
+                coverage_store, points, project_directory
+            )
+            test_count = len(coverage_store.list_context_names())
+    # the journal records each point once its test run finishes so that a
+    # campaign that was stopped (e.g., because its machine was preempted) can
+    # resume, skipping the points whose project files and settings did not change
+    project_hash = journal.hash_project(
+        project_directory, get_exclude_patterns(project_directory, discover_dir)
+    )
+    input_hashes = {
+        point: journal.hash_inputs(
+            project_hash,
+            describe_point(point),
+            test_run_command,
+            timeout,
+            use_schema,
+            covering_tests[point] if covering_tests is not None else None,
+        )
+        for point in points
+    }
+    with journal.Journal(
+        discover_dir / constants.journal.File, resume
+    ) as campaign_journal:
+        results: List[CampaignResultType] = []
+        remaining_points = []
+        for point in points:
+            entry = campaign_journal.find_completed(
+                describe_point(point), input_hashes[point]
+            )
+            if entry is None:
+                remaining_points.append(point)
+            else:
+                results.append(
+                    (
+                        point,
+                        Outcome(entry[constants.journal.Outcome_Key]),
+                        entry["duration"],
+                        entry["executed_tests"],
+                    )
+                )
+        if resume:
+            output.console.print(
+                f":sparkles: Resumed {len(results)} functions from the journal"
+            )
+        if len(remaining_points) > 0:
+            for result in run_remaining_points(
+                remaining_points,
+                project_directory,
+                program_directory,
+                discover_dir,
+                test_run_command,
+                jobs,
+                timeout,
+                covering_tests,
+                schema_files,
+                use_schema,
+                use_fork_server,
+            ):
+                point, outcome, duration, executed_test_count = result
+                campaign_journal.record(
+                    describe_point(point),
+                    input_hashes[point],
+                    outcome.value,
+                    duration=duration,
+                    executed_tests=executed_test_count,
+                )
+                results.append(result)
+    return results, test_count
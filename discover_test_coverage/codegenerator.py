@@ -3,15 +3,17 @@
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
+from typing import List
+from typing import Sequence
 from typing import Union
 
 import libcst as cst
 from libcst import CSTNode
+from libcst import PartialParserConfig
 from libcst._nodes.statement import BaseCompoundStatement
 from libcst._nodes.statement import SimpleStatementLine
 
 from discover_test_coverage import constants
-from discover_test_coverage import transform
 
 
 class InstrumentationTypeSourceCode(str, Enum):
@@ -40,9 +42,108 @@ def get_testfixture_start_import() -> str:
     return "from libdtc.testfixture import *" + constants.markers.Newline
 
 
+def get_test_instrumentation_no_docstring_code(name) -> str:
+    """Return the source code that imports the test fixtures in a module without a docstring."""
+    # construct the import statement that will import the test fixtures:
+    # -- session_setup_teardown: initializes coverage tracking and saves it
+    # construct the source code as a string
+    #         - line 1: comment showing when instrumentation was generated and by what
+    #         - line 2: import the session_setup_teardown from discover_test_coverage module
+    # Note: discover_test_coverage package is not part of the discover package;
+    # it is a separate package on which discover and a subject program depends
+    return get_discover_comment_code(name) + get_testfixture_start_import()
+
+
+def get_test_instrumentation_docstring_code(name) -> str:
+    """Return the source code that imports the test fixtures in a module with a docstring."""
+    # construct the import statement that will import the test fixtures:
+    # -- session_setup_teardown: initializes coverage tracking and saves it
+    # construct the source code as a string
+    #         - line 0: an extra newline before the other generated code
+    #         - line 1: comment showing when instrumentation was generated and by what
+    #         - line 2: import the session_setup_teardown from discover_test_coverage module
+    # Note: discover_test_coverage package is not part of the discover package;
+    # it is a separate package on which discover and a subject program depends
+    return (
+        constants.markers.Newline
+        + get_discover_comment_code(name)
+        + get_testfixture_start_import()
+    )
+
+
+def get_function_coverage_registration_code(function_names: Sequence[str]) -> List[str]:
+    """Return the statements that register the functions of a module with the recorder."""
+    # construct the statements that create the counters for function coverage:
+    #         - line 1: import the recorder under a name that will not clash
+    #         - line 2: register the module's function names, whose positions are
+    #           their IDs, and store the returned counters in a module global
+    return [
+        f"from {constants.code.Recorder_Module} import recorder as "
+        f"{constants.code.Recorder}" + constants.markers.Newline,
+        f"{constants.code.Function_Hits} = {constants.code.Recorder}.register("
+        f"__name__, {tuple(function_names)!r})" + constants.markers.Newline,
+    ]
+
+
+def get_function_coverage_probe_code(function_id: int) -> str:
+    """Return the statement that counts a call to the function with an ID."""
+    return (
+        f"{constants.code.Function_Hits}[{function_id}] += 1"
+        + constants.markers.Newline
+    )
+
+
+def get_branch_coverage_registration_code(branch_names: Sequence[str]) -> List[str]:
+    """Return the statements that register the branch arms of a module with the recorder."""
+    # construct the statements that create the bitmap for branch coverage:
+    #         - line 1: import the recorder under a name that will not clash
+    #         - line 2: register the module's branch arm names, whose positions are
+    #           their IDs, and store the returned bitmap in a module global
+    return [
+        f"from {constants.code.Recorder_Module} import recorder as "
+        f"{constants.code.Recorder}" + constants.markers.Newline,
+        f"{constants.code.Branch_Hits} = {constants.code.Recorder}.register_branches("
+        f"__name__, {tuple(branch_names)!r})" + constants.markers.Newline,
+    ]
+
+
+def get_branch_coverage_probe_code(branch_id: int) -> str:
+    """Return the statement that records that the branch arm with an ID was taken."""
+    return f"{constants.code.Branch_Hits}[{branch_id}] = 1" + constants.markers.Newline
+
+
+def get_branch_coverage_probe_expression_code(branch_id: int) -> str:
+    """Return the expression that records that the branch arm with an ID was taken."""
+    return f"{constants.code.Branch_Hits}.__setitem__({branch_id}, 1)"
+
+
+def get_schema_registration_code(function_names: Sequence[str]) -> List[str]:
+    """Return the statements that register the functions of a module with the schema."""
+    # construct the statements that create the slot of the disabled function:
+    #         - line 1: import the schema under a name that will not clash
+    #         - line 2: register the module's function names, whose positions are
+    #           their IDs, and store the returned slot in a module global
+    return [
+        f"from {constants.code.Recorder_Module} import schema as "
+        f"{constants.code.Schema}" + constants.markers.Newline,
+        f"{constants.code.Disabled_Slot} = {constants.code.Schema}.register("
+        f"__name__, {tuple(function_names)!r})" + constants.markers.Newline,
+    ]
+
+
+def get_schema_guard_code(function_id: int) -> str:
+    """Return the statement that returns from the function with an ID when it is disabled."""
+    # the return is bare since returning a value is a syntax error in an
+    # asynchronous generator, while in a generator it stops the iteration
+    return (
+        f"if {constants.code.Disabled_Slot}[0] == {function_id}: return"
+        + constants.markers.Newline
+    )
+
+
 def create_instrumented_conftest_file(
     project_directory: Path, test_directory: Path
-) -> None:
+) -> Path:
     """Create an instrumented conftest.py file in specified directory."""
     # create a pathlib Path object for the conftest.py file that will
     # be stored in the main test directory for the project
@@ -65,6 +166,7 @@ def create_instrumented_conftest_file(
         + get_testfixture_start_import()
     )
     initial_conftest_file.write_text(full_code_text)
+    return initial_conftest_file
 
 
 def delete_instrumented_conftest_file(
@@ -82,18 +184,21 @@ def delete_instrumented_conftest_file(
 class InstrumentedSourceCodeGenerator(object):
     """Use a form of single dispatch to generate concrete abstract syntax trees."""
 
-    def __init__(self, code_type, name) -> None:
+    def __init__(
+        self, code_type, name, source_tree_configuration: PartialParserConfig
+    ) -> None:
         """Construct a new TransformerGenerator with the requested type of transformer."""
         self.code_type = code_type
         self.name = name
+        self.source_tree_configuration = source_tree_configuration
 
-    @staticmethod
-    def create_parsed_statement(source_code_statement):
+    def create_parsed_statement(self, source_code_statement):
         """Create a parsed statement out of the provided Python source code."""
-        # create a parsed source code statement using libcst
+        # create a parsed source code statement using libcst, using the
+        # configuration of the source tree that will contain the statement
         source_code_statement_parsed = cst.parse_statement(
             source_code_statement,
-            config=transform.source_tree_configuration,
+            config=self.source_tree_configuration,
         )
         return source_code_statement_parsed
 
@@ -103,48 +208,30 @@ class InstrumentedSourceCodeGenerator(object):
         """Generate by dispatch a concrete abstract syntax tree by needed instrumentation."""
         # call the function with the name that starts with the word "generate"
         # and then finishes with the specific type of source code needed
+        code_type = InstrumentationTypeSourceCode(self.code_type)
         return getattr(
-            self, constants.generator.Function_Prefix.format(self.code_type)
+            self, constants.generator.Function_Prefix.format(code_type.value)
         )(*args, **kwgs)
 
     def generate_test_instrumentation_no_docstring(
         self,
     ) -> Union[CSTNode, SimpleStatementLine, BaseCompoundStatement]:
         """Generate a concrete abstract syntax tree for importing test fixture when no docstring."""
-        # construct the import statement that will import the test fixtures:
-        # -- session_setup_teardown: initializes coverage tracking and saves it
-        # construct the source code as a string
-        #         - line 1: comment showing when instrumentation was generated and by what
-        #         - line 2: import the session_setup_teardown from discover_test_coverage module
-        # Note: discover_test_coverage package is not part of the discover package;
-        # it is a separate package on which discover and a subject program depends
-        multiple_line_import_statement_str = (
-            get_discover_comment_code(self.name) + get_testfixture_start_import()
-        )
-        return InstrumentedSourceCodeGenerator.create_parsed_statement(
-            multiple_line_import_statement_str
+        # construct the source code that imports the test fixtures as a string
+        multiple_line_import_statement_str = get_test_instrumentation_no_docstring_code(
+            self.name
         )
+        return self.create_parsed_statement(multiple_line_import_statement_str)
 
     def generate_test_instrumentation_docstring(
         self,
     ) -> Union[CSTNode, SimpleStatementLine, BaseCompoundStatement]:
         """Generate a concrete abstract syntax tree for importing test fixture when docstring."""
-        # construct the import statement that will import the test fixtures:
-        # -- session_setup_teardown: initializes coverage tracking and saves it
-        # construct the source code as a string
-        #         - line 0: an extra newline before the other generated code
-        #         - line 1: comment showing when instrumentation was generated and by what
-        #         - line 2: import the session_setup_teardown from discover_test_coverage module
-        # Note: discover_test_coverage package is not part of the discover package;
-        # it is a separate package on which discover and a subject program depends
-        multiple_line_import_statement_str = (
-            constants.markers.Newline
-            + get_discover_comment_code(self.name)
-            + get_testfixture_start_import()
-        )
-        return InstrumentedSourceCodeGenerator.create_parsed_statement(
-            multiple_line_import_statement_str
+        # construct the source code that imports the test fixtures as a string
+        multiple_line_import_statement_str = get_test_instrumentation_docstring_code(
+            self.name
         )
+        return self.create_parsed_statement(multiple_line_import_statement_str)
 
     def generate_empty_line(
         self,
@@ -8,6 +8,7 @@ import os
 import sys
 from enum import Enum
 from pathlib import Path
+from typing import Dict
 
 from rich.logging import RichHandler
 from rich.traceback import install
@@ -41,11 +42,19 @@ def save_configuration(**configurations) -> None:
     # configurations dictionary so that the test coverage
     # monitoring instrumentation can pick it up and use it
     configurations["coverage_file"] = str(discover_dir) + "/coveragereport.json"
+    # save the location of the indexed store to which each test run appends
+    # the coverage that the program's instrumentation recorded
+    configurations[constants.store.Key] = str(discover_dir / constants.store.File)
     configurations_str = json.dumps(configurations, indent=2)
     discover_json_file_path.touch()
     discover_json_file_path.write_text(configurations_str)
 
 
+def load_configuration(discover_json_file_path: Path) -> Dict:
+    """Load the configuration that was saved in the specified file."""
+    return json.loads(discover_json_file_path.read_text())
+
+
 def configure_tracebacks() -> None:
     """Configure stack tracebacks arising from a crash to use rich."""
     install()
@@ -20,13 +20,79 @@ arguments = create_constants(
     "arguments",
     Configure="--configure",
     Discover_Json="discover.json",
+    Rootdir="--rootdir",
+)
+
+# define the constants for bitsets
+bitset = create_constants(
+    "bitset",
+    Bits_Per_Byte=8,
+    Byte_Order="little",
+    One="1",
+    Varint_Continue=0x80,
+    Varint_Mask=0x7F,
+    Varint_Shift=7,
+    Zero="0",
+)
+
+# define the constants for the arms of branches
+branches = create_constants(
+    "branches",
+    Boolean="boolean",
+    Else_Arm="else",
+    Except_Arm="except{}",
+    Exit_Arm="exit",
+    False_Arm="false",
+    For="for",
+    If="if",
+    If_Expression="ifexp",
+    Loop_Arm="loop",
+    Right_Arm="right",
+    True_Arm="true",
+    Try="try",
+    While="while",
+)
+
+# define the constants for the cache of compiled instrumented code
+bytecode = create_constants(
+    "bytecode",
+    Bytes_Per_Megabyte=1048576,
+    Directory="bytecode",
+    Evict_Fraction=0.9,
+    Hash_Flags=0b11,
+    Maximum_Megabytes=256,
+    Suffix=".pyc",
+)
+
+# define the constants for campaigns that disable code and run the tests
+campaign = create_constants(
+    "campaign",
+    Bytecode_Variable="PYTHONDONTWRITEBYTECODE",
+    Directory="campaign",
+    Disabled_Body="return None",
+    Disabled_Generator_Body=("return", "yield"),
+    Environment_Directories=(".venv", "venv"),
+    Exit_Code_Failed=1,
+    Exit_Code_Passed=0,
+    Path_Variable="PYTHONPATH",
+    Point_Id="{}::{}#{}",
+    Report_File="campaign.json",
+    Workspace="workspace-{}",
 )
 
 # define the constants for the discover tool
 code = create_constants(
     "code",
     Comment="#",
+    Disabled_Slot="_discover_disabled",
     Discover_Comment="# discover-test-coverage instrumentation generated on",
+    Branch_Hits="_discover_branch_hits",
+    Function_Hits="_discover_function_hits",
+    Future_Module="__future__",
+    Module_Scope="<module>",
+    Recorder="_discover_recorder",
+    Recorder_Module="discover_test_coverage",
+    Schema="_discover_schema",
 )
 
 # define the constants for the discover tool
@@ -37,16 +103,78 @@ discover = create_constants(
     Name="discover-test-coverage",
     Separator="/",
     Server_Shutdown=":person_shrugging: Shut down discover's sylog server",
+    Telemetry_Shutdown=":person_shrugging: Shut down discover's telemetry receiver",
     Tagline="discover-test-coverage: Disabling code to discover test effectiveness",
     Website="https://github.com/DiscoverTestCoverage/discover-test-coverage",
 )
 
+# define the constants for file operations
+file = create_constants(
+    "file",
+    Copy="copy",
+    Ficlone=0x40049409,
+    Hard_Link="hard link",
+    Reflink="reflink",
+)
+
+# define the constants for running the tests in forked copies of a test session
+forkserver = create_constants(
+    "forkserver",
+    Exit_Code_Errored=3,
+    Fds_Separator=",",
+    Fds_Variable="DISCOVER_FORKSERVER",
+    Plugin="-p discover_test_coverage.forkserver",
+    Stop_Timeout=5.0,
+)
+
 # define the constants for the discover tool
 generator = create_constants(
     "generator",
     Function_Prefix="generate_{}",
 )
 
+# define the constants for selecting the tests that changes impact
+impact = create_constants(
+    "impact",
+    Collect_Only="--collect-only -q",
+    Documentation_Suffixes=(".md", ".rst"),
+    Git_Changed=("git", "diff", "--name-only", "--relative"),
+    Git_Show=("git", "show"),
+    Git_Untracked=("git", "ls-files", "--others", "--exclude-standard"),
+    Init_Module="__init__",
+    Node_Separator="::",
+    Revision_Path="{}:./{}",
+)
+
+# define the constants for the import hook
+importhook = create_constants(
+    "importhook",
+    Backend_Key="backend",
+    Cache_Size_Key="bytecode_cache_megabytes",
+    Configuration_Variable="DISCOVER_CONFIGURATION",
+    Enabled_Key="import_hook",
+    Plugin="-p discover_test_coverage.plugin",
+    Source_Suffix=".py",
+)
+
+# define the constants for the journal of the completed units of work
+journal = create_constants(
+    "journal",
+    Compact_Interval=256,
+    File="journal.jsonl",
+    Input_Hash_Key="input_hash",
+    Outcome_Key="outcome",
+    Unit_Key="unit",
+)
+
+# define the constants for the live view of the syslog server
+liveview = create_constants(
+    "liveview",
+    Frame_Rate=4,
+    Rate_Window=1.0,
+    Tail_Size=20,
+)
+
 # define the logger constants
 logger = create_constants(
     "logger",
@@ -79,20 +207,42 @@ logging = create_constants(
     Rich="Rich",
 )
 
+# define the constants for the manifest of a hidden directory
+manifest = create_constants(
+    "manifest",
+    File=".discover-manifest.json",
+    Hash_Algorithm="sha256",
+    Kind_Transfer="transfer",
+    Stamp_Key="stamp",
+    Temporary=".tmp",
+    Version="2",
+    Versioned_Modules=(
+        "codegenerator.py",
+        "transfer.py",
+        "transformergenerator.py",
+        "transformers/*.py",
+    ),
+)
+
 # define the constants for markers
 markers = create_constants(
     "markers",
-    Bad_Fifteen="<15>",
-    Bad_Zero_Zero="",
+    Bad_Zero_Zero="\x00",
+    Byte_Order_Mark="\ufeff",
+    Carriage_Return="\r",
+    Colon=":",
     Empty_Bytes=b"",
     Empty="",
     Ellipse="...",
     Forward_Slash="/",
     Dot=".",
+    Hash="#",
     Hidden=".",
     Indent="   ",
     Newline="\n",
     Nothing="",
+    Pipe="|",
+    Plus="+",
     Single_Quote="'",
     Space=" ",
     Tab="\t",
@@ -106,18 +256,87 @@ output = create_constants(
     Test_Start=":sparkles: Start to run test suite for the specified program",
 )
 
+# define the constants for running work in parallel
+parallel = create_constants(
+    "parallel",
+    Default_Jobs=1,
+    In_Flight_Per_Job=2,
+)
+
+# define the constants for collecting coverage with sys.monitoring
+monitoring = create_constants(
+    "monitoring",
+    Arrow="->",
+    Branch_Arms=2,
+    Generated_Prefix="<",
+    Locals="<locals>",
+    Module="monitoring",
+)
+
+# define the constants for recording function coverage
+recorder = create_constants(
+    "recorder",
+    Branch_Coverage="branch_coverage",
+    Counter_Type="Q",
+    Function_Coverage="function_coverage",
+)
+
+# define the constants for selecting the disabled function at runtime
+schema = create_constants(
+    "schema",
+    Disabled_Variable="DISCOVER_DISABLED",
+    Nothing_Disabled=-1,
+    Slot_Type="q",
+)
+
+# define the constants for passing the selected tests to the plugin
+selection = create_constants(
+    "selection",
+    Collection_Variable="DISCOVER_COLLECTION",
+    File="selection.txt",
+    Prefix="discover-selection-",
+    Suffix=".txt",
+    Variable="DISCOVER_SELECTION",
+)
+
 # define the constants for syslog server
 server = create_constants(
     "server",
     Backup_Count=1,
+    Batch_Size=1024,
     Localhost="127.0.0.1",
     Log_File=".discover.log",
     Max_Log_Size=1048576,
-    Poll_Interval=0.5,
     Port=2525,
+    Priority_Pattern=r"^<(\d{1,3})>",
+    Queue_Size=65536,
+    Receive_Buffer=4194304,
+    Severity_Count=8,
     Utf8_Encoding="utf-8",
 )
 
+# define the constants for running the test suite in parallel shards
+shard = create_constants(
+    "shard",
+    Default_Shards=1,
+    Directory="shards",
+    Log_File="pytest.log",
+    Name="shard-{}",
+    Store_Suffixes=("", "-shm", "-wal"),
+)
+
+# define the constants for the coverage store
+store = create_constants(
+    "store",
+    File="coverage.sqlite",
+    Json_Suffix=".json",
+    Key="coverage_store",
+    Kind_Branch="branch",
+    Kind_Function="function",
+    Timeout=30.0,
+    Unattributed_Context="<unattributed>",
+)
+
 # define the constants for syslog server
 tests = create_constants(
     "tests",
@@ -125,8 +344,47 @@ tests = create_constants(
     Conftest="conftest.py",
 )
 
+# define the constants for streaming the events of a test suite to discover
+telemetry = create_constants(
+    "telemetry",
+    Duration_Format="=d",
+    Flush_Interval=0.05,
+    Header_Format="=BI",
+    Max_Pending=65536,
+    Name_Length_Format="=H",
+    Position_Type="I",
+    Read_Size=65536,
+    Send_Timeout=5.0,
+    Socket_File="telemetry.sock",
+    Socket_Variable="DISCOVER_TELEMETRY",
+)
+
+# define the constants for the timeouts of the tests and of the test runs
+timing = create_constants(
+    "timing",
+    Default_Duration=1.0,
+    Exit_Code=124,
+    File="timings.json",
+    Multiplier=3.0,
+    Outcome="timeout",
+    Record_Variable="DISCOVER_RECORD_TIMINGS",
+    Run_Floor=30.0,
+    Test_Floor=5.0,
+    Timings_Variable="DISCOVER_TIMINGS",
+)
+
+# define the constants for tokenizing source code
+tokens = create_constants(
+    "tokens",
+    Supported_Encodings=("utf-8", "utf-8-sig"),
+)
+
 # define the wildcards constants
 wildcards = create_constants(
     "wildcards",
+    All_Files="*",
     All_Python="*.py",
+    Excluded=(".*/", "__pycache__", "node_modules", "venv"),
+    Git=".git",
+    Gitignore=".gitignore",
 )
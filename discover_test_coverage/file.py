@@ -1,13 +1,269 @@
 """Perform file operations."""
 
+import fnmatch
+import os
+import re
 from pathlib import Path
 from pathlib import PurePath
+from shutil import copy2
 from shutil import rmtree
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import Optional
+from typing import Pattern
+from typing import Tuple
 
 from discover_test_coverage import constants
 from discover_test_coverage import output
 
+# define the type of the rules in a .gitignore file, where each rule
+# has a compiled pattern, whether it negates an earlier rule, and
+# whether it only applies to directories
+GitIgnoreRule = Tuple[Pattern[str], bool, bool]
+
+
+def compile_glob_patterns(patterns: Iterable[str]) -> Optional[Pattern[str]]:
+    """Compile glob patterns into a single regular expression that matches any of them."""
+    translated_patterns = [fnmatch.translate(pattern) for pattern in patterns]
+    if len(translated_patterns) == 0:
+        return None
+    return re.compile(constants.markers.Pipe.join(translated_patterns))
+
+
+def translate_gitignore_pattern(pattern: str) -> str:
+    """Translate a pattern from a .gitignore file into a regular expression."""
+    regular_expression = []
+    index = 0
+    while index < len(pattern):
+        character = pattern[index]
+        # a "**/" matches zero or more directories and a trailing "**"
+        # matches everything inside of the directory that precedes it
+        if pattern.startswith("**", index):
+            if pattern.startswith("**/", index):
+                regular_expression.append("(?:.*/)?")
+                index += 3
+            else:
+                regular_expression.append(".*")
+                index += 2
+            continue
+        # a "*" or a "?" never matches the separator between directories
+        if character == "*":
+            regular_expression.append("[^/]*")
+        elif character == "?":
+            regular_expression.append("[^/]")
+        # a character class is copied to the regular expression when it is closed
+        elif character == "[" and pattern.find("]", index + 1) != -1:
+            closing_index = pattern.index("]", index + 1)
+            character_class = pattern[index:closing_index][1:]
+            if character_class.startswith("!"):
+                character_class = "^" + character_class[1:]
+            regular_expression.append("[" + character_class.replace("\\", "\\\\") + "]")
+            index = closing_index
+        else:
+            regular_expression.append(re.escape(character))
+        index += 1
+    return "".join(regular_expression)
+
+
+def read_gitignore_rules(directory: Path) -> List[GitIgnoreRule]:
+    """Read the rules in the .gitignore file of a directory, if there is one."""
+    gitignore_rules: List[GitIgnoreRule] = []
+    gitignore_file = directory / constants.wildcards.Gitignore
+    try:
+        gitignore_lines = gitignore_file.read_text().splitlines()
+    except (OSError, UnicodeDecodeError):
+        return gitignore_rules
+    for line in gitignore_lines:
+        pattern = line.rstrip()
+        # skip the blank lines and the comments
+        if pattern == constants.markers.Empty or pattern.startswith(
+            constants.code.Comment
+        ):
+            continue
+        # a rule that starts with "!" includes files that an earlier rule ignored
+        negate = pattern.startswith("!")
+        if negate:
+            pattern = pattern[1:]
+        # a rule that ends with "/" only matches directories
+        directory_only = pattern.endswith(constants.markers.Forward_Slash)
+        pattern = pattern.rstrip(constants.markers.Forward_Slash)
+        # a rule that contains a "/" is relative to the directory of the
+        # .gitignore file while all other rules can match at any depth
+        if constants.markers.Forward_Slash in pattern:
+            pattern = pattern.lstrip(constants.markers.Forward_Slash)
+        else:
+            pattern = "**/" + pattern
+        if pattern == constants.markers.Empty:
+            continue
+        gitignore_rules.append(
+            (
+                re.compile(translate_gitignore_pattern(pattern) + "(?:/.*)?$"),
+                negate,
+                directory_only,
+            )
+        )
+    return gitignore_rules
+
+
+def find_gitignore_ancestors(directory: Path) -> List[Path]:
+    """Find the directories above a directory whose .gitignore files apply to it."""
+    # the .gitignore files apply up to the root of the repository, which
+    # is the directory that contains the .git directory; when there is no
+    # repository then only the .gitignore file in the directory applies
+    ancestors = []
+    for ancestor in directory.resolve().parents:
+        ancestors.append(ancestor)
+        if (ancestor / constants.wildcards.Git).exists():
+            return list(reversed(ancestors))
+    return []
+
+
+def is_ignored(
+    path: Path,
+    is_directory: bool,
+    gitignore_rules_stack: List[Tuple[Path, List[GitIgnoreRule]]],
+) -> bool:
+    """Determine if the .gitignore files in effect ignore a path."""
+    ignored = False
+    # the last rule that matches the path decides whether it is ignored, with
+    # the rules in a deeper .gitignore file taking precedence over earlier ones
+    for base_directory, gitignore_rules in gitignore_rules_stack:
+        relative_path = path.relative_to(base_directory).as_posix()
+        for pattern, negate, directory_only in gitignore_rules:
+            if directory_only and not is_directory:
+                continue
+            if pattern.match(relative_path):
+                ignored = not negate
+    return ignored
+
+
+def walk_files(
+    directory: Path,
+    include_patterns: Iterable[str] = (constants.wildcards.All_Python,),
+    exclude_patterns: Iterable[str] = constants.wildcards.Excluded,
+    use_gitignore: bool = True,
+) -> Iterator[Path]:
+    """Lazily walk a directory, yielding the files that match the include patterns."""
+    # compile the patterns once so that matching each entry is inexpensive; note
+    # that, like in a .gitignore file, a pattern with a trailing "/" only matches
+    # the name of a directory, a pattern with any other "/" matches the path
+    # relative to the directory, and all of the other patterns match the name
+    # of the file or the directory
+    include_regex = compile_glob_patterns(include_patterns)
+    exclude_patterns = list(exclude_patterns)
+    directory_patterns = [
+        pattern.rstrip(constants.markers.Forward_Slash)
+        for pattern in exclude_patterns
+        if pattern.endswith(constants.markers.Forward_Slash)
+    ]
+    other_patterns = [
+        pattern
+        for pattern in exclude_patterns
+        if not pattern.endswith(constants.markers.Forward_Slash)
+    ]
+    exclude_regex = compile_glob_patterns(other_patterns)
+    exclude_directory_regex = compile_glob_patterns(directory_patterns)
+    exclude_path_regex = compile_glob_patterns(
+        pattern
+        for pattern in other_patterns
+        if constants.markers.Forward_Slash in pattern
+    )
+    # collect the rules of the .gitignore files that are above the directory
+    # and note that the rules are matched against resolved paths since the
+    # directories above the directory may only be known once it is resolved
+    gitignore_rules_stack: List[Tuple[Path, List[GitIgnoreRule]]] = []
+    resolved_directory = directory.resolve()
+    if use_gitignore:
+        for ancestor in find_gitignore_ancestors(directory):
+            gitignore_rules_stack.append((ancestor, read_gitignore_rules(ancestor)))
+
+    def is_excluded(path: Path, name: str, is_directory: bool) -> bool:
+        """Determine if an exclude pattern or a .gitignore file excludes a path."""
+        if exclude_regex is not None and exclude_regex.match(name):
+            return True
+        if (
+            is_directory
+            and exclude_directory_regex is not None
+            and exclude_directory_regex.match(name)
+        ):
+            return True
+        relative_path = path.relative_to(directory)
+        if exclude_path_regex is not None and exclude_path_regex.match(
+            relative_path.as_posix()
+        ):
+            return True
+        return use_gitignore and is_ignored(
+            resolved_directory / relative_path, is_directory, gitignore_rules_stack
+        )
+
+    def walk(current_directory: Path) -> Iterator[Path]:
+        """Walk a single directory, pruning the excluded directories before entering them."""
+        # add the rules of the .gitignore file in this directory to the stack
+        if use_gitignore:
+            gitignore_rules_stack.append(
+                (
+                    resolved_directory / current_directory.relative_to(directory),
+                    read_gitignore_rules(current_directory),
+                )
+            )
+        try:
+            with os.scandir(current_directory) as directory_entries:
+                entries = sorted(directory_entries, key=lambda entry: entry.name)
+        except OSError as error:
+            output.logger.debug(f"Skipping the unreadable directory: {error}")
+            entries = []
+        # visit the entries in the order of their names so that the files
+        # are in the same order as when sorting all of the paths to them
+        for entry in entries:
+            entry_path = current_directory / entry.name
+            # do not follow the symbolic links to directories to avoid cycles
+            if entry.is_dir(follow_symlinks=False):
+                if not is_excluded(entry_path, entry.name, True):
+                    yield from walk(entry_path)
+            elif entry.is_file():
+                if (
+                    include_regex is not None
+                    and include_regex.match(entry.name)
+                    and not is_excluded(entry_path, entry.name, False)
+                ):
+                    yield entry_path
+        # remove the rules of the .gitignore file in this directory from the stack
+        if use_gitignore:
+            gitignore_rules_stack.pop()
+
+    yield from walk(directory)
+
+
+def partition_python_files(directory: Path) -> Tuple[List[Path], List[Path]]:
+    """Find the conftest.py files and the other Python files in a single walk."""
+    return partition_files(directory, (constants.wildcards.All_Python,))
+
+
+def partition_files(
+    directory: Path, include_patterns: Iterable[str]
+) -> Tuple[List[Path], List[Path]]:
+    """Find the conftest.py files and the other matching files in a single walk."""
+    # create a list of all the conftest.py files and a list
+    # to store the files that are not conftest.py
+    conftest_file_list = []
+    not_conftest_file_list = []
+    # add each file to the list for its name during one walk
+    for python_file in walk_files(directory, include_patterns):
+        if python_file.name == constants.tests.Conftest:
+            conftest_file_list.append(python_file)
+        else:
+            not_conftest_file_list.append(python_file)
+    return conftest_file_list, not_conftest_file_list
+
+
+def create_file_finder(file_list: List[Path]) -> Callable[[Path], List[Path]]:
+    """Create a file finder that returns files that were already found."""
+    # note that this supports finding files in a single walk of a directory
+    # and then passing them to functions that accept a file finder
+    return lambda _: list(file_list)
+
 
 def find_python_files(directory: Path) -> List[Path]:
     """Find all of the Python files in a specified directory."""
@@ -15,35 +271,30 @@ def find_python_files(directory: Path) -> List[Path]:
     # program files as long as the directory is specified;
     # with that said, this works by a convention that a developer
     # may not follow (i.e., tests could be inside program directories)
-    all_python_files = sorted(directory.rglob(constants.wildcards.All_Python))
+    all_python_files = list(walk_files(directory))
     return all_python_files
 
 
 def find_python_files_not_conftest(directory: Path) -> List[Path]:
     """Find all of the Python files that are not a conftest.py file."""
-    # create a list to store Python files that are not conftest.py
-    not_conftest_file_list = []
-    # find all of the Python files in the specified directory
-    python_file_list = find_python_files(directory)
-    # add to the not_conftest_file_list all files that
-    # are not conftest.py according to their name
-    for python_file in python_file_list:
-        if python_file.name != constants.tests.Conftest:
-            not_conftest_file_list.append(python_file)
+    _, not_conftest_file_list = partition_python_files(directory)
     return not_conftest_file_list
 
 
+def find_files_not_python(directory: Path) -> List[Path]:
+    """Find all of the files that are not Python files (e.g., data files of a package)."""
+    return list(
+        walk_files(
+            directory,
+            (constants.wildcards.All_Files,),
+            constants.wildcards.Excluded + (constants.wildcards.All_Python,),
+        )
+    )
+
+
 def find_conftest_files(directory: Path) -> List[Path]:
     """Find all of the Python files that are a conftest.py file."""
-    # create a list of all the conftest.py files
-    conftest_file_list = []
-    # find all of the Python files in the specified directory
-    python_file_list = find_python_files(directory)
-    # add to the conftest_file_list all files that are
-    # conftest.py according to their name
-    for python_file in python_file_list:
-        if python_file.name == constants.tests.Conftest:
-            conftest_file_list.append(python_file)
+    conftest_file_list, _ = partition_python_files(directory)
     return conftest_file_list
 
 
@@ -73,10 +324,9 @@ def create_hidden_directory(
     # delete the hidden directory if it already exists
     if hidden_directory.exists() and hidden_directory.is_dir() and delete_path:
         rmtree(hidden_directory)
-    # create the hidden directory for storing instrumentation
-    # note that mkdir throws an exception if the directory exists;
-    # since it was already deleted, the exception should not occur
-    hidden_directory.mkdir(parents=True)
+    # create the hidden directory for storing instrumentation; note
+    # that the directory will still exist when it was not deleted
+    hidden_directory.mkdir(parents=True, exist_ok=True)
     output.logger.debug(f"Created the hidden directory: {hidden_directory}")
     return hidden_directory
 
@@ -95,3 +345,73 @@ def get_hidden_directory(
     )
     output.logger.debug(f"Accessing the hidden directory: {hidden_directory}")
     return hidden_directory
+
+
+def get_hidden_file(hidden_directory: Path, directory: Path, source_file: Path) -> Path:
+    """Get the path of the file in a hidden directory that corresponds to a source file."""
+    # the hidden directory mirrors the structure of the directory so that
+    # packages keep their structure and modules with the same name do not collide
+    return Path(hidden_directory / source_file.relative_to(directory))
+
+
+def write_file_replacing(destination_file: Path, text: str) -> None:
+    """Write text to a file by replacing it, never modifying a file that it links to."""
+    # create the directories that contain the file in the mirrored directory
+    destination_file.parent.mkdir(parents=True, exist_ok=True)
+    # write to a temporary file and then replace the file so that, when the
+    # file was a link to a source file, the source file is never overwritten
+    temporary_file = destination_file.with_name(
+        destination_file.name + constants.manifest.Temporary
+    )
+    temporary_file.write_text(text)
+    os.replace(temporary_file, destination_file)
+
+
+def reflink_file(source_file: Path, destination_file: Path) -> None:
+    """Create a copy-on-write clone of a file, raising an OSError when not supported."""
+    # only some file systems on Linux (e.g., btrfs and xfs) support cloning
+    # a file and the fcntl module is not available on all operating systems
+    try:
+        import fcntl  # pylint: disable=import-outside-toplevel
+    except ImportError as error:
+        raise OSError("Cloning a file is not supported") from error
+    with source_file.open("rb") as source, destination_file.open("wb") as destination:
+        try:
+            fcntl.ioctl(destination.fileno(), constants.file.Ficlone, source.fileno())
+        except OSError:
+            destination_file.unlink()
+            raise
+
+
+def link_or_copy_file(source_file: Path, destination_file: Path) -> str:
+    """Link a file into a mirrored directory, copying it only when linking fails."""
+    # create the directories that contain the file in the mirrored directory
+    # and then remove an existing file since a link cannot replace a file
+    destination_file.parent.mkdir(parents=True, exist_ok=True)
+    destination_file.unlink(missing_ok=True)
+    # a hard link takes no space but it fails across file systems and on
+    # file systems that do not support it, so try to clone the file next
+    # and copy it as the last resort; note that the instrumented files are
+    # always written with write_file_replacing and thus a link to a source
+    # file is replaced instead of being overwritten with instrumentation
+    try:
+        os.link(source_file, destination_file)
+        return constants.file.Hard_Link
+    except OSError:
+        output.logger.debug(f"Could not hard link the file: {source_file}")
+    return clone_or_copy_file(source_file, destination_file)
+
+
+def clone_or_copy_file(source_file: Path, destination_file: Path) -> str:
+    """Clone a file into a mirrored directory, copying it only when cloning fails."""
+    # unlike a hard link, both a clone and a copy are separate files and
+    # thus writing to the mirrored file never changes the source file
+    destination_file.parent.mkdir(parents=True, exist_ok=True)
+    destination_file.unlink(missing_ok=True)
+    try:
+        reflink_file(source_file, destination_file)
+        return constants.file.Reflink
+    except OSError:
+        output.logger.debug(f"Could not clone the file: {source_file}")
+    copy2(source_file, destination_file)
+    return constants.file.Copy
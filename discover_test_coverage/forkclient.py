@@ -0,0 +1,109 @@
+"""Send runs of the test suite to a fork server that collected the test session once."""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+from pathlib import Path
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from discover_test_coverage import constants
+
+
+def is_available() -> bool:
+    """Determine if this platform can fork copies of a test session that was collected."""
+    # forking a process that imported a whole test suite is only supported on
+    # Linux, while the other platforms (e.g., macOS) keep the subprocess runs
+    return sys.platform.startswith("linux") and hasattr(os, "fork")
+
+
+class ForkClient:
+    """Run the test suite in a workspace through a fork server that runs in it."""
+
+    def __init__(
+        self,
+        test_run_command: str,
+        workspace_directory: Path,
+        environment: Mapping[str, str],
+    ):
+        """Start a fork server that collects the test suite once in a workspace."""
+        # the requests go to the server through one pipe and the responses come
+        # back through another, which keeps them apart from the test's output
+        request_read_fd, request_write_fd = os.pipe()
+        response_read_fd, response_write_fd = os.pipe()
+        self.process = subprocess.Popen(
+            test_run_command + constants.markers.Space + constants.forkserver.Plugin,
+            shell=True,
+            cwd=workspace_directory,
+            env={
+                **environment,
+                constants.forkserver.Fds_Variable: constants.forkserver.Fds_Separator.join(
+                    (str(request_read_fd), str(response_write_fd))
+                ),
+            },
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            pass_fds=(request_read_fd, response_write_fd),
+            start_new_session=True,
+        )
+        os.close(request_read_fd)
+        os.close(response_write_fd)
+        self.requests = os.fdopen(request_write_fd, "w")
+        self.responses = os.fdopen(response_read_fd)
+        # whether the fork server was stopped, either at the end of the
+        # campaign or because it failed, after which it never runs the tests
+        self.stopped = False
+
+    def run(
+        self,
+        unit: Optional[str],
+        test_ids: Optional[Sequence[str]],
+        timeout: Optional[float],
+    ) -> Tuple[Optional[int], float]:
+        """Run the tests with a unit disabled, returning the exit code or None on a timeout."""
+        self.requests.write(
+            json.dumps(
+                {
+                    "unit": unit,
+                    "test_ids": None if test_ids is None else list(test_ids),
+                    "timeout": timeout,
+                }
+            )
+            + constants.markers.Newline
+        )
+        self.requests.flush()
+        response_line = self.responses.readline()
+        # the server stopped (e.g., because it could not collect the tests)
+        # and thus the caller must run the tests without the fork server
+        if len(response_line) == 0:
+            raise OSError(f"The fork server stopped with {self.process.poll()}")
+        response = json.loads(response_line)
+        return response["exit_code"], response["duration"]
+
+    def close(self) -> None:
+        """Stop the fork server by ending its requests, unless it was already stopped."""
+        if self.stopped:
+            return
+        self.stopped = True
+        for pipe in (self.requests, self.responses):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        try:
+            self.process.wait(timeout=constants.forkserver.Stop_Timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+            self.process.wait()
+
+    def __enter__(self) -> "ForkClient":
+        """Enter a context in which the fork server runs."""
+        return self
+
+    def __exit__(self, *exception_details) -> None:
+        """Stop the fork server when leaving the context."""
+        self.close()
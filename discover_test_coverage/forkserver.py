@@ -0,0 +1,148 @@
+"""Serve runs of the test suite from forked copies of a test session that was collected once."""
+
+import json
+import os
+import select
+import signal
+import sys
+import time
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import pytest
+
+from discover_test_coverage import constants
+from discover_test_coverage import schema
+from discover_test_coverage import selection
+from discover_test_coverage import timing
+
+
+def get_server_fds() -> Optional[Tuple[int, int]]:
+    """Get the descriptors of the pipes that carry the requests and the responses, if any."""
+    server_fds = os.environ.get(constants.forkserver.Fds_Variable)
+    if server_fds is None:
+        return None
+    request_fd, response_fd = server_fds.split(constants.forkserver.Fds_Separator)
+    return int(request_fd), int(response_fd)
+
+
+def run_items(session, items: Sequence) -> int:
+    """Run the test items in this process, like the loop of pytest, and return the exit code."""
+    if len(items) == 0:
+        return pytest.ExitCode.NO_TESTS_COLLECTED
+    session.testsfailed = 0
+    for index, item in enumerate(items):
+        # the next item lets pytest keep the fixtures that both of the items use
+        next_item = items[index + 1] if index + 1 < len(items) else None
+        item.config.hook.pytest_runtest_protocol(item=item, nextitem=next_item)
+        if session.shouldfail or session.shouldstop:
+            break
+    if session.testsfailed > 0:
+        return pytest.ExitCode.TESTS_FAILED
+    return pytest.ExitCode.OK
+
+
+def run_child(session, items: Sequence, unit: Optional[str], result_fd: int) -> None:
+    """Run the test items in the forked child with a unit disabled and send the exit code."""
+    # the child leads its own process group so that a timeout also stops the
+    # processes that its tests started; note that the child never returns
+    # since it must not run the rest of the test session of its parent
+    os.setpgid(0, 0)
+    exit_code = constants.forkserver.Exit_Code_Errored
+    try:
+        schema.activate(unit)
+        exit_code = int(run_items(session, items))
+    finally:
+        os.write(result_fd, str(exit_code).encode())
+        os._exit(constants.campaign.Exit_Code_Passed)
+
+
+def wait_for_child(pid: int, result_fd: int, timeout: Optional[float]) -> Optional[int]:
+    """Wait for the exit code of a child, stopping it when it runs longer than the timeout."""
+    ready_fds, _, _ = select.select([result_fd], [], [], timeout)
+    if len(ready_fds) == 0:
+        os.killpg(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        return None
+    result = os.read(result_fd, select.PIPE_BUF)
+    _, status = os.waitpid(pid, 0)
+    # a test ran for longer than its own timeout and thus the plugin stopped
+    # the child, leaving behind the processes that the test started
+    if (
+        len(result) == 0
+        and os.WIFEXITED(status)
+        and os.WEXITSTATUS(status) == constants.timing.Exit_Code
+    ):
+        timing.kill_process_group(pid)
+        return None
+    # the child exited before it sent its exit code (e.g., a test called os._exit)
+    if len(result) == 0:
+        return constants.forkserver.Exit_Code_Errored
+    return int(result)
+
+
+def run_forked(
+    session, items: Sequence, unit: Optional[str], timeout: Optional[float]
+) -> Optional[int]:
+    """Run the test items in a copy-on-write child of this process, returning the exit code."""
+    result_read_fd, result_write_fd = os.pipe()
+    # flush the output so that the child does not write the buffered output again
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        os.close(result_read_fd)
+        run_child(session, items, unit, result_write_fd)
+    os.close(result_write_fd)
+    # set the process group of the child in the parent too so that the group
+    # already exists when the timeout expires before the child could set it
+    try:
+        os.setpgid(pid, pid)
+    except OSError:
+        pass
+    try:
+        return wait_for_child(pid, result_read_fd, timeout)
+    finally:
+        os.close(result_read_fd)
+
+
+def serve(session, request_fd: int, response_fd: int) -> None:
+    """Run the test items of each request in a forked child until the requests end."""
+    items = list(session.items)
+    with os.fdopen(request_fd) as requests, os.fdopen(response_fd, "w") as responses:
+        for request_line in requests:
+            request = json.loads(request_line)
+            start_time = time.perf_counter()
+            exit_code = run_forked(
+                session,
+                selection.select_items(items, request["test_ids"]),
+                request["unit"],
+                request["timeout"],
+            )
+            responses.write(
+                json.dumps(
+                    {
+                        "exit_code": exit_code,
+                        "duration": time.perf_counter() - start_time,
+                    }
+                )
+                + constants.markers.Newline
+            )
+            responses.flush()
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtestloop(session) -> Optional[bool]:
+    """Serve the runs of a campaign instead of running the test suite once."""
+    server_fds = get_server_fds()
+    # the test suite was not started by a campaign or its collection failed,
+    # in which case pytest reports the errors in the way that it always does
+    if (
+        server_fds is None
+        or session.testsfailed > 0
+        or session.config.option.collectonly
+    ):
+        return None
+    serve(session, *server_fds)
+    return True
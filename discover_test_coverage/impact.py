@@ -0,0 +1,409 @@
+"""Select the tests that a change to the program or its tests could impact."""
+
+import subprocess
+from pathlib import Path
+from pathlib import PurePosixPath
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+
+import libcst as cst
+
+from discover_test_coverage import constants
+from discover_test_coverage import output
+from discover_test_coverage import run
+from discover_test_coverage import store
+
+# define the type of the changes to the modules, mapping the relative path of each
+# changed Python file to the names of its changed functions, or None when the
+# whole module must be considered changed (e.g., because its imports changed)
+ChangedModulesType = Dict[str, Optional[Set[str]]]
+
+
+class FunctionCollector(cst.CSTVisitor):
+    """Collect the source code of each function, using its canonical name."""
+
+    def __init__(self, source_tree: cst.Module):
+        """Construct a FunctionCollector for a source tree."""
+        self.source_tree = source_tree
+        # stack for storing the canonical name of the current function, which
+        # matches the names that the function coverage transformer records
+        self.stack: List[str] = []
+        # the source code of each function, including its nested functions
+        self.functions: Dict[str, str] = {}
+
+    def visit_ClassDef(self, node: cst.ClassDef) -> Optional[bool]:
+        """Add the name of the class to the stack of names."""
+        self.stack.append(node.name.value)
+        return True
+
+    def leave_ClassDef(self, original_node: cst.ClassDef) -> None:
+        """Remove the name of the class from the stack of names."""
+        self.stack.pop()
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> Optional[bool]:
+        """Record the source code of the function, using its canonical name."""
+        self.stack.append(node.name.value)
+        self.functions[
+            constants.markers.Dot.join(self.stack)
+        ] = self.source_tree.code_for_node(node)
+        return True
+
+    def leave_FunctionDef(self, original_node: cst.FunctionDef) -> None:
+        """Remove the name of the function from the stack of names."""
+        self.stack.pop()
+
+
+class FunctionRemover(cst.CSTTransformer):
+    """Remove every function so that only the code that runs on import remains."""
+
+    def leave_FunctionDef(
+        self, original_node: cst.FunctionDef, updated_node: cst.FunctionDef
+    ) -> cst.RemovalSentinel:
+        """Remove the function."""
+        return cst.RemoveFromParent()
+
+
+def collect_functions(source_code: str) -> Optional[Dict[str, str]]:
+    """Collect the source code of each function in a module, or None when it does not parse."""
+    try:
+        source_tree = cst.parse_module(source_code)
+    except cst.ParserSyntaxError:
+        return None
+    function_collector = FunctionCollector(source_tree)
+    source_tree.visit(function_collector)
+    return function_collector.functions
+
+
+def remove_functions(source_code: str) -> Optional[str]:
+    """Remove all of the functions from a module, or return None when it does not parse."""
+    try:
+        return cst.parse_module(source_code).visit(FunctionRemover()).code
+    except cst.ParserSyntaxError:
+        return None
+
+
+def find_changed_functions(
+    old_source_code: Optional[str], new_source_code: Optional[str]
+) -> Optional[Set[str]]:
+    """Find the functions whose code differs between two versions of a module."""
+    # a module that was added or deleted changed as a whole
+    if old_source_code is None or new_source_code is None:
+        return None
+    old_functions = collect_functions(old_source_code)
+    new_functions = collect_functions(new_source_code)
+    # a module that does not parse cannot be compared function by function
+    if old_functions is None or new_functions is None:
+        return None
+    # the code outside of the functions (e.g., the imports, the constants, and
+    # the attributes of classes) runs when the module is imported and thus
+    # changing it could impact every test that uses the module
+    if remove_functions(old_source_code) != remove_functions(new_source_code):
+        return None
+    # a function changed when it was added, deleted, or its code is different;
+    # note that changing a nested function also changes its enclosing functions
+    return {
+        function_name
+        for function_name in set(old_functions) | set(new_functions)
+        if old_functions.get(function_name) != new_functions.get(function_name)
+    }
+
+
+def run_git(project_directory: Path, command: Sequence[str]) -> Optional[str]:
+    """Run a git command in the project directory, returning None when it fails."""
+    try:
+        completed_process = subprocess.run(
+            list(command),
+            cwd=project_directory,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as error:
+        output.logger.debug(f"Could not run {' '.join(command)}: {error}")
+        return None
+    return completed_process.stdout
+
+
+def find_changed_files(project_directory: Path, changed_since: str) -> List[str]:
+    """Find the files that changed since a revision, relative to the project directory."""
+    # compare the revision to the working tree, which includes the changes
+    # that were not committed, and then add the files that git does not track
+    changed_files = run_git(
+        project_directory, (*constants.impact.Git_Changed, changed_since)
+    )
+    if changed_files is None:
+        raise ValueError(f"Could not find the files that changed since {changed_since}")
+    untracked_files = run_git(project_directory, constants.impact.Git_Untracked) or ""
+    return sorted(set(changed_files.splitlines()) | set(untracked_files.splitlines()))
+
+
+def read_revision(
+    project_directory: Path, revision: str, relative_path: str
+) -> Optional[str]:
+    """Read a file as it was in a revision, returning None when it did not exist."""
+    return run_git(
+        project_directory,
+        (
+            *constants.impact.Git_Show,
+            constants.impact.Revision_Path.format(revision, relative_path),
+        ),
+    )
+
+
+def find_changed_modules(
+    project_directory: Path,
+    changed_files: Iterable[str],
+    changed_since: Optional[str] = None,
+) -> ChangedModulesType:
+    """Find the changed functions of each changed Python file."""
+    changed_modules: ChangedModulesType = {}
+    for relative_path in changed_files:
+        # the changes to files that are not Python source code cannot be
+        # compared function by function; note that the tests are only selected
+        # when all of these files are documentation (see find_unselectable_files)
+        if not relative_path.endswith(constants.importhook.Source_Suffix):
+            output.logger.debug(f"Ignoring the changed file: {relative_path}")
+            continue
+        # without a revision there is no earlier version to compare to
+        # and thus the whole module is considered to be changed
+        if changed_since is None:
+            changed_modules[relative_path] = None
+            continue
+        source_file = project_directory / relative_path
+        new_source_code = source_file.read_text() if source_file.exists() else None
+        old_source_code = read_revision(project_directory, changed_since, relative_path)
+        changed_modules[relative_path] = find_changed_functions(
+            old_source_code, new_source_code
+        )
+    return changed_modules
+
+
+def find_unselectable_files(changed_files: Iterable[str]) -> List[str]:
+    """Find the changed files that are neither Python source code nor documentation."""
+    # a change to any other file (e.g., the configuration of pytest, the
+    # dependencies, or a data file that the tests read) could change the
+    # outcome of any of the tests and thus it means that they all must run
+    return [
+        relative_path
+        for relative_path in changed_files
+        if PurePosixPath(relative_path).suffix
+        not in (
+            constants.importhook.Source_Suffix,
+            *constants.impact.Documentation_Suffixes,
+        )
+    ]
+
+
+def get_module_name_parts(relative_path: str) -> List[str]:
+    """Get the parts of the dotted name of a module from its relative path."""
+    parts = list(
+        PurePosixPath(relative_path).with_suffix(constants.markers.Nothing).parts
+    )
+    # a package is recorded with the name of its directory
+    if parts and parts[-1] == constants.impact.Init_Module:
+        parts.pop()
+    return parts
+
+
+def match_module_names(relative_path: str, module_names: Iterable[str]) -> List[str]:
+    """Match a relative path to the names of the recorded modules that it could be."""
+    # the recorded name of a module is relative to an entry of sys.path (e.g., the
+    # project directory or its src directory) and thus it matches the end
+    # of its dotted name, starting at one of the dots so that the parts are whole
+    dotted_path = constants.markers.Dot + constants.markers.Dot.join(
+        get_module_name_parts(relative_path)
+    )
+    return [
+        module_name
+        for module_name in module_names
+        if dotted_path.endswith(constants.markers.Dot + module_name)
+    ]
+
+
+def get_test_file(test_id: str) -> PurePosixPath:
+    """Get the path of the file of a test, ignoring the hidden directory of instrumented tests."""
+    parts = PurePosixPath(test_id.split(constants.impact.Node_Separator)[0]).parts
+    # the instrumented tests run from a hidden directory whose name only
+    # differs from the name of the original test directory by its prefix
+    if (
+        len(parts) > 1
+        and parts[0].startswith(constants.markers.Hidden)
+        and parts[0] != constants.markers.Dot * 2
+    ):
+        parts = (
+            parts[0].replace(constants.markers.Hidden, constants.markers.Nothing, 1),
+            *parts[1:],
+        )
+    return PurePosixPath(*parts)
+
+
+def is_changed_test(test_id: str, changed_modules: ChangedModulesType) -> bool:
+    """Determine if a test is in a changed test file or under a changed conftest.py file."""
+    test_file = get_test_file(test_id)
+    for relative_path in changed_modules:
+        changed_path = PurePosixPath(relative_path)
+        if test_file == changed_path:
+            return True
+        # the fixtures of a conftest.py file are available to all of the tests
+        # in its directory and thus a change to it could impact any of them
+        if (
+            changed_path.name == constants.tests.Conftest
+            and changed_path.parent in test_file.parents
+        ):
+            return True
+    return False
+
+
+def find_unmatched_modules(
+    test_ids: Sequence[str],
+    module_names: Iterable[str],
+    changed_modules: ChangedModulesType,
+) -> List[str]:
+    """Find the changed Python files that are neither tests nor recorded modules."""
+    test_files = {get_test_file(test_id) for test_id in test_ids}
+    module_names = list(module_names)
+    return [
+        relative_path
+        for relative_path in changed_modules
+        if PurePosixPath(relative_path) not in test_files
+        and PurePosixPath(relative_path).name != constants.tests.Conftest
+        and len(match_module_names(relative_path, module_names)) == 0
+    ]
+
+
+def find_impacted_contexts(
+    coverage_store: store.CoverageStore, changed_modules: ChangedModulesType
+) -> Set[str]:
+    """Find the contexts that hit any of the changed functions in the latest coverage."""
+    # find the recorded modules that each of the changed files could be
+    module_names = coverage_store.list_files()
+    changed_functions: Dict[str, Optional[Set[str]]] = {}
+    for relative_path, function_names in changed_modules.items():
+        for module_name in match_module_names(relative_path, module_names):
+            changed_functions[module_name] = function_names
+    impacted_contexts = set()
+    for (
+        context_name,
+        module_name,
+        kind,
+        probe_names,
+    ) in coverage_store.iterate_latest_context_hits(list(changed_functions)):
+        function_names = changed_functions[module_name]
+        # any hit in a module that changed as a whole impacts the context
+        if function_names is None:
+            impacted_contexts.add(context_name)
+            continue
+        # the name of a branch arm starts with the name of its function
+        if kind == constants.store.Kind_Branch:
+            probe_names = [
+                probe_name.split(constants.markers.Colon)[0]
+                for probe_name in probe_names
+            ]
+        if function_names.intersection(probe_names):
+            impacted_contexts.add(context_name)
+    return impacted_contexts
+
+
+def select_impacted_tests(
+    test_ids: Sequence[str],
+    coverage_store: store.CoverageStore,
+    changed_modules: ChangedModulesType,
+) -> List[str]:
+    """Select the tests that the changes impact or that have no recorded coverage."""
+    # a changed module without any recorded coverage (e.g., a helper module
+    # in the test directory that the tests import, or a new module) could be
+    # used by any of the tests and thus they all run
+    unmatched_modules = find_unmatched_modules(
+        test_ids, coverage_store.list_files(), changed_modules
+    )
+    if len(unmatched_modules) > 0:
+        output.console.print(
+            f":person_shrugging: No recorded coverage of {', '.join(unmatched_modules)}"
+            " and thus all of the tests run"
+        )
+        return list(test_ids)
+    recorded_contexts = set(coverage_store.list_context_names())
+    impacted_contexts = find_impacted_contexts(coverage_store, changed_modules)
+    # the changes impact the code that ran outside of the test cases (e.g.,
+    # while the modules were imported) and thus they could impact any test case
+    if constants.store.Unattributed_Context in impacted_contexts:
+        return list(test_ids)
+    # keep the order in which the test suite was collected so that the
+    # selected tests run in the same order as they would in a full run
+    return [
+        test_id
+        for test_id in test_ids
+        if test_id not in recorded_contexts
+        or test_id in impacted_contexts
+        or is_changed_test(test_id, changed_modules)
+    ]
+
+
+def get_relative_path(project_directory: Path, changed_file: Path) -> str:
+    """Get the path of a changed file relative to the project directory."""
+    try:
+        return (
+            changed_file.resolve().relative_to(project_directory.resolve()).as_posix()
+        )
+    # the file is not inside of the project directory when it is resolved from
+    # the current working directory and thus it is already a relative path
+    except ValueError:
+        return changed_file.as_posix()
+
+
+def select_tests(
+    project_directory: Path,
+    test_directory: Path,
+    test_run_command: str,
+    store_file: Path,
+    changed_since: Optional[str],
+    changed_files: Sequence[Path],
+    test_directory_mode: Optional[run.TestDirectoryMode] = None,
+) -> Optional[List[str]]:
+    """Select the tests that changes impact, or return None when all of the tests should run."""
+    # there are no changes and thus the whole test suite runs as before
+    if changed_since is None and len(changed_files) == 0:
+        return None
+    # there is no coverage of the earlier runs to select the tests with
+    if not store_file.exists():
+        output.console.print(
+            f":person_shrugging: No coverage in {store_file} to select tests with"
+        )
+        return None
+    relative_paths = {
+        get_relative_path(project_directory, changed_file)
+        for changed_file in changed_files
+    }
+    if changed_since is not None:
+        relative_paths.update(find_changed_files(project_directory, changed_since))
+    unselectable_files = find_unselectable_files(sorted(relative_paths))
+    if len(unselectable_files) > 0:
+        output.console.print(
+            f":person_shrugging: Changes to {', '.join(unselectable_files)} "
+            "could impact any test and thus all of the tests run"
+        )
+        return None
+    changed_modules = find_changed_modules(
+        project_directory, sorted(relative_paths), changed_since
+    )
+    output.logger.debug(f"Found the changed modules: {changed_modules}")
+    test_ids = run.collect_test_ids(
+        project_directory, test_directory, test_run_command, test_directory_mode
+    )
+    # the tests could not be collected (e.g., because of a syntax error) and thus
+    # the whole test suite runs so that the error is reported as it always is
+    if len(test_ids) == 0:
+        return None
+    with store.CoverageStore(store_file) as coverage_store:
+        selected_test_ids = select_impacted_tests(
+            test_ids, coverage_store, changed_modules
+        )
+    output.console.print(
+        f":sparkles: Selected {len(selected_test_ids)} of {len(test_ids)} tests "
+        "impacted by the changes"
+    )
+    return selected_test_ids
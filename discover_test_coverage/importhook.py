@@ -0,0 +1,176 @@
+"""Instrument the modules of a program in memory while they are imported."""
+
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import sys
+from pathlib import Path
+from types import CodeType
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from discover_test_coverage import bytecode
+from discover_test_coverage import constants
+from discover_test_coverage import instrumentation
+from discover_test_coverage import output
+from discover_test_coverage import transform
+
+
+class InstrumentingLoader(importlib.machinery.SourceFileLoader):
+    """Load a module from its source code after instrumenting it in memory."""
+
+    def __init__(
+        self,
+        fullname: str,
+        path: str,
+        instrumentation_types: Sequence[instrumentation.InstrumentationType],
+        bytecode_cache: Optional[bytecode.BytecodeCache] = None,
+    ):
+        """Construct an InstrumentingLoader for a module and the types of instrumentation."""
+        super().__init__(fullname, path)
+        self.instrumentation_types = instrumentation_types
+        self.bytecode_cache = bytecode_cache
+
+    def get_code(self, fullname: str) -> CodeType:
+        """Instrument the source code of the module and then compile it."""
+        source_path = self.get_filename(fullname)
+        source_bytes = self.get_data(source_path)
+        # reuse the code that an earlier run compiled from the same source code
+        # with the same instrumentation, skipping both the parse and the compile
+        if self.bytecode_cache is not None:
+            cache_key = self.bytecode_cache.compute_key(
+                source_bytes, self.instrumentation_types, source_path, fullname
+            )
+            cached_code = self.bytecode_cache.load(cache_key, source_bytes)
+            if cached_code is not None:
+                return cached_code
+        # decode the source code in the same way as the standard loader, which
+        # respects the encoding declaration and the universal newlines
+        source_text = importlib.util.decode_source(source_bytes)
+        # add the instrumentation with the same transformers that create the
+        # instrumented files in the hidden directories and then compile it;
+        # note that the code is never cached next to the source code since the
+        # cached file would otherwise be used by a later run that is not instrumented
+        instrumented_source_text = transform.transform_source(
+            source_text, self.instrumentation_types
+        )
+        output.logger.debug(f"Instrumented the imported module: {fullname}")
+        code = compile(instrumented_source_text, source_path, "exec", dont_inherit=True)
+        if self.bytecode_cache is not None:
+            self.bytecode_cache.store(cache_key, source_bytes, code)
+        return code
+
+    def set_data(self, path, data, *, _mode=0o666) -> None:
+        """Do not write any bytecode for the instrumented module."""
+
+
+class InstrumentingFinder(importlib.abc.MetaPathFinder):
+    """Find the modules of a program so that they are instrumented while imported."""
+
+    def __init__(
+        self,
+        program_directory: Path,
+        instrumentation_types: Sequence[instrumentation.InstrumentationType],
+        bytecode_cache: Optional[bytecode.BytecodeCache] = None,
+    ):
+        """Construct an InstrumentingFinder for a program's directory."""
+        self.program_directory = Path(program_directory).resolve()
+        self.instrumentation_types = instrumentation.order_instrumentation_types(
+            instrumentation_types
+        )
+        self.bytecode_cache = bytecode_cache
+
+    def is_program_file(self, origin: str) -> bool:
+        """Determine if a module's file is a source code file inside of the program."""
+        if not origin.endswith(constants.importhook.Source_Suffix):
+            return False
+        # note that Path.is_relative_to is not available in Python 3.8
+        try:
+            Path(origin).resolve().relative_to(self.program_directory)
+        except ValueError:
+            return False
+        return True
+
+    def find_spec(self, fullname: str, path=None, target=None):
+        """Find the specification of a module, instrumenting it if it is in the program."""
+        # find the module in the same way as the standard import system and then
+        # only replace the loader for the source code files inside of the program,
+        # leaving all other modules (e.g., the test cases) to the other finders
+        spec = importlib.machinery.PathFinder.find_spec(fullname, path, target)
+        if spec is None or spec.origin is None or not self.is_program_file(spec.origin):
+            return None
+        spec.loader = InstrumentingLoader(
+            fullname, spec.origin, self.instrumentation_types, self.bytecode_cache
+        )
+        return spec
+
+
+def install(
+    program_directory: Path,
+    instrumentation_types: Sequence[instrumentation.InstrumentationType],
+    bytecode_cache: Optional[bytecode.BytecodeCache] = None,
+) -> InstrumentingFinder:
+    """Install a finder that instruments the modules of a program while imported."""
+    # remove any finder that an earlier call installed so that
+    # the modules are never instrumented more than one time
+    uninstall()
+    finder = InstrumentingFinder(
+        program_directory, instrumentation_types, bytecode_cache
+    )
+    # the finder must come before the standard finders since they
+    # would otherwise load the modules without any instrumentation
+    sys.meta_path.insert(0, finder)
+    output.logger.debug(f"Installed the import hook for: {program_directory}")
+    return finder
+
+
+def uninstall() -> None:
+    """Remove all of the finders that instrument the modules of a program."""
+    sys.meta_path[:] = [
+        finder
+        for finder in sys.meta_path
+        if not isinstance(finder, InstrumentingFinder)
+    ]
+
+
+def get_program_directory(configuration: Dict) -> Path:
+    """Get the program's directory from the configuration that the discover command saved."""
+    return Path(configuration["project_directory"]) / Path(
+        configuration["program_directory"]
+    )
+
+
+def get_instrumentation_types(
+    configuration: Dict,
+) -> List[instrumentation.InstrumentationType]:
+    """Get the types of instrumentation from the configuration that the discover command saved."""
+    return [
+        instrumentation.InstrumentationType(instrumentation_type)
+        for instrumentation_type in configuration["instrumentation_types"]
+    ]
+
+
+def install_from_configuration(configuration: Dict) -> Optional[InstrumentingFinder]:
+    """Install the finder using the configuration that the discover command saved."""
+    # the configuration did not request the import hook and thus the program
+    # is either not instrumented or it was instrumented on the file system
+    if not configuration.get(constants.importhook.Enabled_Key):
+        return None
+    # cache the compiled code inside of the discover directory, unless the
+    # configuration gave the cache no space and thus disabled it
+    bytecode_cache = None
+    cache_size = configuration.get(
+        constants.importhook.Cache_Size_Key, constants.bytecode.Maximum_Megabytes
+    )
+    if cache_size > 0:
+        bytecode_cache = bytecode.BytecodeCache(
+            Path(configuration["discover_dir"]) / constants.bytecode.Directory,
+            cache_size * constants.bytecode.Bytes_Per_Megabyte,
+        )
+    return install(
+        get_program_directory(configuration),
+        get_instrumentation_types(configuration),
+        bytecode_cache,
+    )
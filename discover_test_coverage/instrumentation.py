@@ -1,6 +1,10 @@
 """Types of instrumentation."""
 
 from enum import Enum
+from typing import Iterable
+from typing import List
+
+from discover_test_coverage import constants
 
 
 class InstrumentationType(str, Enum):
@@ -9,3 +13,38 @@ class InstrumentationType(str, Enum):
     FIXTURE = "fixture"
     FUNCTION = "function"
     BRANCH = "branch"
+    SCHEMA = "schema"
+
+
+class CollectionBackend(str, Enum):
+    """The predefined ways to collect coverage while the test suite runs."""
+
+    CST = "cst"
+    MONITORING = "monitoring"
+
+
+def order_instrumentation_types(
+    instrumentation_types: Iterable[InstrumentationType],
+) -> List[InstrumentationType]:
+    """Order the types of instrumentation and remove any duplicates."""
+    # the order of the types of instrumentation is the order in which they are
+    # declared in the enum, which is the order in which the transformers run
+    requested_types = {
+        InstrumentationType(instrumentation_type)
+        for instrumentation_type in instrumentation_types
+    }
+    return [
+        instrumentation_type
+        for instrumentation_type in InstrumentationType
+        if instrumentation_type in requested_types
+    ]
+
+
+def describe_instrumentation_types(
+    instrumentation_types: Iterable[InstrumentationType],
+) -> str:
+    """Describe the types of instrumentation with a single string like 'function+branch'."""
+    return constants.markers.Plus.join(
+        instrumentation_type.value
+        for instrumentation_type in order_instrumentation_types(instrumentation_types)
+    )
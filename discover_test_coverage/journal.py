@@ -0,0 +1,158 @@
+"""Record each completed unit of work in an append-only journal that survives crashes."""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+from typing import Sequence
+
+from discover_test_coverage import constants
+from discover_test_coverage import file
+from discover_test_coverage import manifest
+from discover_test_coverage import output
+
+# define the type of an entry of the journal, which has the identifier of the
+# unit of work (e.g., a disabled function or a shard), the hash of its inputs,
+# its outcome, and any of the other details of its result
+JournalEntryType = Dict[str, Any]
+
+
+def hash_inputs(*inputs: Any) -> str:
+    """Compute the hash of the inputs of a unit of work."""
+    return hashlib.new(
+        constants.manifest.Hash_Algorithm,
+        json.dumps(inputs, sort_keys=True, default=str).encode(),
+    ).hexdigest()
+
+
+def hash_project(project_directory: Path, exclude_patterns: Sequence[str]) -> str:
+    """Compute the hash of all of the files in a project, which are the inputs of its tests."""
+    return hash_inputs(
+        [
+            (
+                project_file.relative_to(project_directory).as_posix(),
+                manifest.hash_file_contents(project_file),
+            )
+            for project_file in sorted(
+                file.walk_files(
+                    project_directory,
+                    (constants.wildcards.All_Files,),
+                    exclude_patterns,
+                )
+            )
+        ]
+    )
+
+
+def read_entries(journal_file: Path) -> Dict[str, JournalEntryType]:
+    """Read the latest entry of each unit of work in a journal."""
+    entries: Dict[str, JournalEntryType] = {}
+    if not journal_file.exists():
+        return entries
+    with open(journal_file) as journal_lines:
+        for journal_line in journal_lines:
+            # a crash while appending can only leave a partial last line,
+            # which is ignored since its unit of work will run again
+            try:
+                entry = json.loads(journal_line)
+            except ValueError:
+                output.logger.debug(f"Ignoring a partial entry in {journal_file}")
+                continue
+            if isinstance(entry, dict) and constants.journal.Unit_Key in entry:
+                entries[entry[constants.journal.Unit_Key]] = entry
+    return entries
+
+
+def write_entries(journal_file: Path, entries: Iterable[JournalEntryType]) -> None:
+    """Write the entries of a journal, replacing the journal atomically and durably."""
+    temporary_file = journal_file.with_name(
+        journal_file.name + constants.manifest.Temporary
+    )
+    with open(temporary_file, "w") as journal_lines:
+        for entry in entries:
+            journal_lines.write(json.dumps(entry) + constants.markers.Newline)
+        journal_lines.flush()
+        os.fsync(journal_lines.fileno())
+    os.replace(temporary_file, journal_file)
+    # the replacement itself is only durable once the directory is synced;
+    # note that some platforms (e.g., Windows) cannot open or sync a directory
+    # and there the replacement is as durable as the platform makes it
+    try:
+        directory_fd = os.open(journal_file.parent, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(directory_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(directory_fd)
+
+
+class Journal:
+    """Append the completed units of work to a journal, one line for each of them."""
+
+    def __init__(
+        self,
+        journal_file: Path,
+        resume: bool = True,
+        compact_interval: int = constants.journal.Compact_Interval,
+    ):
+        """Open a journal, starting a new one unless the completed units should be kept."""
+        self.journal_file = journal_file
+        self.compact_interval = compact_interval
+        self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+        # the latest entry of each unit of work, which is all that a
+        # compacted journal keeps, and the number of appended lines
+        self.entries = read_entries(journal_file) if resume else {}
+        write_entries(journal_file, self.entries.values())
+        self.appended_count = 0
+        self.journal_lines = open(journal_file, "a")
+
+    def find_completed(self, unit: str, input_hash: str) -> Optional[JournalEntryType]:
+        """Find the entry of a unit of work that completed with the same inputs."""
+        entry = self.entries.get(unit)
+        if entry is None or entry.get(constants.journal.Input_Hash_Key) != input_hash:
+            return None
+        return entry
+
+    def record(self, unit: str, input_hash: str, outcome: str, **details) -> None:
+        """Record a completed unit of work, which is durable once this returns."""
+        entry = {
+            constants.journal.Unit_Key: unit,
+            constants.journal.Input_Hash_Key: input_hash,
+            constants.journal.Outcome_Key: outcome,
+            **details,
+        }
+        # a single write of a whole line followed by a sync means that a crash
+        # either keeps the entry or leaves a partial line that is later ignored
+        self.journal_lines.write(json.dumps(entry) + constants.markers.Newline)
+        self.journal_lines.flush()
+        os.fsync(self.journal_lines.fileno())
+        self.entries[unit] = entry
+        self.appended_count += 1
+        if self.appended_count % self.compact_interval == 0:
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the journal so that it only keeps the latest entry of each unit of work."""
+        self.journal_lines.close()
+        write_entries(self.journal_file, self.entries.values())
+        self.journal_lines = open(self.journal_file, "a")
+
+    def close(self) -> None:
+        """Compact and then close the journal."""
+        self.compact()
+        self.journal_lines.close()
+
+    def __enter__(self) -> "Journal":
+        """Enter a context in which the journal is open."""
+        return self
+
+    def __exit__(self, *exception_details) -> None:
+        """Close the journal when leaving the context."""
+        self.close()
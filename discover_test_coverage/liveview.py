@@ -0,0 +1,109 @@
+"""Summarize the messages that the syslog server receives in a view that redraws at a fixed rate."""
+
+import time
+from collections import deque
+from typing import Deque
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+from typing import Tuple
+
+from rich.console import Group
+from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+
+from discover_test_coverage import constants
+from discover_test_coverage import debug
+
+# define the type of a received message, which has its level and its text
+MessageType = Tuple[debug.DebugLevel, str]
+
+# the levels in order of increasing severity, which is the order of the enum
+LEVELS = list(debug.DebugLevel)
+
+# the style of the messages and the counts of each level
+LEVEL_STYLES = {
+    debug.DebugLevel.DEBUG: "dim",
+    debug.DebugLevel.INFO: "green",
+    debug.DebugLevel.WARNING: "yellow",
+    debug.DebugLevel.ERROR: "red",
+    debug.DebugLevel.CRITICAL: "bold red",
+}
+
+
+class LiveView:
+    """Count the messages of each level and keep a tail of the messages that pass the filters."""
+
+    def __init__(
+        self,
+        minimum_level: debug.DebugLevel = debug.DebugLevel.DEBUG,
+        substring: Optional[str] = None,
+        tail_size: int = constants.liveview.Tail_Size,
+    ):
+        """Construct a LiveView that shows the messages at or above a level with a substring."""
+        self.minimum_level = debug.DebugLevel(minimum_level)
+        self.substring = substring
+        # the counts include all of the messages, even the filtered ones,
+        # while the tail only keeps the latest of the messages that pass
+        self.level_counts: Dict[debug.DebugLevel, int] = {level: 0 for level in LEVELS}
+        self.total = 0
+        self.tail: Deque[MessageType] = deque(maxlen=tail_size)
+        # the times at which the view was drawn and the total at each of them,
+        # which give the rate of the messages over a recent window
+        self.samples: Deque[Tuple[float, int]] = deque()
+
+    def matches(self, level: debug.DebugLevel, message: str) -> bool:
+        """Determine whether a message passes the level and substring filters."""
+        if LEVELS.index(level) < LEVELS.index(self.minimum_level):
+            return False
+        return self.substring is None or self.substring in message
+
+    def add(self, messages: Iterable[MessageType]) -> None:
+        """Count a batch of messages and add the ones that pass the filters to the tail."""
+        for level, message in messages:
+            self.level_counts[level] += 1
+            self.total += 1
+            if self.matches(level, message):
+                self.tail.append((level, message))
+
+    def measure_rate(self, now: float) -> float:
+        """Measure the number of messages per second over the recent window."""
+        self.samples.append((now, self.total))
+        while now - self.samples[0][0] > constants.liveview.Rate_Window:
+            self.samples.popleft()
+        first_time, first_total = self.samples[0]
+        if now <= first_time:
+            return 0.0
+        return (self.total - first_total) / (now - first_time)
+
+    def describe_filters(self) -> str:
+        """Describe the filters of the tail with a single line."""
+        description = f"{self.minimum_level.value} and above"
+        if self.substring is not None:
+            description += f' containing "{self.substring}"'
+        return description
+
+    def render(self, server_summary: str, now: Optional[float] = None) -> Group:
+        """Render the counts, the rate, the summary of the server, and the tail of the messages."""
+        if now is None:
+            now = time.monotonic()
+        # display the counts of the levels as a single row of a table
+        counts_table = Table(box=None, padding=(0, 2))
+        for level in LEVELS:
+            counts_table.add_column(level.value, style=LEVEL_STYLES[level])
+        counts_table.add_row(*[str(self.level_counts[level]) for level in LEVELS])
+        summary = Text(
+            f"{self.measure_rate(now):.0f} messages/s, {server_summary}",
+            style="bold",
+        )
+        # the messages are displayed as text since they can contain markup
+        tail_text = Text()
+        for level, message in self.tail:
+            tail_text.append(message + constants.markers.Newline, LEVEL_STYLES[level])
+        tail_text.rstrip()
+        return Group(
+            counts_table,
+            summary,
+            Panel(tail_text, title=self.describe_filters(), title_align="left"),
+        )
@@ -1,18 +1,29 @@
 """Command-line interface for fortified coverage calculation."""
 
+import json
+import os
 from pathlib import Path
+from typing import List
+from typing import Optional
 
 import typer
 
+from discover_test_coverage import campaign
 from discover_test_coverage import codegenerator
 from discover_test_coverage import configure
 from discover_test_coverage import constants
 from discover_test_coverage import debug
 from discover_test_coverage import file
+from discover_test_coverage import impact
 from discover_test_coverage import instrumentation
+from discover_test_coverage import liveview
+from discover_test_coverage import monitoring
 from discover_test_coverage import output
 from discover_test_coverage import run
 from discover_test_coverage import server
+from discover_test_coverage import shard
+from discover_test_coverage import store
+from discover_test_coverage import telemetry
 from discover_test_coverage import transfer
 from discover_test_coverage import transform
 
@@ -21,12 +32,48 @@ from discover_test_coverage import transform
 app = typer.Typer()
 
 
+def select_impacted_tests(
+    project_directory: Path,
+    tests_directory: Path,
+    test_run_command: str,
+    discover_dir: Path,
+    changed_since: Optional[str],
+    changed_files: List[Path],
+    test_directory_mode: Optional[run.TestDirectoryMode] = None,
+) -> Optional[List[str]]:
+    """Select the tests that changes impact, exiting when there are none to run."""
+    try:
+        test_ids = impact.select_tests(
+            project_directory,
+            tests_directory,
+            test_run_command,
+            discover_dir / constants.store.File,
+            changed_since,
+            changed_files,
+            test_directory_mode,
+        )
+    except ValueError as error:
+        output.console.print(f":person_shrugging: {error}")
+        raise typer.Exit(code=1)
+    # none of the tests could be impacted by the changes and thus there is
+    # no reason to start the test suite at all
+    if test_ids is not None and len(test_ids) == 0:
+        output.console.print(":sparkles: No tests are impacted by the changes")
+        raise typer.Exit()
+    return test_ids
+
+
 def instrument_program(
     project_directory: Path = typer.Option(...),
     program_directory: Path = typer.Option(...),
-    instrumentation_type: instrumentation.InstrumentationType = typer.Option(
-        instrumentation.InstrumentationType.FUNCTION.value
+    instrumentation_types: List[instrumentation.InstrumentationType] = typer.Option(
+        [instrumentation.InstrumentationType.FUNCTION.value], "--instrumentation-type"
     ),
+    backend: instrumentation.CollectionBackend = typer.Option(
+        instrumentation.CollectionBackend.CST.value
+    ),
+    jobs: int = typer.Option(constants.parallel.Default_Jobs, min=1),
+    incremental: bool = typer.Option(True),
     verbose: bool = typer.Option(False),
     debug_level: debug.DebugLevel = typer.Option(debug.DebugLevel.ERROR.value),
     debug_destination: debug.DebugDestination = typer.Option(
@@ -38,7 +85,7 @@ def instrument_program(
     output.setup(debug_level, debug_destination)
     output.logger.debug(f"Instrumenting the project in {project_directory}")
     output.logger.debug(f"Instrumenting program modules in {program_directory}")
-    output.logger.debug(f"Adding instrumentation for {instrumentation_type}")
+    output.logger.debug(f"Adding instrumentation for {instrumentation_types}")
     # display the header
     output.print_header()
     # display details about configuration as
@@ -47,16 +94,40 @@ def instrument_program(
         verbose,
         debug_level=debug_level,
         debug_destination=debug_destination,
-        instrumentation_type=instrumentation_type,
+        instrumentation_types=instrumentation_types,
+        backend=backend,
+        jobs=jobs,
+        incremental=incremental,
         project_directory=project_directory,
         program_directory=program_directory,
     )
-    # instrument all of the files in a program
+    # the test suite's process will collect the coverage with sys.monitoring
+    # and thus there is no need to instrument any of the program's files;
+    # note that older interpreters fall back to the instrumented files
+    if backend == instrumentation.CollectionBackend.MONITORING:
+        if monitoring.is_available():
+            output.console.print(
+                ":sparkles: Skip instrumentation since sys.monitoring collects coverage"
+            )
+            output.print_footer()
+            return
+        output.console.print(
+            ":sparkles: Instrument the program since sys.monitoring is not available"
+        )
+    # instrument all of the files in a program; note that when more than one
+    # type of instrumentation is requested each file is still only parsed once
     transform.transform_files_using_libcst(
         project_directory,
         program_directory,
-        instrumentation_type,
+        instrumentation_types,
         file.find_python_files,
+        jobs,
+        incremental,
+    )
+    # mirror all of the other files in the program (e.g., the data files of a
+    # package) into the hidden directory so that it matches the program's structure
+    transfer.transfer_files(
+        project_directory, program_directory, file.find_files_not_python, incremental
     )
     # display the footer
     output.print_footer()
@@ -66,9 +137,11 @@ def instrument_program(
 def instrument_tests(
     project_directory: Path = typer.Option(...),
     tests_directory: Path = typer.Option(...),
-    instrumentation_type: instrumentation.InstrumentationType = typer.Option(
-        instrumentation.InstrumentationType.FIXTURE.value
+    instrumentation_types: List[instrumentation.InstrumentationType] = typer.Option(
+        [instrumentation.InstrumentationType.FIXTURE.value], "--instrumentation-type"
     ),
+    jobs: int = typer.Option(constants.parallel.Default_Jobs, min=1),
+    incremental: bool = typer.Option(True),
     verbose: bool = typer.Option(False),
     debug_level: debug.DebugLevel = typer.Option(debug.DebugLevel.ERROR.value),
     debug_destination: debug.DebugDestination = typer.Option(
@@ -80,7 +153,7 @@ def instrument_tests(
     output.setup(debug_level, debug_destination)
     output.logger.debug(f"Instrumenting the project in {project_directory}")
     output.logger.debug(f"Instrumenting test files in {tests_directory}")
-    output.logger.debug(f"Adding instrumentation for {instrumentation_type}")
+    output.logger.debug(f"Adding instrumentation for {instrumentation_types}")
     # display the header
     output.print_header()
     # display details about configuration as
@@ -89,10 +162,17 @@ def instrument_tests(
         verbose,
         debug_level=debug_level,
         debug_destination=debug_destination,
-        instrumentation_type=instrumentation_type,
+        instrumentation_types=instrumentation_types,
+        jobs=jobs,
+        incremental=incremental,
         project_directory=project_directory,
         program_directory=tests_directory,
     )
+    # find all of the conftest.py files and all of the other files (e.g., test
+    # cases and their data files) in the test directory during a single walk
+    conftest_files_list, not_conftest_files_list = file.partition_files(
+        project_directory / tests_directory, (constants.wildcards.All_Files,)
+    )
     # instrument all of the conftest.py files in a program; note
     # that these are normally in the tests/ directory but can,
     # in fact, be at any location in a project. The main import
@@ -101,32 +181,38 @@ def instrument_tests(
     transformed_file_count = transform.transform_files_using_libcst(
         project_directory,
         tests_directory,
-        instrumentation_type,
-        file.find_conftest_files,
+        instrumentation_types,
+        file.create_file_finder(conftest_files_list),
+        jobs,
+        incremental,
     )
     # there were no conftest.py files that were found and then
-    # instrumented and thus one needs to be created and then
-    # copied to the hidden directory location for the tests
+    # instrumented and thus one needs to be created in the hidden
+    # directory, which will contain the instrumented conftest.py files
     if transformed_file_count == 0:
         output.console.print(
             ":sparkles: Creating conftest.py file since one does not exist"
         )
+        # the hidden directory is relative to the project directory
+        # since the conftest.py file is created inside of the project
         codegenerator.create_instrumented_conftest_file(
-            project_directory, tests_directory
+            project_directory,
+            file.get_hidden_directory(
+                project_directory, project_directory / tests_directory
+            ).relative_to(project_directory),
         )
     # add a blank line between the status outputs in the console
     # for the two different types of tasks
     output.console.print()
-    # transfer the test from the program's test directory to
-    # the hidden directory that contains the instrumented conftest.py
-    # file (and any other instrumented tests that were needed)
-    transformed_file_count = transfer.transfer_files(
-        project_directory, tests_directory, file.find_python_files
+    # mirror all of the other files from the program's test directory into
+    # the hidden directory that contains the instrumented conftest.py files;
+    # note that these files are linked instead of copied whenever possible
+    transfer.transfer_files(
+        project_directory,
+        tests_directory,
+        file.create_file_finder(not_conftest_files_list),
+        incremental,
     )
-    # delete the conftest.py file that was added to the main tests
-    # directory for the project as it was only placed there to facilitate
-    # easy copying and was not originally a part of the project
-    codegenerator.delete_instrumented_conftest_file(project_directory, tests_directory)
     # display the footer
     output.print_footer()
 
@@ -136,9 +222,17 @@ def test(
     project_directory: Path = typer.Option(...),
     program_directory: Path = typer.Option(...),
     tests_directory: Path = typer.Option(...),
+    discover_dir: Path = typer.Option(
+        configure.Configuration.HOME
+        + configure.Configuration.SEPARATOR
+        + configure.Configuration.DIRECTORY
+    ),
     test_run_command: str = typer.Option(
         run.TestRunCommand.VENV_TEST.value, "--test-run-cmd"
     ),
+    changed_since: Optional[str] = typer.Option(None),
+    changed_files: List[Path] = typer.Option([]),
+    timeouts: bool = typer.Option(False),
     verbose: bool = typer.Option(False),
     debug_level: debug.DebugLevel = typer.Option(debug.DebugLevel.ERROR.value),
     debug_destination: debug.DebugDestination = typer.Option(
@@ -159,13 +253,46 @@ def test(
         debug_level=debug_level,
         debug_destination=debug_destination,
         test_run_command=test_run_command,
+        changed_since=changed_since,
+        changed_files=changed_files,
+        timeouts=timeouts,
         project_directory=project_directory,
         program_directory=program_directory,
+        discover_dir=discover_dir,
     )
+    # when there are changes, only run the tests that covered the changed
+    # code in the coverage of earlier runs and the tests without coverage
+    test_ids = select_impacted_tests(
+        project_directory,
+        tests_directory,
+        test_run_command,
+        discover_dir,
+        changed_since,
+        changed_files,
+    )
+    # when requested, this uninstrumented run is the baseline whose durations
+    # derive the timeouts of the later runs, and thus the plugin records the
+    # duration of each test while stopping the tests that take much longer than
+    # in the last baseline; note that the timeouts are off by default since they
+    # need the plugin, which the environment of the tests might not be able to import
+    timings_file = None
+    if timeouts:
+        timings_file = discover_dir / constants.timing.File
+    # the plugin also deselects the tests that the changes did not impact
+    if timeouts or test_ids is not None:
+        test_run_command = (
+            test_run_command + constants.markers.Space + constants.importhook.Plugin
+        )
     # run the test suite using Pytest without collect coverage information;
     # this run will not use instrumented program and/or test source code
     run.run_test_suite_with_optional_coverage(
-        project_directory, tests_directory, test_run_command, False
+        project_directory,
+        tests_directory,
+        test_run_command,
+        False,
+        test_ids=test_ids,
+        timings_file=timings_file,
+        record_timings=True,
     )
 
 
@@ -182,6 +309,23 @@ def test_coverage(
     test_run_command: str = typer.Option(
         run.TestRunCommand.VENV_TEST.value, "--test-run-cmd"
     ),
+    test_directory_mode: run.TestDirectoryMode = typer.Option(
+        run.TestDirectoryMode.SWAP.value, "--test-dir-mode"
+    ),
+    import_hook: bool = typer.Option(False),
+    backend: instrumentation.CollectionBackend = typer.Option(
+        instrumentation.CollectionBackend.CST.value
+    ),
+    bytecode_cache_megabytes: int = typer.Option(
+        constants.bytecode.Maximum_Megabytes, min=0
+    ),
+    instrumentation_types: List[instrumentation.InstrumentationType] = typer.Option(
+        [instrumentation.InstrumentationType.FUNCTION.value], "--instrumentation-type"
+    ),
+    changed_since: Optional[str] = typer.Option(None),
+    changed_files: List[Path] = typer.Option([]),
+    shards: int = typer.Option(constants.shard.Default_Shards, min=1),
+    telemetry_socket: Optional[Path] = typer.Option(None),
     verbose: bool = typer.Option(False),
     debug_level: debug.DebugLevel = typer.Option(debug.DebugLevel.ERROR.value),
     debug_destination: debug.DebugDestination = typer.Option(
@@ -202,21 +346,67 @@ def test_coverage(
         debug_level=debug_level,
         debug_destination=debug_destination,
         test_run_command=test_run_command,
+        test_directory_mode=test_directory_mode,
+        import_hook=import_hook,
+        backend=backend,
+        bytecode_cache_megabytes=bytecode_cache_megabytes,
+        instrumentation_types=instrumentation_types,
+        changed_since=changed_since,
+        changed_files=changed_files,
+        shards=shards,
+        telemetry_socket=telemetry_socket,
         project_directory=project_directory,
         program_directory=program_directory,
         discover_dir=discover_dir,
     )
+    # when there are changes, only run the tests that covered the changed
+    # code in the coverage of earlier runs and the tests without coverage
+    test_ids = select_impacted_tests(
+        project_directory,
+        tests_directory,
+        test_run_command,
+        discover_dir,
+        changed_since,
+        changed_files,
+        test_directory_mode,
+    )
     # save the configuration of the discover configuration
     # file so as to support configuration between the cli
     # and the executing test suite that will use libdtc
-    configure.save_configuration(
+    configurations = dict(
         debug_level=debug_level,
         debug_destination=debug_destination,
         test_run_command=test_run_command,
-        project_directory=str(project_directory),
+        project_directory=str(project_directory.resolve()),
         program_directory=str(program_directory),
         discover_dir=discover_dir,
+        import_hook=import_hook,
+        backend=backend.value,
+        bytecode_cache_megabytes=bytecode_cache_megabytes,
+        instrumentation_types=[
+            instrumentation_type.value for instrumentation_type in instrumentation_types
+        ],
     )
+    configure.save_configuration(**configurations)
+    # split the tests across shards that run at the same time, each one with
+    # its own configuration and coverage store that are merged once they finish
+    test_shards = None
+    if shards > 1:
+        shard_test_ids = test_ids
+        if shard_test_ids is None:
+            shard_test_ids = run.collect_test_ids(
+                project_directory,
+                tests_directory,
+                test_run_command,
+                test_directory_mode,
+            )
+        # the tests could not be collected (e.g., because of a syntax error)
+        # and thus the whole test suite runs without shards or a selection
+        # so that the error is reported as it always is
+        if len(shard_test_ids) > 0:
+            test_shards = shard.create_test_shards(
+                discover_dir, shard_test_ids, shards, configurations
+            )
     # run the test suite using Pytest while collecting coverage information;
     # this run will use instrumented program and/or test source code because
     # of the fact that the last parameter to function call is True; the
@@ -234,16 +424,167 @@ def test_coverage(
         + constants.markers.Single_Quote
     ).replace("/", "SEP")
     test_run_command_complete = test_run_command + coveragereport_arg
+    # connect the test suite's process to discover through a pytest plugin that
+    # finds the configuration saved above through an environment variable that the
+    # process inherits; the plugin saves the function coverage when the session
+    # finishes and, if requested, instruments the program's modules in memory
+    # as the test suite imports them instead of running them from the hidden
+    # directory that instrument-program created
+    os.environ[constants.importhook.Configuration_Variable] = str(
+        discover_dir / constants.arguments.Discover_Json
+    )
+    # the plugin streams the events of the test suite to a telemetry receiver
+    # that was started with receive-telemetry, when one was requested
+    if telemetry_socket is not None:
+        os.environ[constants.telemetry.Socket_Variable] = str(
+            telemetry_socket.resolve()
+        )
+    test_run_command_complete = (
+        test_run_command_complete
+        + constants.markers.Space
+        + constants.importhook.Plugin
+    )
+    # stop the tests and the runs that take much longer than they did
+    # in the baseline run of the test suite that the test command recorded
     run.run_test_suite_with_optional_coverage(
         project_directory,
         tests_directory,
         test_run_command_complete,
         True,
+        test_directory_mode,
+        test_ids,
+        test_shards,
+        discover_dir / constants.timing.File,
+    )
+    if test_shards is not None:
+        run_id = shard.merge_shard_coverage(
+            discover_dir,
+            [log_file.parent for _, _, log_file in test_shards],
+        )
+        output.console.print(
+            f":sparkles: Merged the coverage of {len(test_shards)} shards into run {run_id}"
+        )
+
+
+@app.command("campaign")
+def run_campaign(
+    project_directory: Path = typer.Option(...),
+    program_directory: Path = typer.Option(...),
+    discover_dir: Path = typer.Option(
+        configure.Configuration.HOME
+        + configure.Configuration.SEPARATOR
+        + configure.Configuration.DIRECTORY
+    ),
+    test_run_command: str = typer.Option(
+        run.TestRunCommand.VENV_TEST.value, "--test-run-cmd"
+    ),
+    jobs: int = typer.Option(os.cpu_count() or constants.parallel.Default_Jobs, min=1),
+    timeout: Optional[float] = typer.Option(None, min=0),
+    select_covering_tests: bool = typer.Option(False),
+    use_schema: bool = typer.Option(False, "--schema"),
+    use_fork_server: bool = typer.Option(False, "--fork-server"),
+    resume: bool = typer.Option(False),
+    verbose: bool = typer.Option(False),
+    debug_level: debug.DebugLevel = typer.Option(debug.DebugLevel.ERROR.value),
+    debug_destination: debug.DebugDestination = typer.Option(
+        debug.DebugDestination.CONSOLE.value, "--debug-dest"
+    ),
+):
+    """Disable each function of the program and run the test suite to see if it notices."""
+    # setup the console and the logger through output module
+    output.setup(debug_level, debug_destination)
+    # display the header
+    output.print_header()
+    # display details about configuration as
+    # long as verbose output was requested
+    output.print_diagnostics(
+        verbose,
+        debug_level=debug_level,
+        debug_destination=debug_destination,
+        test_run_command=test_run_command,
+        jobs=jobs,
+        timeout=timeout,
+        select_covering_tests=select_covering_tests,
+        use_schema=use_schema,
+        use_fork_server=use_fork_server,
+        resume=resume,
+        project_directory=project_directory,
+        program_directory=program_directory,
+        discover_dir=discover_dir,
+    )
+    # run the test suite against each of the disabled functions in a pool of
+    # isolated workspaces, with one test suite running in each workspace;
+    # when requested, each function only runs the tests that called it in
+    # the coverage that the test-coverage command recorded for each test and
+    # a resumed campaign skips the functions that its journal already records
+    try:
+        results, test_count = campaign.run_campaign(
+            project_directory,
+            program_directory,
+            discover_dir,
+            test_run_command,
+            jobs,
+            timeout,
+            select_covering_tests,
+            use_schema,
+            use_fork_server,
+            resume,
+        )
+    except ValueError as error:
+        output.console.print(f":person_shrugging: {error}")
+        raise typer.Exit(code=1)
+    report_file = discover_dir / constants.campaign.Report_File
+    campaign.save_campaign_report(report_file, results, test_count)
+    # display the number of disabled functions with each outcome
+    for outcome, count in campaign.summarize_outcomes(results).items():
+        output.console.print(f"{constants.markers.Indent}{outcome.value}: {count}")
+    if select_covering_tests:
+        output.console.print(
+            f":sparkles: Saved {campaign.count_saved_executions(results, test_count)} "
+            "test executions by only running the covering tests"
+        )
+    output.console.print(
+        f":sparkles: Saved the results of the campaign in {report_file}"
     )
 
 
 @app.command()
-def start_log_server():
+def convert_coverage(
+    input_file: Path = typer.Option(...),
+    output_file: Path = typer.Option(...),
+    run_id: Optional[int] = typer.Option(None, "--run"),
+    label: str = typer.Option(constants.markers.Nothing),
+):
+    """Convert coverage between the JSON report and the indexed coverage store."""
+    # display the header
+    output.print_header()
+    # export a run from the coverage store into a JSON report,
+    # using the latest run when no specific run was requested
+    if output_file.suffix == constants.store.Json_Suffix:
+        with store.CoverageStore(input_file) as coverage_store:
+            if run_id is None:
+                run_id = coverage_store.find_latest_run()
+            if run_id is None:
+                output.console.print(f":person_shrugging: No runs in {input_file}")
+                raise typer.Exit(code=1)
+            coverage_report = store.export_report(coverage_store, run_id)
+        output_file.write_text(json.dumps(coverage_report, indent=2))
+        output.console.print(f":sparkles: Exported run {run_id} to {output_file}")
+    # import a JSON report into the coverage store as a new run
+    else:
+        coverage_report = json.loads(input_file.read_text())
+        with store.CoverageStore(output_file) as coverage_store:
+            run_id = store.import_report(coverage_store, coverage_report, label)
+        output.console.print(f":sparkles: Imported {input_file} as run {run_id}")
+
+
+@app.command()
+def start_log_server(
+    live: bool = typer.Option(False),
+    level: debug.DebugLevel = typer.Option(debug.DebugLevel.DEBUG.value),
+    contains: Optional[str] = typer.Option(None),
+    tail: int = typer.Option(constants.liveview.Tail_Size, min=1),
+):
     """Start the logging server."""
     # display the header
     output.print_header()
@@ -254,5 +595,26 @@ def start_log_server():
     # information from discover-test-coverage
     # and must be started in a separate process
     # before running any sub-command
-    # of the discover-test-coverage tool
-    server.start_syslog_server()
+    # of the discover-test-coverage tool;
+    # the live view redraws the counts and
+    # the tail of the filtered messages at
+    # a fixed rate instead of displaying
+    # each message, while the log file still
+    # receives all of the messages
+    view = None
+    if live:
+        view = liveview.LiveView(level, contains, tail)
+    server.start_syslog_server(view)
+
+
+@app.command()
+def receive_telemetry(
+    socket_path: Path = typer.Option(Path(constants.telemetry.Socket_File)),
+):
+    """Receive and aggregate the events of the test suites that run with telemetry."""
+    # display the header
+    output.print_header()
+    # run the receiver; note that it must be started in a separate
+    # process before running test-coverage with the same socket, and
+    # that the events of all of the shards go to the same receiver
+    telemetry.start_telemetry_receiver(socket_path)
@@ -0,0 +1,195 @@
+"""Track the files in a hidden directory so that unchanged files are reused."""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Tuple
+
+from discover_test_coverage import constants
+from discover_test_coverage import file
+from discover_test_coverage import output
+
+# define the type of a manifest that maps each kind of file (e.g., transferred
+# files or files with a type of instrumentation) and then the path of a file
+# in the hidden directory, relative to that directory, to the details about
+# how the file was created (i.e., its source hash, kind, version, and stamp);
+# note that more than one kind can write the same path (e.g., a conftest.py
+# file in a hidden test directory) and thus each kind keeps its own entries
+ManifestType = Dict[str, Dict[str, Dict[str, str]]]
+
+# define the type of the entries that a run would record in a manifest,
+# mapping each source file to its relative path and its manifest entry
+ManifestEntriesType = Dict[Path, Tuple[str, Dict[str, str]]]
+
+
+def hash_file_contents(source_file: Path) -> str:
+    """Compute the hash of the contents of a file."""
+    return hashlib.new(
+        constants.manifest.Hash_Algorithm, source_file.read_bytes()
+    ).hexdigest()
+
+
+def compute_transformer_version() -> str:
+    """Compute a version that changes whenever the code that instruments files changes."""
+    # hash the source code of all of the modules that create the instrumented
+    # files so that changing any of them will invalidate all of the entries in
+    # a manifest without requiring a developer to remember to update a version
+    package_directory = Path(__file__).parent
+    version_hash = hashlib.new(constants.manifest.Hash_Algorithm)
+    version_hash.update(constants.manifest.Version.encode())
+    for module_name in constants.manifest.Versioned_Modules:
+        for module_file in sorted(package_directory.glob(module_name)):
+            version_hash.update(module_file.read_bytes())
+    return version_hash.hexdigest()
+
+
+def load_manifest(hidden_directory: Path) -> ManifestType:
+    """Load the manifest in a hidden directory, returning an empty one when unavailable."""
+    manifest_file = hidden_directory / constants.manifest.File
+    # there is no manifest and thus every file will need to be created
+    if not manifest_file.exists():
+        return {}
+    # a manifest that cannot be read is treated as an empty manifest so
+    # that all of the files are created again instead of crashing the run
+    try:
+        manifest = json.loads(manifest_file.read_text())
+    except (OSError, ValueError):
+        output.logger.debug(f"Ignoring the unreadable manifest: {manifest_file}")
+        return {}
+    # a manifest in an earlier format, with one entry for each path, is
+    # treated as an empty manifest so that all of the files are created again
+    if not isinstance(manifest, dict) or not all(
+        isinstance(kind_entries, dict)
+        and all(isinstance(entry, dict) for entry in kind_entries.values())
+        for kind_entries in manifest.values()
+    ):
+        return {}
+    return manifest
+
+
+def save_manifest(hidden_directory: Path, manifest: ManifestType) -> None:
+    """Save the manifest in a hidden directory, replacing the old one atomically."""
+    manifest_file = hidden_directory / constants.manifest.File
+    # write to a temporary file and then replace the manifest so that an
+    # interrupted run can never leave behind a partially written manifest
+    temporary_manifest_file = manifest_file.with_suffix(constants.manifest.Temporary)
+    temporary_manifest_file.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(temporary_manifest_file, manifest_file)
+
+
+def create_manifest_entry(source_hash: str, kind: str, version: str) -> Dict[str, str]:
+    """Create an entry of a manifest for a file in a hidden directory."""
+    return {"source_hash": source_hash, "kind": kind, "version": version}
+
+
+def compute_stamp(hidden_file: Path) -> str:
+    """Compute a stamp of a file in a hidden directory that changes whenever it is written."""
+    try:
+        file_status = hidden_file.stat()
+    except OSError:
+        return constants.markers.Empty
+    return f"{file_status.st_size}:{file_status.st_mtime_ns}"
+
+
+def record_entry(
+    manifest: ManifestType,
+    hidden_directory: Path,
+    relative_path: str,
+    entry: Dict[str, str],
+) -> None:
+    """Record the entry of a file in a hidden directory once the file was written."""
+    # the stamp of the written file tells whether another kind of file
+    # overwrote it later, in which case the entry is no longer current
+    manifest.setdefault(entry["kind"], {})[relative_path] = {
+        **entry,
+        constants.manifest.Stamp_Key: compute_stamp(hidden_directory / relative_path),
+    }
+
+
+def is_entry_current(
+    manifest: ManifestType,
+    hidden_directory: Path,
+    relative_path: str,
+    entry: Dict[str, str],
+) -> bool:
+    """Determine if a file in the hidden directory was already created from the same source."""
+    # the file can only be reused when the manifest records the exact same
+    # details for it and the file was neither deleted nor overwritten since
+    recorded_entry = dict(manifest.get(entry["kind"], {}).get(relative_path, {}))
+    recorded_stamp = recorded_entry.pop(constants.manifest.Stamp_Key, None)
+    return recorded_entry == entry and recorded_stamp == compute_stamp(
+        hidden_directory / relative_path
+    )
+
+
+def find_current_entry(
+    manifest: ManifestType, hidden_directory: Path, relative_path: str
+) -> Dict[str, str]:
+    """Find the entry of the kind that wrote the current contents of a file, if any."""
+    stamp = compute_stamp(hidden_directory / relative_path)
+    for kind_entries in manifest.values():
+        entry = kind_entries.get(relative_path)
+        if entry is not None and entry.get(constants.manifest.Stamp_Key) == stamp:
+            return entry
+    return {}
+
+
+def find_changed_files(
+    manifest: ManifestType,
+    hidden_directory: Path,
+    directory: Path,
+    source_files_list: List[Path],
+    kind: str,
+    version: str,
+) -> Tuple[List[Path], ManifestEntriesType]:
+    """Find the source files that are new or changed since the manifest was saved."""
+    changed_source_files_list = []
+    manifest_entries: ManifestEntriesType = {}
+    for source_file in source_files_list:
+        # determine the path of the file in the hidden directory, relative to
+        # the hidden directory so that the manifest can be relocated with it
+        relative_path = str(
+            file.get_hidden_file(hidden_directory, directory, source_file).relative_to(
+                hidden_directory
+            )
+        )
+        # create the entry that describes the file that would be created now
+        entry = create_manifest_entry(hash_file_contents(source_file), kind, version)
+        manifest_entries[source_file] = (relative_path, entry)
+        # the source file is new or changed when its entry is not current
+        if not is_entry_current(manifest, hidden_directory, relative_path, entry):
+            changed_source_files_list.append(source_file)
+    return changed_source_files_list, manifest_entries
+
+
+def remove_stale_entries(
+    manifest: ManifestType,
+    hidden_directory: Path,
+    kind: str,
+    current_relative_paths: Iterable[str],
+) -> int:
+    """Remove the files of a kind whose source files no longer exist."""
+    current_relative_paths_set = set(current_relative_paths)
+    # only consider the entries of the same kind since more than one kind of
+    # file (e.g., instrumented and transferred files) can share a directory
+    kind_entries = manifest.get(kind, {})
+    stale_relative_paths = [
+        relative_path
+        for relative_path in kind_entries
+        if relative_path not in current_relative_paths_set
+    ]
+    # delete both the entry and the file in the hidden directory, unless
+    # another kind of file overwrote the file after this kind created it
+    for relative_path in stale_relative_paths:
+        hidden_file = hidden_directory / relative_path
+        if kind_entries[relative_path].get(
+            constants.manifest.Stamp_Key
+        ) == compute_stamp(hidden_file):
+            output.logger.debug(f"Removing the stale file: {relative_path}")
+            hidden_file.unlink(missing_ok=True)
+        del kind_entries[relative_path]
+    return len(stale_relative_paths)
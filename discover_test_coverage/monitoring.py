@@ -0,0 +1,304 @@
+"""Collect coverage with sys.monitoring instead of instrumenting the source code."""
+
+import inspect
+import os
+import sys
+from array import array
+from pathlib import Path
+from types import CodeType
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+
+from discover_test_coverage import constants
+from discover_test_coverage import instrumentation
+from discover_test_coverage import output
+from discover_test_coverage import recorder
+from discover_test_coverage import store
+
+
+def is_available() -> bool:
+    """Determine if the running interpreter supports sys.monitoring (PEP 669)."""
+    return hasattr(sys, constants.monitoring.Module)
+
+
+def get_function_name(code: CodeType) -> Optional[str]:
+    """Get the canonical name of the function of a code object, if it is a function."""
+    # the functions have the same names as the ones that the function coverage
+    # transformer creates, which do not include the "<locals>" of nested functions;
+    # note that modules, classes, lambdas, and comprehensions are not functions
+    # and that only the code of a function has optimized local variables
+    if code.co_name.startswith(constants.monitoring.Generated_Prefix) or not (
+        code.co_flags & inspect.CO_OPTIMIZED
+    ):
+        return None
+    qualified_name = getattr(code, "co_qualname", code.co_name)
+    return constants.markers.Dot.join(
+        name
+        for name in qualified_name.split(constants.markers.Dot)
+        if name != constants.monitoring.Locals
+    )
+
+
+def find_line(code: CodeType, instruction_offset: int) -> Optional[int]:
+    """Find the line of the source code that contains an instruction."""
+    for start, end, line in code.co_lines():
+        if start <= instruction_offset < end:
+            return line
+    return None
+
+
+class MonitoringCollector:
+    """Collect function and branch coverage through the events of sys.monitoring."""
+
+    def __init__(
+        self,
+        program_directory: Path,
+        instrumentation_types: Sequence[instrumentation.InstrumentationType],
+    ):
+        """Construct a MonitoringCollector for the modules in a program's directory."""
+        self.program_directory = str(Path(program_directory).resolve()) + os.sep
+        self.instrumentation_types = instrumentation.order_instrumentation_types(
+            instrumentation_types
+        )
+        # remember whether each file is part of the program so
+        # that each file name is only checked one time
+        self.program_files: Dict[str, bool] = {}
+        # the functions that started; note that each function is disabled
+        # after its first event and thus this records whether a function
+        # was called instead of how often it was called
+        self.started_functions: Set[CodeType] = set()
+        # the destinations of each branch that were taken, keyed by the code
+        # object and the offset of the branch's instruction
+        self.taken_branches: Dict[Tuple[CodeType, int], Set[int]] = {}
+        # the functions and the branches of the context (e.g., the test case) that
+        # is running, since the events are restarted at the start of each context
+        self.context_functions: Set[CodeType] = set()
+        self.context_branches: Dict[Tuple[CodeType, int], Set[int]] = {}
+        # the name, the functions, and the branches of each context that was taken
+        self.contexts: List[
+            Tuple[str, Set[CodeType], Dict[Tuple[CodeType, int], Set[int]]]
+        ] = []
+        # the functions and the branches of the contexts without a name
+        self.unattributed_functions: Set[CodeType] = set()
+        self.unattributed_branches: Dict[Tuple[CodeType, int], Set[int]] = {}
+
+    def is_program_code(self, code: CodeType) -> bool:
+        """Determine if a code object comes from a file inside of the program."""
+        filename = code.co_filename
+        is_program_file = self.program_files.get(filename)
+        if is_program_file is None:
+            is_program_file = os.path.abspath(filename).startswith(
+                self.program_directory
+            )
+            self.program_files[filename] = is_program_file
+        return is_program_file
+
+    def on_py_start(self, code: CodeType, instruction_offset: int):
+        """Record that a function of the program started and then stop monitoring it."""
+        if self.is_program_code(code):
+            self.started_functions.add(code)
+            self.context_functions.add(code)
+        # disabling the event makes every later call to this function
+        # run without any monitoring overhead at all
+        return sys.monitoring.DISABLE  # type: ignore[attr-defined]
+
+    def on_branch(
+        self, code: CodeType, instruction_offset: int, destination_offset: int
+    ):
+        """Record that a branch of the program was taken, stopping once both arms are seen."""
+        if not self.is_program_code(code):
+            return sys.monitoring.DISABLE  # type: ignore[attr-defined]
+        self.taken_branches.setdefault((code, instruction_offset), set()).add(
+            destination_offset
+        )
+        destinations = self.context_branches.setdefault(
+            (code, instruction_offset), set()
+        )
+        destinations.add(destination_offset)
+        # disabling a branch event disables both of its arms and thus a branch
+        # can only be disabled after both of its destinations were taken
+        if len(destinations) >= constants.monitoring.Branch_Arms:
+            return sys.monitoring.DISABLE  # type: ignore[attr-defined]
+        return None
+
+    def start(self) -> None:
+        """Start receiving the events of sys.monitoring for the requested coverage."""
+        monitoring = sys.monitoring  # type: ignore[attr-defined]
+        tool_id = monitoring.COVERAGE_ID
+        monitoring.use_tool_id(tool_id, constants.discover.Name)
+        events = 0
+        if instrumentation.InstrumentationType.FUNCTION in self.instrumentation_types:
+            monitoring.register_callback(
+                tool_id, monitoring.events.PY_START, self.on_py_start
+            )
+            events |= monitoring.events.PY_START
+        if instrumentation.InstrumentationType.BRANCH in self.instrumentation_types:
+            monitoring.register_callback(
+                tool_id, monitoring.events.BRANCH, self.on_branch
+            )
+            events |= monitoring.events.BRANCH
+        monitoring.set_events(tool_id, events)
+        output.logger.debug(f"Started monitoring the program: {self.program_directory}")
+
+    def stop(self) -> None:
+        """Stop receiving the events of sys.monitoring and release the tool."""
+        monitoring = sys.monitoring  # type: ignore[attr-defined]
+        tool_id = monitoring.COVERAGE_ID
+        monitoring.set_events(tool_id, monitoring.events.NO_EVENTS)
+        monitoring.register_callback(tool_id, monitoring.events.PY_START, None)
+        monitoring.register_callback(tool_id, monitoring.events.BRANCH, None)
+        monitoring.free_tool_id(tool_id)
+
+    def take_context(self, context_name: Optional[str]) -> None:
+        """Finish the current context, naming it, and then restart the disabled events."""
+        # a context without a name (e.g., the code that runs between the test
+        # cases) still counts towards the coverage of the whole run and it is
+        # recorded as the unattributed context, which any test case can depend on
+        if context_name is not None:
+            self.contexts.append(
+                (context_name, self.context_functions, self.context_branches)
+            )
+        else:
+            self.unattributed_functions.update(self.context_functions)
+            for branch, destinations in self.context_branches.items():
+                self.unattributed_branches.setdefault(branch, set()).update(
+                    destinations
+                )
+        self.context_functions = set()
+        self.context_branches = {}
+        # the events were disabled after their first hit and thus they must be
+        # restarted so that the next context records the locations that it hits
+        sys.monitoring.restart_events()  # type: ignore[attr-defined]
+
+    def find_module_names(self) -> Dict[str, str]:
+        """Map the file of each imported module in the program to the module's name."""
+        module_names = {}
+        for module_name, module in list(sys.modules.items()):
+            module_file = getattr(module, "__file__", None)
+            if module_file is not None:
+                module_names[os.path.abspath(module_file)] = module_name
+        return module_names
+
+    def describe_function(
+        self, code: CodeType, module_names: Dict[str, str]
+    ) -> Optional[Tuple[str, str]]:
+        """Describe a function with the name of its module and its own name."""
+        function_name = get_function_name(code)
+        module_name = module_names.get(os.path.abspath(code.co_filename))
+        if function_name is None or module_name is None:
+            return None
+        return module_name, function_name
+
+    def describe_branch(
+        self,
+        code: CodeType,
+        instruction_offset: int,
+        destination_offset: int,
+        module_names: Dict[str, str],
+    ) -> Optional[Tuple[str, str]]:
+        """Describe a branch with the name of its module and the lines of its arm."""
+        # the events only reveal the branches that were taken, which are
+        # named by the lines of the branch and of its destination since the
+        # arms that the branch coverage transformer names do not exist
+        module_name = module_names.get(os.path.abspath(code.co_filename))
+        if module_name is None:
+            return None
+        scope = get_function_name(code) or constants.code.Module_Scope
+        branch_name = constants.markers.Colon.join(
+            (
+                scope,
+                f"{find_line(code, instruction_offset)}"
+                f"{constants.monitoring.Arrow}"
+                f"{find_line(code, destination_offset)}",
+            )
+        )
+        return module_name, branch_name
+
+    def describe_branches(
+        self,
+        branches: Dict[Tuple[CodeType, int], Set[int]],
+        module_names: Dict[str, str],
+    ) -> List[Tuple[str, str]]:
+        """Describe each of the taken arms of the branches, in the order of the source code."""
+        descriptions = []
+        for code, instruction_offset, destination_offset in sorted(
+            (
+                (code, instruction_offset, destination_offset)
+                for (code, instruction_offset), destinations in branches.items()
+                for destination_offset in destinations
+            ),
+            key=lambda branch: (branch[0].co_firstlineno, branch[1], branch[2]),
+        ):
+            description = self.describe_branch(
+                code, instruction_offset, destination_offset, module_names
+            )
+            if description is not None:
+                descriptions.append(description)
+        return descriptions
+
+    def record(self) -> List[store.ContextType]:
+        """Record the collected coverage in the recorder, returning the contexts."""
+        module_names = self.find_module_names()
+        function_coverage: Dict[str, Dict[str, int]] = {}
+        for code in sorted(
+            self.started_functions, key=lambda code: code.co_firstlineno
+        ):
+            description = self.describe_function(code, module_names)
+            if description is not None:
+                module_name, function_name = description
+                names = function_coverage.setdefault(module_name, {})
+                names.setdefault(function_name, len(names))
+        # the events only reveal the functions that were called, which
+        # are each recorded as a single call to the function
+        for module_name, function_names in function_coverage.items():
+            hits = recorder.register(module_name, list(function_names))
+            hits[:] = array(hits.typecode, [1] * len(function_names))
+        branch_coverage: Dict[str, Dict[str, int]] = {}
+        for module_name, branch_name in self.describe_branches(
+            self.taken_branches, module_names
+        ):
+            names = branch_coverage.setdefault(module_name, {})
+            names.setdefault(branch_name, len(names))
+        for module_name, branch_names in branch_coverage.items():
+            bits = recorder.register_branches(module_name, list(branch_names))
+            bits[:] = bytes([1] * len(branch_names))
+        # convert the functions and the branches of each context into
+        # their positions in the names that were just registered
+        contexts = []
+        taken_contexts = list(self.contexts)
+        if len(self.unattributed_functions) > 0 or len(self.unattributed_branches) > 0:
+            taken_contexts.append(
+                (
+                    constants.store.Unattributed_Context,
+                    self.unattributed_functions,
+                    self.unattributed_branches,
+                )
+            )
+        for context_name, context_functions, context_branches in taken_contexts:
+            function_positions: Dict[str, Set[int]] = {}
+            for code in context_functions:
+                description = self.describe_function(code, module_names)
+                if description is not None:
+                    module_name, function_name = description
+                    function_positions.setdefault(module_name, set()).add(
+                        function_coverage[module_name][function_name]
+                    )
+            branch_positions: Dict[str, Set[int]] = {}
+            for module_name, branch_name in self.describe_branches(
+                context_branches, module_names
+            ):
+                branch_positions.setdefault(module_name, set()).add(
+                    branch_coverage[module_name][branch_name]
+                )
+            contexts.append(
+                (
+                    context_name,
+                    {name: sorted(value) for name, value in function_positions.items()},
+                    {name: sorted(value) for name, value in branch_positions.items()},
+                )
+            )
+        return contexts
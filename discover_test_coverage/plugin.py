@@ -0,0 +1,268 @@
+"""Connect discover to the process that runs the program's test suite."""
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import pytest
+
+from discover_test_coverage import configure
+from discover_test_coverage import constants
+from discover_test_coverage import importhook
+from discover_test_coverage import instrumentation
+from discover_test_coverage import monitoring
+from discover_test_coverage import recorder
+from discover_test_coverage import selection
+from discover_test_coverage import store
+from discover_test_coverage import telemetry
+from discover_test_coverage import timing
+
+# the configuration that the discover command saved before running the tests
+configuration: Dict = {}
+
+# the collector of coverage when it is collected with sys.monitoring
+collector: Optional[monitoring.MonitoringCollector] = None
+
+# the coverage of each test case, which is buffered until the session finishes
+# as the compressed positions of the probes that each test case actually hit
+contexts: List[store.ContextType] = []
+
+# the positions of the probes that were hit outside of any test case (e.g.,
+# while the test suite was collected), which any of the test cases can depend on
+unattributed_function_positions: recorder.ContextPositionsType = {}
+unattributed_branch_positions: recorder.ContextPositionsType = {}
+
+# the number of seconds that each test case took to run, which balances the
+# test cases across the shards of later runs that run the test suite in parallel
+durations: Dict[str, float] = {}
+
+# the duration of each test case in the baseline run, from which the timeout
+# of each test case is derived, and the file in which to record the durations
+baseline_durations: Dict[str, float] = {}
+timings_file: Optional[Path] = None
+
+# the plugin of pytest that captures the output of the test cases
+capture_manager = None
+
+# the sender of the events that a telemetry receiver aggregates while the
+# tests run, which only queues the events so that it never blocks a test case
+telemetry_sender: Optional[telemetry.TelemetrySender] = None
+
+
+def start_collection(
+    configuration: Dict,
+) -> Optional[monitoring.MonitoringCollector]:
+    """Start collecting coverage with the backend that the configuration requested."""
+    if (
+        configuration.get(constants.importhook.Backend_Key)
+        == instrumentation.CollectionBackend.MONITORING.value
+    ):
+        # collect the coverage with the events of sys.monitoring, which
+        # does not need any of the program's source code to be changed
+        if monitoring.is_available():
+            monitoring_collector = monitoring.MonitoringCollector(
+                importhook.get_program_directory(configuration),
+                importhook.get_instrumentation_types(configuration),
+            )
+            monitoring_collector.start()
+            return monitoring_collector
+        # this interpreter does not support sys.monitoring and thus
+        # the program's modules are instrumented while they are imported
+        configuration = {**configuration, constants.importhook.Enabled_Key: True}
+    importhook.install_from_configuration(configuration)
+    return None
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_load_initial_conftests(early_config, parser, args) -> None:
+    """Install the import hook before pytest imports any of the program's modules."""
+    global configuration, collector
+    # the conftest.py files can import the program's modules and thus the
+    # collection starts before pytest loads them, which a plugin that is
+    # loaded with -p can do since its hooks are registered before then
+    configuration_file = os.environ.get(constants.importhook.Configuration_Variable)
+    if configuration_file is None:
+        return
+    configuration = configure.load_configuration(Path(configuration_file))
+    collector = start_collection(configuration)
+
+
+def pytest_configure(config) -> None:
+    """Read the timings and connect the telemetry before any of the tests run."""
+    global baseline_durations, timings_file, capture_manager, telemetry_sender
+    capture_manager = config.pluginmanager.getplugin("capturemanager")
+    telemetry_sender = telemetry.connect_sender(
+        os.environ.get(constants.telemetry.Socket_Variable)
+    )
+    # the discover command asks for timeouts and for recording the durations of
+    # the test cases in the environment too, even when it collects no coverage
+    baseline_timings_file = os.environ.get(constants.timing.Timings_Variable)
+    if baseline_timings_file is not None:
+        baseline_durations = timing.load_timings(Path(baseline_timings_file))
+    record_timings_file = os.environ.get(constants.timing.Record_Variable)
+    if record_timings_file is not None:
+        timings_file = Path(record_timings_file)
+
+
+def pytest_collection_modifyitems(session, config, items) -> None:
+    """Deselect the tests that are not in the selection that the discover command saved."""
+    # the discover command passes the selected tests in a file instead of on the
+    # command line, which has a limit on its length that thousands of tests exceed
+    selection_file = os.environ.get(constants.selection.Variable)
+    if selection_file is None:
+        return
+    selected_items = selection.select_items(
+        items, selection.load_selection(Path(selection_file))
+    )
+    selected_item_ids = {id(item) for item in selected_items}
+    deselected_items = [item for item in items if id(item) not in selected_item_ids]
+    if len(deselected_items) > 0:
+        config.hook.pytest_deselected(items=deselected_items)
+    items[:] = selected_items
+
+
+def pytest_collection_finish(session) -> None:
+    """Save the node identifiers of the collected tests that the discover command asked for."""
+    collection_file = os.environ.get(constants.selection.Collection_Variable)
+    if collection_file is not None:
+        selection.save_selection(
+            Path(collection_file), [item.nodeid for item in session.items]
+        )
+
+
+def take_context(context_name: Optional[str]) -> None:
+    """Take the coverage since the last context, keeping it when the context has a name."""
+    if collector is not None:
+        collector.take_context(context_name)
+        return
+    function_positions, branch_positions = recorder.take_context()
+    if context_name is not None:
+        contexts.append((context_name, function_positions, branch_positions))
+        send_probe_hits(telemetry.EventType.FUNCTION_HITS, function_positions)
+        send_probe_hits(telemetry.EventType.BRANCH_HITS, branch_positions)
+    else:
+        recorder.merge_positions(unattributed_function_positions, function_positions)
+        recorder.merge_positions(unattributed_branch_positions, branch_positions)
+
+
+def send_probe_hits(
+    event_type: telemetry.EventType, positions: recorder.ContextPositionsType
+) -> None:
+    """Send the positions of the probes that a test case hit in each module."""
+    if telemetry_sender is not None:
+        for module_name, module_positions in positions.items():
+            telemetry_sender.send(
+                telemetry.encode_probe_hits(event_type, module_name, module_positions)
+            )
+
+
+def save_durations() -> None:
+    """Save the durations of the test cases that finished, if the run records them."""
+    # the durations of a baseline run replace the earlier durations of the
+    # same test cases, keeping the durations of the test cases that did not run
+    if timings_file is not None:
+        timing.save_timings(
+            timings_file, {**timing.load_timings(timings_file), **durations}
+        )
+
+
+def stop_test_suite(test_id: str) -> None:
+    """Stop the whole test suite since a test case ran for longer than its timeout."""
+    # the test case could be stuck anywhere (e.g., in an infinite loop) and
+    # thus the process exits right away, with an exit code that tells the
+    # discover command to stop the processes that the test case started; note
+    # that the message is only visible when the output is no longer captured
+    # and that a baseline run first saves the durations of the finished test
+    # cases since exiting right away skips the end of the test session
+    save_durations()
+    if capture_manager is not None:
+        capture_manager.suspend_global_capture()
+    sys.stderr.write(f"{test_id} ran for longer than its {constants.timing.Outcome}\n")
+    sys.stderr.flush()
+    os._exit(constants.timing.Exit_Code)
+
+
+def start_watchdog(test_id: str) -> Optional[threading.Timer]:
+    """Start a timer that stops the test suite when a test case runs for too long."""
+    # a test case without a baseline duration (e.g., a new test case)
+    # is only limited by the timeout of the whole run of the test suite
+    if test_id not in baseline_durations:
+        return None
+    watchdog = threading.Timer(
+        timing.compute_test_timeout(baseline_durations[test_id]),
+        stop_test_suite,
+        args=(test_id,),
+    )
+    watchdog.daemon = True
+    watchdog.start()
+    return watchdog
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    """Record the coverage of a test case, including its setup and its teardown."""
+    watchdog = start_watchdog(item.nodeid)
+    # the coverage of the code that ran between the test cases (e.g., the
+    # collection of the test suite) only counts towards the coverage of the run
+    if configuration:
+        take_context(None)
+    if telemetry_sender is not None:
+        telemetry_sender.send(telemetry.encode_test_start(item.nodeid))
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        if watchdog is not None:
+            watchdog.cancel()
+    durations[item.nodeid] = time.perf_counter() - start_time
+    if configuration:
+        take_context(item.nodeid)
+    if telemetry_sender is not None:
+        telemetry_sender.send(
+            telemetry.encode_test_end(item.nodeid, durations[item.nodeid])
+        )
+
+
+def pytest_sessionfinish(session, exitstatus) -> None:
+    """Save the counters of the instrumented functions once the test session finishes."""
+    save_durations()
+    # the code that ran after the last test case is not part of any test case
+    if configuration:
+        take_context(None)
+    # the coverage that sys.monitoring collected is recorded in the same
+    # counters and bitmaps as the instrumentation so that the report is the same
+    if collector is not None:
+        collector.stop()
+        contexts.extend(collector.record())
+    elif len(unattributed_function_positions) > 0 or (
+        len(unattributed_branch_positions) > 0
+    ):
+        contexts.append(
+            (
+                constants.store.Unattributed_Context,
+                unattributed_function_positions,
+                unattributed_branch_positions,
+            )
+        )
+    # the counters are only written once, at the end of the session,
+    # so that counting a call to a function never performs any I/O
+    if constants.store.Key in configuration:
+        with store.CoverageStore(Path(configuration[constants.store.Key])) as coverage:
+            coverage.add_run(
+                recorder.get_function_totals(),
+                recorder.get_branch_totals(),
+                contexts=contexts,
+                durations=durations,
+            )
+
+
+def pytest_unconfigure(config) -> None:
+    """Remove the import hook after pytest finishes running the test suite."""
+    importhook.uninstall()
+    if telemetry_sender is not None:
+        telemetry_sender.close()
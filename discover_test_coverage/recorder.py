@@ -0,0 +1,176 @@
+"""Record the calls to the instrumented functions and the arms of the instrumented branches."""
+
+from array import array
+from typing import Dict
+from typing import List
+from typing import Sequence
+from typing import Tuple
+
+from discover_test_coverage import constants
+
+# the names of the functions and their counters for each registered module;
+# note that the instrumentation assigns each function a dense integer ID that
+# is both the position of its name and the position of its counter, so that
+# calling a function only costs one indexed increment of a preallocated array
+registered_modules: Dict[str, Tuple[Tuple[str, ...], array]] = {}
+
+# the names of the branch arms and their bitmap for each registered module,
+# where an arm is recorded by setting its byte to one, which is a single
+# indexed store that never grows the bitmap or calls a Python function
+registered_branch_modules: Dict[str, Tuple[Tuple[str, ...], bytearray]] = {}
+
+# the counters and bitmaps that accumulate the hits of the contexts that were
+# already taken, since taking a context moves its hits out of the live ones
+accumulated_modules: Dict[str, array] = {}
+accumulated_branch_modules: Dict[str, bytearray] = {}
+
+# define the type of the positions of the probes that were hit in a context,
+# mapping the name of each module to the sorted positions of its probes
+ContextPositionsType = Dict[str, List[int]]
+
+
+def create_counters(length: int) -> array:
+    """Create the specified number of counters that all start at zero."""
+    hits = array(constants.recorder.Counter_Type)
+    hits.frombytes(bytes(hits.itemsize * length))
+    return hits
+
+
+def register(module_name: str, function_names: Sequence[str]) -> array:
+    """Register the functions of an instrumented module and return their counters."""
+    function_names = tuple(function_names)
+    # a module that is imported again (e.g., because it was reloaded)
+    # keeps counting in the same counters when its functions did not change
+    if module_name in registered_modules:
+        registered_function_names, hits = registered_modules[module_name]
+        if registered_function_names == function_names:
+            return hits
+    # preallocate a zeroed counter for each of the functions in the module
+    hits = create_counters(len(function_names))
+    registered_modules[module_name] = (function_names, hits)
+    accumulated_modules.pop(module_name, None)
+    return hits
+
+
+def register_branches(module_name: str, branch_names: Sequence[str]) -> bytearray:
+    """Register the branch arms of an instrumented module and return their bitmap."""
+    branch_names = tuple(branch_names)
+    # a module that is imported again keeps recording in the same
+    # bitmap when its branch arms did not change
+    if module_name in registered_branch_modules:
+        registered_branch_names, bits = registered_branch_modules[module_name]
+        if registered_branch_names == branch_names:
+            return bits
+    bits = bytearray(len(branch_names))
+    registered_branch_modules[module_name] = (branch_names, bits)
+    accumulated_branch_modules.pop(module_name, None)
+    return bits
+
+
+def take_context() -> Tuple[ContextPositionsType, ContextPositionsType]:
+    """Take the probes that were hit since the last context, moving their hits to the totals."""
+    function_positions: ContextPositionsType = {}
+    for module_name, (_, hits) in registered_modules.items():
+        # skip the modules without any hits using a comparison in C so
+        # that the cost of a context mostly depends on the modules it hit
+        hits_bytes = hits.tobytes()
+        if hits_bytes.count(0) == len(hits_bytes):
+            continue
+        accumulated = accumulated_modules.setdefault(
+            module_name, create_counters(len(hits))
+        )
+        positions = []
+        for position, count in enumerate(hits):
+            if count:
+                positions.append(position)
+                accumulated[position] += count
+        function_positions[module_name] = positions
+        hits[:] = create_counters(len(hits))
+    branch_positions: ContextPositionsType = {}
+    for module_name, (_, bits) in registered_branch_modules.items():
+        position = bits.find(1)
+        if position == -1:
+            continue
+        accumulated_bits = accumulated_branch_modules.setdefault(
+            module_name, bytearray(len(bits))
+        )
+        positions = []
+        # find each of the set bytes in C instead of checking every byte
+        while position != -1:
+            positions.append(position)
+            accumulated_bits[position] = 1
+            position = bits.find(1, position + 1)
+        branch_positions[module_name] = positions
+        bits[:] = bytes(len(bits))
+    return function_positions, branch_positions
+
+
+def merge_positions(
+    merged_positions: ContextPositionsType, positions: ContextPositionsType
+) -> None:
+    """Merge the positions of the probes that a context hit into the merged positions."""
+    for module_name, module_positions in positions.items():
+        merged_positions[module_name] = sorted(
+            set(merged_positions.get(module_name, ())).union(module_positions)
+        )
+
+
+def get_function_totals() -> Dict[str, Tuple[Tuple[str, ...], array]]:
+    """Get the counters of the functions, including the ones of the contexts that were taken."""
+    function_totals = {}
+    for module_name, (function_names, hits) in registered_modules.items():
+        totals = array(hits.typecode, hits)
+        for position, count in enumerate(accumulated_modules.get(module_name, ())):
+            totals[position] += count
+        function_totals[module_name] = (function_names, totals)
+    return function_totals
+
+
+def get_branch_totals() -> Dict[str, Tuple[Tuple[str, ...], bytearray]]:
+    """Get the bitmaps of the branches, including the ones of the contexts that were taken."""
+    branch_totals = {}
+    for module_name, (branch_names, bits) in registered_branch_modules.items():
+        totals = bytearray(bits)
+        for position, bit in enumerate(accumulated_branch_modules.get(module_name, ())):
+            totals[position] |= bit
+        branch_totals[module_name] = (branch_names, totals)
+    return branch_totals
+
+
+def sum_counts(names: Sequence[str], counts: Sequence[int]) -> Dict[str, int]:
+    """Sum the counts of each name, including the ones of the names that repeat."""
+    # a module can define several functions with the same qualified name
+    # (e.g., the getter and the setter of a property), which share a name in
+    # the report and thus count all of the calls to any of those functions
+    summed_counts: Dict[str, int] = {}
+    for name, count in zip(names, counts):
+        summed_counts[name] = summed_counts.get(name, 0) + count
+    return summed_counts
+
+
+def collect() -> Dict[str, Dict[str, int]]:
+    """Collect the number of calls to each function, organized by module."""
+    return {
+        module_name: sum_counts(function_names, hits)
+        for module_name, (function_names, hits) in sorted(get_function_totals().items())
+    }
+
+
+def collect_branches() -> Dict[str, Dict[str, bool]]:
+    """Collect whether or not each branch arm was taken, organized by module."""
+    return {
+        module_name: {
+            branch_name: bool(bit) for branch_name, bit in zip(branch_names, bits)
+        }
+        for module_name, (branch_names, bits) in sorted(get_branch_totals().items())
+    }
+
+
+def reset() -> None:
+    """Reset the counters and the bitmaps of all of the registered modules to zero."""
+    for _, hits in registered_modules.values():
+        hits[:] = array(hits.typecode, bytes(hits.itemsize * len(hits)))
+    for _, bits in registered_branch_modules.values():
+        bits[:] = bytes(len(bits))
+    accumulated_modules.clear()
+    accumulated_branch_modules.clear()
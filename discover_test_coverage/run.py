@@ -1,14 +1,27 @@
 """Run commands to execute commands of a subject."""
 
 import os
+import shlex
 import subprocess
+import tempfile
+import time
 from enum import Enum
 from pathlib import Path
-from shutil import copytree
 from shutil import rmtree
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
 
 from discover_test_coverage import constants
 from discover_test_coverage import output
+from discover_test_coverage import selection
+from discover_test_coverage import timing
+
+# define the type of a shard of the test suite, which has the node identifiers
+# of its tests, the variables that it adds to the environment, and its log file
+TestShardType = Tuple[List[str], Dict[str, str], Path]
 
 
 class TestRunCommand(str, Enum):
@@ -24,43 +37,82 @@ class TestRunCommand(str, Enum):
     VENV_TEST_FAIL_FAST_OUTPUT = ".venv/bin/pytest-x -s"
 
 
-def copytree_overwrite(from_path: Path, to_path: Path) -> None:
-    """Copy from a path to a path, allowing an overwrite to occur if needed."""
-    # note that this function is needed because copytree will, by default,
-    # fail if you ask it to copy from_path to to_path and to_path exists
-    # the path already exists and thus it needs to be removed before using copytree
-    if os.path.exists(to_path):
-        rmtree(to_path)
-    # run the copytree to perform the directory copy
-    copytree(from_path, to_path)
+class TestDirectoryMode(str, Enum):
+    """The ways in which the instrumented tests can replace the original tests."""
 
+    SWAP = "swap"
+    HIDDEN = "hidden"
 
-def prepare_for_coverage_monitoring(
-    project_directory: Path,
-    test_directory: Path,
-    coverage: bool,
-) -> Path:
-    """Prepare to run the test suite with coverage monitoring."""
+
+def get_test_directories(
+    project_directory: Path, test_directory: Path
+) -> Tuple[Path, Path, Path]:
+    """Get the test directory and its hidden instrumented and backup directories."""
     # create the directory where tests are stored by default
     test_directory = Path(project_directory / test_directory)
+    # create a hidden directory that stores the instrumented tests
+    test_directory_instrumented = Path(
+        project_directory / (constants.markers.Hidden + test_directory.name)
+    )
     # create a backup directory for the original tests;
     # it is a hidden directory that ends with a label like "-backup"
     test_directory_backup = Path(
         project_directory
         / (constants.markers.Hidden + test_directory.name + constants.tests.Backup)
     )
-    if coverage:
-        # create a hidden directory that will store the instrumented tests
-        test_directory_instrumented = Path(
-            project_directory / (constants.markers.Hidden + test_directory.name)
-        )
-        # copy the original test directory to the backup directory; this will
-        # ensure that original test cases are not deleted during test execution
-        copytree_overwrite(test_directory, test_directory_backup)
-        # recursively remove the test directory and all of its contents
-        rmtree(test_directory)
-        # recursively copy the instrumented tests into the original test directory
-        copytree_overwrite(test_directory_instrumented, test_directory)
+    return test_directory, test_directory_instrumented, test_directory_backup
+
+
+def recover_test_directory(project_directory: Path, test_directory: Path) -> bool:
+    """Restore the original tests if an earlier run stopped before restoring them."""
+    (
+        test_directory,
+        test_directory_instrumented,
+        test_directory_backup,
+    ) = get_test_directories(project_directory, test_directory)
+    # the backup directory only exists while the directories are swapped
+    # and thus the last run crashed or was killed before it finished
+    if not test_directory_backup.exists():
+        return False
+    output.logger.debug(f"Restoring the original tests from {test_directory_backup}")
+    # while the directories are swapped the test directory can only contain the
+    # instrumented tests, so move them back when possible or delete them otherwise
+    if test_directory.exists():
+        if not test_directory_instrumented.exists():
+            test_directory.rename(test_directory_instrumented)
+        else:
+            rmtree(test_directory)
+    # return the original tests to the testing directory
+    test_directory_backup.rename(test_directory)
+    return True
+
+
+def prepare_for_coverage_monitoring(
+    project_directory: Path,
+    test_directory: Path,
+    coverage: bool,
+    test_directory_mode: TestDirectoryMode = TestDirectoryMode.SWAP,
+) -> Path:
+    """Prepare to run the test suite with coverage monitoring."""
+    (
+        test_directory,
+        test_directory_instrumented,
+        test_directory_backup,
+    ) = get_test_directories(project_directory, test_directory)
+    # the hidden mode runs the instrumented tests where they are and thus
+    # the original test directory is never changed in any way
+    if coverage and test_directory_mode == TestDirectoryMode.SWAP:
+        # rename the original test directory to the backup directory and then
+        # rename the instrumented tests to the original test directory; note that
+        # renaming a directory is atomic and does not copy any of its files
+        test_directory.rename(test_directory_backup)
+        try:
+            test_directory_instrumented.rename(test_directory)
+        # the instrumented tests do not exist (e.g., because the tests were not
+        # instrumented) and thus the original tests must be put back right away
+        except OSError:
+            test_directory_backup.rename(test_directory)
+            raise
     return test_directory_backup
 
 
@@ -68,15 +120,203 @@ def finalize_coverage_monitoring(
     test_directory: Path,
     test_directory_backup: Path,
     coverage: bool,
+    test_directory_mode: TestDirectoryMode = TestDirectoryMode.SWAP,
 ) -> None:
     """Finalize the system after running test coverage monitoring."""
-    if coverage:
-        # delete the test directory that contains the instrumented tests
-        rmtree(test_directory)
-        # return the original tests to the testing directory
-        copytree_overwrite(test_directory_backup, test_directory)
-        # delete the backup directory for the original tests
-        rmtree(test_directory_backup)
+    if coverage and test_directory_mode == TestDirectoryMode.SWAP:
+        # move the instrumented tests back to their hidden directory so that
+        # the next run can reuse them and then return the original tests to the
+        # testing directory, which also removes the backup directory
+        recover_test_directory(test_directory_backup.parent, test_directory)
+
+
+def create_hidden_test_run_command(
+    project_directory: Path,
+    test_directory: Path,
+    test_run_command: str,
+) -> str:
+    """Create a test run command that runs the instrumented tests in the hidden directory."""
+    _, test_directory_instrumented, _ = get_test_directories(
+        project_directory, test_directory
+    )
+    # pass the hidden directory to pytest so that it collects the instrumented
+    # tests and their conftest.py files, even though pytest does not recurse
+    # into hidden directories, and keep the rootdir of the project so that the
+    # node identifiers and the configuration files are the same as before;
+    # note that the paths are quoted since the project's path can contain spaces
+    return (
+        test_run_command
+        + constants.markers.Space
+        + shlex.quote(str(test_directory_instrumented))
+        + constants.markers.Space
+        + constants.arguments.Rootdir
+        + constants.markers.Space
+        + shlex.quote(str(project_directory))
+    )
+
+
+def collect_test_ids(
+    project_directory: Path,
+    test_directory: Path,
+    test_run_command: str,
+    test_directory_mode: Optional[TestDirectoryMode] = None,
+) -> List[str]:
+    """Collect the node identifiers of all of the tests without running any of them."""
+    # collect the instrumented tests from the hidden directory when they
+    # will run from there so that the node identifiers refer to them
+    if test_directory_mode == TestDirectoryMode.HIDDEN:
+        test_run_command = create_hidden_test_run_command(
+            project_directory, test_directory, test_run_command
+        )
+    # the plugin saves the node identifiers of the collected tests in a file
+    # since the output of pytest depends on the verbosity that the test command
+    # or the configuration of the project sets (e.g., "-qq" only lists the files)
+    collection_fd, collection_path = tempfile.mkstemp(
+        prefix=constants.selection.Prefix, suffix=constants.selection.Suffix
+    )
+    os.close(collection_fd)
+    collection_file = Path(collection_path)
+    # the collection never collects coverage, even when an earlier command
+    # in the same process configured the plugin to collect it
+    environment = {
+        name: value
+        for name, value in os.environ.items()
+        if name != constants.importhook.Configuration_Variable
+    }
+    environment[constants.selection.Collection_Variable] = str(collection_file)
+    try:
+        subprocess.run(
+            test_run_command
+            + constants.markers.Space
+            + constants.impact.Collect_Only
+            + constants.markers.Space
+            + constants.importhook.Plugin,
+            shell=True,
+            cwd=project_directory,
+            capture_output=True,
+            text=True,
+            env=environment,
+        )
+        return selection.load_selection(collection_file)
+    finally:
+        collection_file.unlink(missing_ok=True)
+
+
+def create_test_command(
+    project_directory: Path,
+    test_directory: Path,
+    test_run_command: str,
+    coverage: bool,
+    test_directory_mode: TestDirectoryMode,
+) -> str:
+    """Create the command that runs the test suite."""
+    if coverage and test_directory_mode == TestDirectoryMode.HIDDEN:
+        return create_hidden_test_run_command(
+            project_directory, test_directory, test_run_command
+        )
+    return test_run_command
+
+
+def wait_for_process_group(
+    process: subprocess.Popen, timeout: Optional[float]
+) -> Optional[int]:
+    """Wait for a process that leads its own group, returning None when it timed out."""
+    try:
+        return_code = process.wait(timeout=timeout)
+    # the run took too long (e.g., a disabled function made a loop infinite)
+    # and thus the whole group stops, including the processes that it started
+    except subprocess.TimeoutExpired:
+        timing.stop_process_group(process)
+        process.wait()
+        return None
+    # the run was interrupted and thus the group must not outlive it
+    except KeyboardInterrupt:
+        timing.stop_process_group(process)
+        raise
+    # a test ran for longer than its own timeout and thus the plugin stopped
+    # the test suite, leaving behind the processes that the test started
+    if return_code == constants.timing.Exit_Code:
+        timing.stop_process_group(process)
+        return None
+    return return_code
+
+
+def run_process_group(
+    command: str, timeout: Optional[float], **popen_arguments
+) -> Optional[int]:
+    """Run a shell command in its own process group, returning None when it timed out."""
+    # start the shell in its own process group so that a timeout stops both
+    # the shell and the test suite that it runs, along with their children
+    process = subprocess.Popen(
+        command, shell=True, start_new_session=True, **popen_arguments
+    )
+    return wait_for_process_group(process, timeout)
+
+
+def describe_return_code(return_code: Optional[int]) -> str:
+    """Describe the return code of a test run, which is None when it timed out."""
+    if return_code is None:
+        return constants.timing.Outcome
+    return f"exit code {return_code}"
+
+
+def run_test_shards(
+    project_directory: Path,
+    test_directory: Path,
+    test_run_command: str,
+    coverage: bool,
+    test_directory_mode: TestDirectoryMode,
+    test_shards: Sequence[TestShardType],
+    timings: Optional[Dict[str, float]] = None,
+    timeout_environment: Optional[Dict[str, str]] = None,
+) -> List[Optional[int]]:
+    """Run the shards of the test suite at the same time, waiting for all of them."""
+    processes = []
+    # the environment of each shard points the plugin to the file with its tests
+    shard_test_run_command = create_test_command(
+        project_directory,
+        test_directory,
+        test_run_command,
+        coverage,
+        test_directory_mode,
+    )
+    output.logger.debug(f"Running the shards: {shard_test_run_command}")
+    for _, environment, log_file in test_shards:
+        # each shard writes its output to its own log file since the
+        # output of the shards would otherwise be interleaved line by line
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(log_file, "w") as log:
+            processes.append(
+                subprocess.Popen(
+                    shard_test_run_command,
+                    shell=True,
+                    env={**os.environ, **(timeout_environment or {}), **environment},
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    start_new_session=True,
+                )
+            )
+    # display the output of each shard, in order, once all of them finish;
+    # each shard has its own deadline since all of them started together
+    start_time = time.perf_counter()
+    return_codes = []
+    for index, (process, (test_ids, _, log_file)) in enumerate(
+        zip(processes, test_shards)
+    ):
+        shard_timeout = timing.compute_run_timeout(timings or {}, test_ids)
+        return_code = wait_for_process_group(
+            process,
+            None
+            if shard_timeout is None
+            else max(0.0, start_time + shard_timeout - time.perf_counter()),
+        )
+        return_codes.append(return_code)
+        output.console.rule(
+            f"Shard {index} ran {len(test_ids)} tests with "
+            + describe_return_code(return_code)
+        )
+        output.console.print(log_file.read_text(), markup=False, highlight=False)
+    return return_codes
 
 
 def run_test_suite_with_optional_coverage(
@@ -84,23 +324,91 @@ def run_test_suite_with_optional_coverage(
     test_directory: Path,
     test_run_command: str,
     coverage: bool = False,
-) -> None:
+    test_directory_mode: TestDirectoryMode = TestDirectoryMode.SWAP,
+    test_ids: Optional[Sequence[str]] = None,
+    test_shards: Optional[Sequence[TestShardType]] = None,
+    timings_file: Optional[Path] = None,
+    record_timings: bool = False,
+) -> List[Optional[int]]:
     """Run the test suite with a provided command and collect test coverage if requested."""
     output.logger.debug(f"Change into the project directory: {project_directory}")
     output.logger.debug(f"Preparing to run the test command: {test_run_command}")
     initial_current_working_directory = Path.cwd()
+    # resolve the project directory before changing into it so that
+    # a relative project directory still refers to the same directory
+    project_directory = project_directory.resolve()
     # change into the directory for the specified project
     os.chdir(project_directory)
+    # restore the original tests if an earlier run crashed while
+    # the instrumented tests were in the original test directory
+    if recover_test_directory(project_directory, test_directory):
+        output.console.print(
+            ":sparkles: Restored the original tests after an interrupted run"
+        )
+    # the durations of the tests in the baseline run, if any, limit how long each
+    # of the tests and the whole run can take, since otherwise a single hung test
+    # (e.g., an infinite loop) would block the run forever; note that the plugin
+    # records the durations in the same file when the run is a baseline run
+    timings = timing.load_timings(timings_file) if timings_file is not None else {}
+    timeout_environment = timing.create_timeout_environment(
+        timings_file, record_timings
+    )
     # display a label in standard output about running the test suite
     output.print_test_start()
     test_directory_backup = prepare_for_coverage_monitoring(
-        project_directory, test_directory, coverage
+        project_directory, test_directory, coverage, test_directory_mode
     )
-    # run the test suite with the provided test execution command
-    print("test run command " + test_run_command)
-    subprocess.run(test_run_command, shell=True)
+    # run the test suite with the provided test execution command, always
+    # restoring the original tests even when the test suite run crashes
+    try:
+        # the shards share the swapped test directory, which is only swapped
+        # once before all of the shards start and restored after they finish
+        if test_shards is not None:
+            return_codes = run_test_shards(
+                project_directory,
+                test_directory,
+                test_run_command,
+                coverage,
+                test_directory_mode,
+                test_shards,
+                timings,
+                timeout_environment,
+            )
+        else:
+            test_run_command = create_test_command(
+                project_directory,
+                test_directory,
+                test_run_command,
+                coverage,
+                test_directory_mode,
+            )
+            print("test run command " + test_run_command)
+            # the plugin deselects the tests that are not in the selection
+            with selection.TestSelection(test_ids) as test_selection:
+                return_codes = [
+                    run_process_group(
+                        test_run_command,
+                        timing.compute_run_timeout(timings, test_ids),
+                        env={
+                            **os.environ,
+                            **timeout_environment,
+                            **test_selection.environment,
+                        },
+                    )
+                ]
+    finally:
+        finalize_coverage_monitoring(
+            project_directory / test_directory,
+            test_directory_backup,
+            coverage,
+            test_directory_mode,
+        )
+        # return to the main working directory for the program
+        os.chdir(initial_current_working_directory)
+    if None in return_codes:
+        output.console.print(
+            ":person_shrugging: Stopped the tests that ran longer than their timeouts"
+        )
     # display a label in standard output about finishing the test suite run
     output.print_test_finish()
-    finalize_coverage_monitoring(test_directory, test_directory_backup, coverage)
-    # return to the main working directory for the program
-    os.chdir(initial_current_working_directory)
+    return return_codes
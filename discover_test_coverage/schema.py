@@ -0,0 +1,69 @@
+"""Select the one function of an instrumented program that is disabled while it runs."""
+
+import os
+from array import array
+from typing import Dict
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from discover_test_coverage import constants
+
+# the unit that is disabled in this process, named like "package.module::f#0",
+# which is read once when the module is imported so that the guard at the start
+# of each instrumented function only costs one indexed load and one comparison
+active_unit: Optional[str] = os.environ.get(constants.schema.Disabled_Variable)
+
+# the IDs of the units and the slot of each registered module, where the slot
+# holds the ID of the module's disabled function or a value that no ID matches
+registered_modules: Dict[str, Tuple[Dict[str, int], array]] = {}
+
+# the slot of the module that contains the active unit, so that another
+# unit can be activated without searching through all of the modules
+active_slot: Optional[array] = None
+
+
+def describe_unit(module_name: str, function_name: str, occurrence: int) -> str:
+    """Describe a unit that can be disabled with a single string that identifies it."""
+    return constants.campaign.Point_Id.format(module_name, function_name, occurrence)
+
+
+def create_slot() -> array:
+    """Create the slot of a module that does not disable any of its functions."""
+    return array(constants.schema.Slot_Type, [constants.schema.Nothing_Disabled])
+
+
+def register(module_name: str, function_names: Sequence[str]) -> array:
+    """Register the functions of an instrumented module and return its slot."""
+    global active_slot
+    # functions that share a name (e.g., the getter and the setter of a
+    # property) are told apart by the number of earlier functions with it
+    unit_ids: Dict[str, int] = {}
+    occurrences: Dict[str, int] = {}
+    for function_id, function_name in enumerate(function_names):
+        occurrence = occurrences.get(function_name, 0)
+        occurrences[function_name] = occurrence + 1
+        unit_ids[describe_unit(module_name, function_name, occurrence)] = function_id
+    slot = create_slot()
+    if active_unit in unit_ids:
+        slot[0] = unit_ids[active_unit]
+        active_slot = slot
+    registered_modules[module_name] = (unit_ids, slot)
+    return slot
+
+
+def activate(unit: Optional[str]) -> None:
+    """Disable another unit, or none when it is None, in the modules that are already imported."""
+    global active_unit, active_slot
+    # enable the unit that was disabled before and then disable the new
+    # unit in its module, when that module was already registered; a module
+    # that is imported later disables the unit when it registers
+    if active_slot is not None:
+        active_slot[0] = constants.schema.Nothing_Disabled
+        active_slot = None
+    active_unit = unit
+    for unit_ids, slot in registered_modules.values():
+        if unit in unit_ids:
+            slot[0] = unit_ids[unit]
+            active_slot = slot
+            break
@@ -0,0 +1,83 @@
+"""Pass the node identifiers of the selected tests to the plugin through a file."""
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from discover_test_coverage import constants
+
+
+def save_selection(selection_file: Path, test_ids: Sequence[str]) -> None:
+    """Save the node identifiers of the selected tests, one on each line."""
+    selection_file.parent.mkdir(parents=True, exist_ok=True)
+    selection_file.write_text(
+        constants.markers.Empty.join(
+            test_id + constants.markers.Newline for test_id in test_ids
+        )
+    )
+
+
+def load_selection(selection_file: Path) -> List[str]:
+    """Load the node identifiers of the selected tests."""
+    return [
+        test_id
+        for test_id in selection_file.read_text().split(constants.markers.Newline)
+        if len(test_id) > 0
+    ]
+
+
+def create_selection_environment(
+    selection_file: Path, test_ids: Optional[Sequence[str]]
+) -> Dict[str, str]:
+    """Save the selected tests, if any, and create the variable that points the plugin to them."""
+    if test_ids is None:
+        return {}
+    save_selection(selection_file, test_ids)
+    return {constants.selection.Variable: str(selection_file)}
+
+
+def select_items(items: Sequence, test_ids: Optional[Sequence[str]]) -> List:
+    """Select the collected test items with the requested IDs, in the order of collection."""
+    if test_ids is None:
+        return list(items)
+    selected_test_ids = set(test_ids)
+    return [item for item in items if item.nodeid in selected_test_ids]
+
+
+class TestSelection:
+    """Save the selected tests in a temporary file that exists while the tests run."""
+
+    def __init__(self, test_ids: Optional[Sequence[str]]):
+        """Construct a TestSelection for the node identifiers of the selected tests, if any."""
+        # the node identifiers of the selected tests are never passed on the
+        # command line since thousands of them (e.g., with the parameters of
+        # parametrized tests) exceed the limit on the length of the arguments
+        self.selection_file: Optional[Path] = None
+        self.environment: Dict[str, str] = {}
+        if test_ids is not None:
+            selection_fd, selection_path = tempfile.mkstemp(
+                prefix=constants.selection.Prefix, suffix=constants.selection.Suffix
+            )
+            os.close(selection_fd)
+            self.selection_file = Path(selection_path)
+            self.environment = create_selection_environment(
+                self.selection_file, test_ids
+            )
+
+    def close(self) -> None:
+        """Remove the file of the selected tests, if any."""
+        if self.selection_file is not None:
+            self.selection_file.unlink(missing_ok=True)
+            self.selection_file = None
+
+    def __enter__(self) -> "TestSelection":
+        """Enter a context in which the file of the selected tests exists."""
+        return self
+
+    def __exit__(self, *exception_details) -> None:
+        """Remove the file of the selected tests when leaving the context."""
+        self.close()
@@ -1,62 +1,277 @@
 """Create and run a syslog remote server."""
 
-import logging
-import logging.handlers
-import socketserver
+import asyncio
+import os
+import re
+import socket
+from pathlib import Path
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from rich.live import Live
 
 from discover_test_coverage import constants
+from discover_test_coverage import debug
+from discover_test_coverage import liveview
 from discover_test_coverage import output
 
 LOG_FILE = constants.server.Log_File
 HOST = constants.server.Localhost
 PORT = constants.server.Port
 
-logger = logging.getLogger(constants.logger.Syslog)
+PRIORITY_PATTERN = re.compile(constants.server.Priority_Pattern)
+
+# the level of each syslog severity, which is the remainder of the priority
+# divided by the number of severities; the SysLogHandler maps DEBUG to 7,
+# INFO to 6, WARNING to 4, ERROR to 3, and CRITICAL to 2
+SEVERITY_LEVELS = (
+    debug.DebugLevel.CRITICAL,
+    debug.DebugLevel.CRITICAL,
+    debug.DebugLevel.CRITICAL,
+    debug.DebugLevel.ERROR,
+    debug.DebugLevel.WARNING,
+    debug.DebugLevel.INFO,
+    debug.DebugLevel.INFO,
+    debug.DebugLevel.DEBUG,
+)
+
+
+def parse_message(data: bytes) -> liveview.MessageType:
+    """Decode a message, finding its level and removing the characters that are not its text."""
+    # receive the message from the syslog logging client
+    message = bytes.decode(
+        data.strip(), encoding=constants.server.Utf8_Encoding, errors="replace"
+    )
+    # the priority at the start of the message (e.g., "<15>") gives its level,
+    # while a message without a priority is treated as debugging output
+    level = debug.DebugLevel.DEBUG
+    priority_match = PRIORITY_PATTERN.match(message)
+    if priority_match is not None:
+        severity = int(priority_match.group(1)) % constants.server.Severity_Count
+        level = SEVERITY_LEVELS[severity]
+        message_start = priority_match.end()
+        message = message[message_start:]
+    # remove not-printable characters that can appear in message
+    return level, message.replace(
+        constants.markers.Bad_Zero_Zero, constants.markers.Empty
+    )
 
 
-class SyslogUDPHandler(socketserver.BaseRequestHandler):
-    """Syslog UDP handler for receiving debugging messages."""
+class SyslogCounters:
+    """Count the messages that the syslog server received, dropped, and wrote."""
 
-    def handle(self):
-        """Receive a message and then display it in output and log it to a file."""
-        global logger
-        # receive the message from the syslog logging client
-        message = bytes.decode(
-            self.request[0].strip(), encoding=constants.server.Utf8_Encoding
+    def __init__(self) -> None:
+        """Construct SyslogCounters that all start at zero."""
+        # the datagrams that arrived, the datagrams that did not fit in the
+        # queue and thus were dropped, and the messages written to the log file
+        self.received = 0
+        self.dropped = 0
+        self.written = 0
+
+    def describe(self) -> str:
+        """Describe the counters with a single line."""
+        return (
+            f"received {self.received}, dropped {self.dropped}, "
+            f"written {self.written} messages"
         )
-        # remove not-printable characters that can appear in message
-        enhanced_message = str(message).replace(
-            constants.markers.Bad_Fifteen, constants.markers.Empty
+
+
+class RotatingLogWriter:
+    """Write batches of messages to a log file that rotates like a RotatingFileHandler."""
+
+    def __init__(
+        self,
+        log_file: Path,
+        max_bytes: int = constants.server.Max_Log_Size,
+        backup_count: int = constants.server.Backup_Count,
+    ):
+        """Construct a RotatingLogWriter that appends to a log file."""
+        self.log_file = Path(log_file)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.stream = open(self.log_file, "ab")
+        self.size = self.stream.tell()
+
+    def rotate(self) -> None:
+        """Move the log file to the first backup, shifting the older backups."""
+        self.stream.close()
+        # like a RotatingFileHandler, a log file without any backups keeps growing
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                backup_file = Path(f"{self.log_file}.{index}")
+                if backup_file.exists():
+                    os.replace(backup_file, f"{self.log_file}.{index + 1}")
+            os.replace(self.log_file, f"{self.log_file}.1")
+        self.stream = open(self.log_file, "ab")
+        self.size = self.stream.tell()
+
+    def write(self, messages: List[str]) -> None:
+        """Write a batch of messages, rotating before a message that would not fit."""
+        buffer = bytearray()
+        for message in messages:
+            line = (message + constants.markers.Newline).encode(
+                constants.server.Utf8_Encoding
+            )
+            # rotate at the same point as a RotatingFileHandler would, which
+            # is before the message that makes the file reach the maximum size
+            if (
+                self.max_bytes > 0
+                and self.size > 0
+                and self.size + len(buffer) + len(line) >= self.max_bytes
+            ):
+                self.stream.write(buffer)
+                buffer = bytearray()
+                self.rotate()
+            buffer += line
+        self.stream.write(buffer)
+        self.size += len(buffer)
+        self.stream.flush()
+
+    def close(self) -> None:
+        """Close the log file."""
+        self.stream.close()
+
+
+class SyslogProtocol(asyncio.DatagramProtocol):
+    """Receive syslog datagrams into a bounded queue without ever blocking."""
+
+    def __init__(self, queue: "asyncio.Queue[bytes]", counters: SyslogCounters):
+        """Construct a SyslogProtocol that adds the datagrams to a queue."""
+        self.queue = queue
+        self.counters = counters
+
+    def datagram_received(self, data: bytes, address: Tuple[str, int]) -> None:
+        """Add a datagram to the queue, dropping it when the queue is full."""
+        self.counters.received += 1
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            self.counters.dropped += 1
+
+
+class SyslogServer:
+    """Receive debugging messages over UDP and then display and log them in batches."""
+
+    def __init__(
+        self,
+        log_file: Path = Path(LOG_FILE),
+        display: bool = True,
+        view: Optional[liveview.LiveView] = None,
+        queue_size: int = constants.server.Queue_Size,
+        batch_size: int = constants.server.Batch_Size,
+    ):
+        """Construct a SyslogServer that writes to a log file."""
+        self.log_writer = RotatingLogWriter(log_file)
+        self.display = display
+        self.view = view
+        self.batch_size = batch_size
+        self.counters = SyslogCounters()
+        self.queue: "asyncio.Queue[bytes]" = asyncio.Queue(maxsize=queue_size)
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.writer_task: Optional[asyncio.Task] = None
+
+    async def start(self, host: str = HOST, port: int = PORT) -> Tuple[str, int]:
+        """Start receiving messages, returning the address that the server is bound to."""
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: SyslogProtocol(self.queue, self.counters),
+            local_addr=(host, port),
         )
-        enhanced_message = enhanced_message.replace(
-            constants.markers.Bad_Zero_Zero, constants.markers.Empty
+        self.transport = transport
+        # a larger buffer in the kernel absorbs the bursts of messages that
+        # arrive while the writer is busy, since those would be lost silently
+        server_socket = transport.get_extra_info("socket")
+        try:
+            server_socket.setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVBUF, constants.server.Receive_Buffer
+            )
+        except OSError:
+            output.logger.debug("Could not enlarge the receive buffer of the server")
+        self.writer_task = asyncio.create_task(self.write_batches())
+        return server_socket.getsockname()[:2]
+
+    def display_and_write(self, messages: List[str]) -> None:
+        """Display a batch of messages, unless a live view shows them, and log them."""
+        if self.view is None and self.display:
+            output.console.print(constants.markers.Newline.join(messages), markup=False)
+        self.log_writer.write(messages)
+
+    async def write_batches(self) -> None:
+        """Display and log the queued messages, taking as many as are available at once."""
+        loop = asyncio.get_running_loop()
+        while True:
+            parsed_messages = [parse_message(await self.queue.get())]
+            while len(parsed_messages) < self.batch_size and not self.queue.empty():
+                parsed_messages.append(parse_message(self.queue.get_nowait()))
+            messages = [message for _, message in parsed_messages]
+            # a single call to display and to write a whole batch costs much
+            # less than displaying and writing each of the messages on its own;
+            # note that a live view only counts the batch since it redraws at
+            # a fixed rate, which means that it never slows down the writes
+            if self.view is not None:
+                self.view.add(parsed_messages)
+            # the display and the writes block and thus they run in a thread,
+            # which lets the event loop keep reading datagrams from the socket
+            # instead of leaving them to overflow the buffer of the kernel,
+            # where they would be dropped without ever being counted
+            await loop.run_in_executor(None, self.display_and_write, messages)
+            self.counters.written += len(messages)
+            for _ in messages:
+                self.queue.task_done()
+
+    async def stop(self) -> None:
+        """Stop receiving messages and then write the messages that are still queued."""
+        if self.transport is not None:
+            self.transport.close()
+        await self.queue.join()
+        if self.writer_task is not None:
+            self.writer_task.cancel()
+            try:
+                await self.writer_task
+            except asyncio.CancelledError:
+                pass
+        self.log_writer.close()
+
+
+async def redraw_view(syslog_server: SyslogServer, live: Live) -> None:
+    """Redraw the live view of a syslog server at a fixed rate until it is cancelled."""
+    # the view is only redrawn by the event loop, so it never changes while it renders
+    while True:
+        await asyncio.sleep(1 / constants.liveview.Frame_Rate)
+        if syslog_server.view is not None:
+            live.update(
+                syslog_server.view.render(syslog_server.counters.describe()),
+                refresh=True,
+            )
+
+
+async def serve_syslog(
+    host: str = HOST,
+    port: int = PORT,
+    view: Optional[liveview.LiveView] = None,
+) -> None:
+    """Run a syslog server until it is cancelled, showing its messages in a live view if any."""
+    syslog_server = SyslogServer(view=view)
+    await syslog_server.start(host, port)
+    try:
+        if view is None:
+            await asyncio.Event().wait()
+        else:
+            with Live(console=output.console, auto_refresh=False) as live:
+                await redraw_view(syslog_server, live)
+    finally:
+        await syslog_server.stop()
+        output.console.print(
+            f"{constants.markers.Indent}{syslog_server.counters.describe()}"
         )
-        # display the message inside of the syslog's console
-        output.console.print(enhanced_message)
-        # write the logging message to a file using a rotating file handler
-        logger.debug(enhanced_message)
 
 
-def start_syslog_server():
+def start_syslog_server(view: Optional[liveview.LiveView] = None):
     """Start a syslog server."""
-    global logger
-    # always log all of the messages to a file
-    logger.setLevel(logging.DEBUG)
-    # create a RotatingFileHandler such that:
-    # -- it is stored in a file
-    # -- it can never be bigger than 1 MB
-    # -- one backup is created when log file gets too big
-    rotating_file_handler = logging.handlers.RotatingFileHandler(
-        LOG_FILE,
-        maxBytes=constants.server.Max_Log_Size,
-        backupCount=constants.server.Backup_Count,
-    )
-    # add the rotating file handler to the logger
-    logger.addHandler(rotating_file_handler)
     # startup the server and then let it run forever
     try:
-        server = socketserver.UDPServer((HOST, PORT), SyslogUDPHandler)
-        server.serve_forever(poll_interval=constants.server.Poll_Interval)
+        asyncio.run(serve_syslog(view=view))
     # let the server crash and raise an error on SystemExit and IOError
     except SystemExit:
         raise
@@ -0,0 +1,121 @@
+"""Split the test suite into shards that run in parallel and merge their coverage."""
+
+import heapq
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+
+from discover_test_coverage import configure
+from discover_test_coverage import constants
+from discover_test_coverage import output
+from discover_test_coverage import run
+from discover_test_coverage import selection
+from discover_test_coverage import store
+from discover_test_coverage import timing
+
+
+def balance_tests(
+    test_ids: Sequence[str], durations: Mapping[str, float], shard_count: int
+) -> List[List[str]]:
+    """Balance the tests across shards so that the shards take about the same time."""
+    estimated_durations = timing.estimate_durations(test_ids, durations)
+    # assign the longest tests first, each one to the shard that currently has
+    # the least work, which keeps the longest shard close to the shortest one
+    shard_heap = [(0.0, index) for index in range(min(shard_count, len(test_ids)))]
+    shard_positions: Dict[int, List[int]] = {index: [] for _, index in shard_heap}
+    for position in sorted(
+        range(len(test_ids)),
+        key=lambda position: (-estimated_durations[position], position),
+    ):
+        total_duration, index = heapq.heappop(shard_heap)
+        shard_positions[index].append(position)
+        heapq.heappush(
+            shard_heap, (total_duration + estimated_durations[position], index)
+        )
+    # run the tests of each shard in the order in which they were
+    # collected so that their fixtures are set up in the same order
+    return [
+        [test_ids[position] for position in sorted(positions)]
+        for _, positions in sorted(shard_positions.items())
+    ]
+
+
+def get_shard_directory(discover_dir: Path, index: int) -> Path:
+    """Get the directory that stores the configuration and coverage of a shard."""
+    return discover_dir / constants.shard.Directory / constants.shard.Name.format(index)
+
+
+def clear_shard_coverage(shard_directory: Path) -> None:
+    """Delete the coverage that a shard recorded in an earlier run."""
+    # each shard records a single run and thus its store starts out empty;
+    # note that the other files in the directory (e.g., the cache of the
+    # compiled instrumented modules) are kept for the next run of the shard
+    store_file = shard_directory / constants.store.File
+    for suffix in constants.shard.Store_Suffixes:
+        Path(str(store_file) + suffix).unlink(missing_ok=True)
+
+
+def create_test_shards(
+    discover_dir: Path,
+    test_ids: Sequence[str],
+    shard_count: int,
+    configurations: Mapping[str, Any],
+) -> List[run.TestShardType]:
+    """Create the shards of the test suite, each with its own configuration and coverage."""
+    # balance the shards with the durations that the earlier runs recorded
+    durations: Dict[str, float] = {}
+    store_file = discover_dir / constants.store.File
+    if store_file.exists():
+        with store.CoverageStore(store_file) as coverage_store:
+            durations = coverage_store.find_latest_durations()
+    test_shards = []
+    for index, shard_test_ids in enumerate(
+        balance_tests(test_ids, durations, shard_count)
+    ):
+        # each shard has its own directory with its own configuration and
+        # coverage store so that the shards never write to the same files
+        shard_directory = get_shard_directory(discover_dir, index)
+        clear_shard_coverage(shard_directory)
+        configure.save_configuration(
+            **{**configurations, "discover_dir": shard_directory}
+        )
+        # the plugin deselects the tests of the other shards, which are passed
+        # in a file since there can be too many of them for the command line
+        test_shards.append(
+            (
+                shard_test_ids,
+                {
+                    constants.importhook.Configuration_Variable: str(
+                        shard_directory / constants.arguments.Discover_Json
+                    ),
+                    **selection.create_selection_environment(
+                        shard_directory / constants.selection.File, shard_test_ids
+                    ),
+                },
+                shard_directory / constants.shard.Log_File,
+            )
+        )
+    return test_shards
+
+
+def merge_shard_coverage(
+    discover_dir: Path, shard_directories: Sequence[Path]
+) -> Optional[int]:
+    """Merge the coverage of all of the shards into a single run of the coverage store."""
+    shard_stores = [
+        store.CoverageStore(shard_directory / constants.store.File)
+        for shard_directory in shard_directories
+        if (shard_directory / constants.store.File).exists()
+    ]
+    try:
+        with store.CoverageStore(discover_dir / constants.store.File) as coverage:
+            run_id = store.merge_runs(coverage, shard_stores)
+    finally:
+        for shard_store in shard_stores:
+            shard_store.close()
+    output.logger.debug(f"Merged the coverage of the shards into the run {run_id}")
+    return run_id
@@ -0,0 +1,607 @@
+"""Store the coverage of test runs in an indexed SQLite database."""
+
+import hashlib
+import sqlite3
+import sys
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+from typing import cast
+
+from discover_test_coverage import bitset
+from discover_test_coverage import constants
+from discover_test_coverage import recorder
+
+# define the type of the coverage that the recorder collects for the modules,
+# mapping the name of a module to the names of its probes and their hits
+RecordedModulesType = Mapping[str, Tuple[Sequence[str], Union[array, bytearray]]]
+
+# define the type of the coverage report in its JSON form
+CoverageReportType = Dict[str, Dict[str, Dict[str, Union[int, bool]]]]
+
+# define the type of the coverage of a context (e.g., a test case), which has
+# a name and the positions of the functions and of the branch arms that it hit
+ContextType = Tuple[str, recorder.ContextPositionsType, recorder.ContextPositionsType]
+
+# define the type of a layout that merges the layouts of several runs, which
+# has the names of its probes and the position of each occurrence of a name
+MergedLayoutType = Tuple[List[str], Dict[Tuple[str, int], int]]
+
+# the schema of the database interns the names of the files and the probes
+# (i.e., the functions and the branch arms) and stores the probes of a module
+# as a layout, which is the ordered list of its probes; since the hits of a
+# module in a run are a bitset over the positions of a layout, each run only
+# adds one small row per module and earlier runs are never rewritten; the hits
+# of each context are compressed runs of positions in a layout, and thus they
+# only take space for the modules and the probes that the context actually hit
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS probes (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files (id),
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (file_id, kind, name)
+);
+CREATE TABLE IF NOT EXISTS layouts (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files (id),
+    kind TEXT NOT NULL,
+    digest TEXT NOT NULL UNIQUE,
+    length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS layout_probes (
+    layout_id INTEGER NOT NULL REFERENCES layouts (id),
+    position INTEGER NOT NULL,
+    probe_id INTEGER NOT NULL REFERENCES probes (id),
+    PRIMARY KEY (layout_id, position)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created TEXT NOT NULL,
+    label TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hits (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    layout_id INTEGER NOT NULL REFERENCES layouts (id),
+    bits BLOB NOT NULL,
+    counts BLOB,
+    PRIMARY KEY (run_id, layout_id)
+);
+CREATE TABLE IF NOT EXISTS contexts (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    name TEXT NOT NULL,
+    duration REAL,
+    UNIQUE (run_id, name)
+);
+CREATE TABLE IF NOT EXISTS context_hits (
+    context_id INTEGER NOT NULL REFERENCES contexts (id),
+    layout_id INTEGER NOT NULL REFERENCES layouts (id),
+    positions BLOB NOT NULL,
+    PRIMARY KEY (context_id, layout_id)
+);
+CREATE INDEX IF NOT EXISTS probes_by_name ON probes (name);
+CREATE INDEX IF NOT EXISTS context_hits_by_layout ON context_hits (layout_id);
+"""
+
+
+def encode_counts(hits: Sequence[int]) -> bytes:
+    """Encode the counters of the functions as little-endian unsigned integers."""
+    counts = array(constants.recorder.Counter_Type, hits)
+    if sys.byteorder != constants.bitset.Byte_Order:
+        counts.byteswap()
+    return counts.tobytes()
+
+
+def decode_counts(data: bytes) -> List[int]:
+    """Decode the counters of the functions from little-endian unsigned integers."""
+    counts = array(constants.recorder.Counter_Type)
+    counts.frombytes(data)
+    if sys.byteorder != constants.bitset.Byte_Order:
+        counts.byteswap()
+    return counts.tolist()
+
+
+class CoverageStore:
+    """Append the coverage of test runs to a database and lazily read it back."""
+
+    def __init__(self, store_file: Path):
+        """Construct a CoverageStore, creating the database when it does not exist."""
+        self.store_file = Path(store_file)
+        self.store_file.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(
+            str(self.store_file), timeout=constants.store.Timeout
+        )
+        # the write-ahead log lets a report read the database while
+        # a test run appends to it, without either one of them waiting
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        # cache the interned identifiers so that each one is only queried once
+        self.file_ids: Dict[str, int] = {}
+        self.layout_ids: Dict[str, int] = {}
+
+    def __enter__(self) -> "CoverageStore":
+        """Enter a context in which the store is open."""
+        return self
+
+    def __exit__(self, *exception_details) -> None:
+        """Close the store when leaving the context."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the connection to the database."""
+        self.connection.close()
+
+    def intern_file(self, name: str) -> int:
+        """Find the identifier of a file, adding the file when it is not stored."""
+        file_id = self.file_ids.get(name)
+        if file_id is None:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO files (name) VALUES (?)", (name,)
+            )
+            (file_id,) = self.connection.execute(
+                "SELECT id FROM files WHERE name = ?", (name,)
+            ).fetchone()
+            self.file_ids[name] = file_id
+        return file_id
+
+    def intern_layout(self, file_name: str, kind: str, names: Sequence[str]) -> int:
+        """Find the identifier of the layout of a module's probes, adding it when needed."""
+        # the digest identifies the layout without comparing all of its names
+        layout_hash = hashlib.new(constants.manifest.Hash_Algorithm)
+        for part in (file_name, kind, *names):
+            layout_hash.update(part.encode())
+            layout_hash.update(constants.markers.Newline.encode())
+        digest = layout_hash.hexdigest()
+        layout_id = self.layout_ids.get(digest)
+        if layout_id is not None:
+            return layout_id
+        row = self.connection.execute(
+            "SELECT id FROM layouts WHERE digest = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            file_id = self.intern_file(file_name)
+            layout_id = cast(
+                int,
+                self.connection.execute(
+                    "INSERT INTO layouts (file_id, kind, digest, length) "
+                    "VALUES (?, ?, ?, ?)",
+                    (file_id, kind, digest, len(names)),
+                ).lastrowid,
+            )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO probes (file_id, kind, name) VALUES (?, ?, ?)",
+                [(file_id, kind, name) for name in names],
+            )
+            self.connection.executemany(
+                "INSERT INTO layout_probes (layout_id, position, probe_id) "
+                "SELECT ?, ?, id FROM probes WHERE file_id = ? AND kind = ? AND name = ?",
+                [
+                    (layout_id, position, file_id, kind, name)
+                    for position, name in enumerate(names)
+                ],
+            )
+        else:
+            (layout_id,) = row
+        self.layout_ids[digest] = layout_id
+        return layout_id
+
+    def add_run(
+        self,
+        function_modules: RecordedModulesType,
+        branch_modules: RecordedModulesType,
+        label: str = constants.markers.Nothing,
+        contexts: Sequence[ContextType] = (),
+        durations: Optional[Mapping[str, float]] = None,
+    ) -> int:
+        """Append the coverage of a test run, returning the identifier of the run."""
+        # add the whole run in a single transaction so that a crash
+        # never leaves behind a run that only has some of its modules
+        with self.connection:
+            run_id = cast(
+                int,
+                self.connection.execute(
+                    "INSERT INTO runs (created, label) VALUES (?, ?)",
+                    (datetime.now().isoformat(), label),
+                ).lastrowid,
+            )
+            hit_rows: List[Tuple[int, int, bytes, Optional[bytes]]] = []
+            function_layout_ids = {}
+            for module_name, (function_names, hits) in function_modules.items():
+                layout_id = self.intern_layout(
+                    module_name, constants.store.Kind_Function, function_names
+                )
+                function_layout_ids[module_name] = layout_id
+                hit_rows.append(
+                    (run_id, layout_id, bitset.pack(hits), encode_counts(hits))
+                )
+            branch_layout_ids = {}
+            for module_name, (branch_names, bits) in branch_modules.items():
+                layout_id = self.intern_layout(
+                    module_name, constants.store.Kind_Branch, branch_names
+                )
+                branch_layout_ids[module_name] = layout_id
+                hit_rows.append((run_id, layout_id, bitset.pack(bits), None))
+            self.connection.executemany(
+                "INSERT INTO hits (run_id, layout_id, bits, counts) VALUES (?, ?, ?, ?)",
+                hit_rows,
+            )
+            # add the compressed positions that each context hit in each module,
+            # along with the number of seconds that the context took to run
+            durations = durations or {}
+            for context_name, function_positions, branch_positions in contexts:
+                context_id = self.connection.execute(
+                    "INSERT INTO contexts (run_id, name, duration) VALUES (?, ?, ?)",
+                    (run_id, context_name, durations.get(context_name)),
+                ).lastrowid
+                self.connection.executemany(
+                    "INSERT INTO context_hits (context_id, layout_id, positions) "
+                    "VALUES (?, ?, ?)",
+                    [
+                        (
+                            context_id,
+                            layout_ids[module_name],
+                            bitset.encode_positions(positions),
+                        )
+                        for positions_by_module, layout_ids in (
+                            (function_positions, function_layout_ids),
+                            (branch_positions, branch_layout_ids),
+                        )
+                        for module_name, positions in positions_by_module.items()
+                        if module_name in layout_ids
+                    ],
+                )
+        return run_id
+
+    def find_latest_run(self) -> Optional[int]:
+        """Find the identifier of the run that was added last."""
+        row = self.connection.execute("SELECT MAX(id) FROM runs").fetchone()
+        return row[0]
+
+    def list_runs(self) -> List[Tuple[int, str, str]]:
+        """List the identifier, creation time, and label of each of the runs."""
+        return self.connection.execute(
+            "SELECT id, created, label FROM runs ORDER BY id"
+        ).fetchall()
+
+    def find_probe_names(self, layout_id: int) -> List[str]:
+        """Find the names of the probes in a layout, in the order of their positions."""
+        return [
+            name
+            for (name,) in self.connection.execute(
+                "SELECT probes.name FROM layout_probes "
+                "JOIN probes ON probes.id = layout_probes.probe_id "
+                "WHERE layout_probes.layout_id = ? ORDER BY layout_probes.position",
+                (layout_id,),
+            )
+        ]
+
+    def iterate_hits(
+        self, run_id: int, kind: str
+    ) -> Iterator[Tuple[str, List[str], bytes, Optional[bytes]]]:
+        """Lazily iterate through the hits of each module in a run for a kind of probe."""
+        # note that the rows are fetched from the cursor one at a time and thus
+        # only the modules that the caller actually reads are loaded
+        cursor = self.connection.execute(
+            "SELECT files.name, layouts.id, hits.bits, hits.counts FROM hits "
+            "JOIN layouts ON layouts.id = hits.layout_id "
+            "JOIN files ON files.id = layouts.file_id "
+            "WHERE hits.run_id = ? AND layouts.kind = ? ORDER BY files.name",
+            (run_id, kind),
+        )
+        for file_name, layout_id, bits, counts in cursor:
+            yield file_name, self.find_probe_names(layout_id), bits, counts
+
+    def list_contexts(self, run_id: int) -> List[str]:
+        """List the names of the contexts of a run, in the order in which they were added."""
+        return [
+            name
+            for (name,) in self.connection.execute(
+                "SELECT name FROM contexts WHERE run_id = ? ORDER BY id", (run_id,)
+            )
+        ]
+
+    def iterate_contexts(
+        self, run_id: int
+    ) -> Iterator[Tuple[str, Optional[float], str, str, List[int]]]:
+        """Iterate through the positions that each context of a run hit in each module."""
+        # a context that did not hit any probe still has a row without a module
+        cursor = self.connection.execute(
+            "SELECT contexts.name, contexts.duration, files.name, layouts.kind, "
+            "context_hits.positions FROM contexts "
+            "LEFT JOIN context_hits ON context_hits.context_id = contexts.id "
+            "LEFT JOIN layouts ON layouts.id = context_hits.layout_id "
+            "LEFT JOIN files ON files.id = layouts.file_id "
+            "WHERE contexts.run_id = ? ORDER BY contexts.id",
+            (run_id,),
+        )
+        for context_name, duration, file_name, kind, positions in cursor:
+            yield context_name, duration, file_name, kind, (
+                bitset.decode_positions(positions) if positions is not None else []
+            )
+
+    def find_latest_durations(self) -> Dict[str, float]:
+        """Find the duration of the latest context of each name that recorded one."""
+        return dict(
+            self.connection.execute(
+                "SELECT name, duration FROM contexts WHERE id IN "
+                "(SELECT MAX(id) FROM contexts WHERE duration IS NOT NULL GROUP BY name)"
+            ).fetchall()
+        )
+
+    def find_context_hits(
+        self, run_id: int, context_name: str
+    ) -> Dict[str, Dict[str, List[str]]]:
+        """Find the names of the probes that a context hit, organized by kind and module."""
+        context_hits: Dict[str, Dict[str, List[str]]] = {}
+        for file_name, kind, layout_id, positions in self.connection.execute(
+            "SELECT files.name, layouts.kind, layouts.id, context_hits.positions "
+            "FROM contexts "
+            "JOIN context_hits ON context_hits.context_id = contexts.id "
+            "JOIN layouts ON layouts.id = context_hits.layout_id "
+            "JOIN files ON files.id = layouts.file_id "
+            "WHERE contexts.run_id = ? AND contexts.name = ? ORDER BY files.name",
+            (run_id, context_name),
+        ):
+            names = self.find_probe_names(layout_id)
+            context_hits.setdefault(kind, {})[file_name] = [
+                names[position] for position in bitset.decode_positions(positions)
+            ]
+        return context_hits
+
+    def find_covering_contexts(self, run_id: int, probe_name: str) -> List[str]:
+        """Find the contexts of a run that hit any probe with the specified name."""
+        covering_contexts = []
+        for context_name, position, positions in self.connection.execute(
+            "SELECT contexts.name, layout_probes.position, context_hits.positions "
+            "FROM probes "
+            "JOIN layout_probes ON layout_probes.probe_id = probes.id "
+            "JOIN context_hits ON context_hits.layout_id = layout_probes.layout_id "
+            "JOIN contexts ON contexts.id = context_hits.context_id "
+            "WHERE probes.name = ? AND contexts.run_id = ? ORDER BY contexts.id",
+            (probe_name, run_id),
+        ):
+            if position in bitset.decode_positions(positions) and (
+                context_name not in covering_contexts
+            ):
+                covering_contexts.append(context_name)
+        return covering_contexts
+
+    def list_files(self) -> List[str]:
+        """List the names of all of the files (i.e., the modules) in the store."""
+        return [
+            name
+            for (name,) in self.connection.execute(
+                "SELECT name FROM files ORDER BY name"
+            )
+        ]
+
+    def list_context_names(self) -> List[str]:
+        """List the names of the contexts that were recorded in any of the runs."""
+        return [
+            name
+            for (name,) in self.connection.execute(
+                "SELECT DISTINCT name FROM contexts ORDER BY name"
+            )
+        ]
+
+    def iterate_latest_context_hits(
+        self, file_names: Sequence[str]
+    ) -> Iterator[Tuple[str, str, str, List[str]]]:
+        """Iterate through the probes of files that the latest context of each name hit."""
+        if len(file_names) == 0:
+            return
+        # a run can record only some of the contexts (e.g., when it only runs the
+        # tests that a change impacts) and thus each context's latest record is
+        # the one that describes its coverage, no matter which run recorded it
+        cursor = self.connection.execute(
+            "SELECT contexts.name, files.name, layouts.kind, layouts.id, "
+            "context_hits.positions FROM contexts "
+            "JOIN (SELECT MAX(id) AS id FROM contexts GROUP BY name) AS latest "
+            "ON latest.id = contexts.id "
+            "JOIN context_hits ON context_hits.context_id = contexts.id "
+            "JOIN layouts ON layouts.id = context_hits.layout_id "
+            "JOIN files ON files.id = layouts.file_id "
+            f"WHERE files.name IN ({', '.join('?' * len(file_names))}) "
+            "ORDER BY contexts.id",
+            list(file_names),
+        )
+        # many contexts share the same few layouts and thus each one is found once
+        layout_names: Dict[int, List[str]] = {}
+        for context_name, file_name, kind, layout_id, positions in cursor:
+            if layout_id not in layout_names:
+                layout_names[layout_id] = self.find_probe_names(layout_id)
+            names = layout_names[layout_id]
+            yield context_name, file_name, kind, [
+                names[position] for position in bitset.decode_positions(positions)
+            ]
+
+    def find_covering_runs(self, probe_name: str) -> List[int]:
+        """Find the runs in which any probe with the specified name was hit."""
+        covering_runs = []
+        for run_id, position, bits in self.connection.execute(
+            "SELECT hits.run_id, layout_probes.position, hits.bits FROM probes "
+            "JOIN layout_probes ON layout_probes.probe_id = probes.id "
+            "JOIN hits ON hits.layout_id = layout_probes.layout_id "
+            "WHERE probes.name = ? ORDER BY hits.run_id",
+            (probe_name,),
+        ):
+            if bitset.unpack(bits, position + 1)[position] and (
+                run_id not in covering_runs
+            ):
+                covering_runs.append(run_id)
+        return covering_runs
+
+
+def export_report(coverage_store: CoverageStore, run_id: int) -> CoverageReportType:
+    """Export the coverage of a run in the JSON form of the coverage report."""
+    function_coverage: Dict[str, Dict[str, Union[int, bool]]] = {}
+    for file_name, names, bits, counts in coverage_store.iterate_hits(
+        run_id, constants.store.Kind_Function
+    ):
+        values: Sequence[int] = (
+            decode_counts(counts)
+            if counts is not None
+            else [int(flag) for flag in bitset.unpack(bits, len(names))]
+        )
+        function_coverage[file_name] = dict(recorder.sum_counts(names, values))
+    branch_coverage: Dict[str, Dict[str, Union[int, bool]]] = {}
+    for file_name, names, bits, _ in coverage_store.iterate_hits(
+        run_id, constants.store.Kind_Branch
+    ):
+        branch_coverage[file_name] = dict(zip(names, bitset.unpack(bits, len(names))))
+    return {
+        constants.recorder.Function_Coverage: function_coverage,
+        constants.recorder.Branch_Coverage: branch_coverage,
+    }
+
+
+def import_report(
+    coverage_store: CoverageStore,
+    coverage_report: CoverageReportType,
+    label: str = constants.markers.Nothing,
+) -> int:
+    """Import a coverage report in its JSON form as a new run, returning the run's identifier."""
+    function_modules = {
+        module_name: (
+            list(function_hits.keys()),
+            array(constants.recorder.Counter_Type, function_hits.values()),
+        )
+        for module_name, function_hits in coverage_report.get(
+            constants.recorder.Function_Coverage, {}
+        ).items()
+    }
+    branch_modules = {
+        module_name: (list(branch_hits.keys()), bytearray(branch_hits.values()))
+        for module_name, branch_hits in coverage_report.get(
+            constants.recorder.Branch_Coverage, {}
+        ).items()
+    }
+    return coverage_store.add_run(function_modules, branch_modules, label)
+
+
+def remap_positions(
+    merged_names: List[str],
+    merged_positions: Dict[Tuple[str, int], int],
+    names: Sequence[str],
+) -> List[int]:
+    """Find the position of each name in a merged layout, adding the names that are new."""
+    # a layout can have the same name more than once (e.g., the getter and the
+    # setter of a property) and thus each name is found by its occurrence
+    occurrences: Dict[str, int] = {}
+    positions = []
+    for name in names:
+        occurrence = occurrences.get(name, 0)
+        occurrences[name] = occurrence + 1
+        if (name, occurrence) not in merged_positions:
+            merged_positions[(name, occurrence)] = len(merged_names)
+            merged_names.append(name)
+        positions.append(merged_positions[(name, occurrence)])
+    return positions
+
+
+def merge_runs(
+    coverage_store: CoverageStore,
+    other_stores: Sequence[CoverageStore],
+    label: str = constants.markers.Nothing,
+) -> Optional[int]:
+    """Merge the latest run of each of the other stores into a new run of a store."""
+    # the merged layout of each module and kind of probe has all of the probes
+    # that any of the runs recorded, since the runs can have different layouts
+    # of the same module (e.g., when a shard imported a module that changed)
+    merged_layouts: Dict[Tuple[str, str], MergedLayoutType] = {}
+    merged_values: Dict[Tuple[str, str], List[int]] = {}
+    contexts: Dict[str, ContextType] = {}
+    durations: Dict[str, float] = {}
+    merged_run_count = 0
+    for other_store in other_stores:
+        run_id = other_store.find_latest_run()
+        if run_id is None:
+            continue
+        merged_run_count += 1
+        # the position in the merged layout of each position in this run's layouts
+        remapped_layouts: Dict[Tuple[str, str], List[int]] = {}
+        # the counters of the functions are added together and the
+        # bitmaps of the branches are combined, module by module
+        for kind in (constants.store.Kind_Function, constants.store.Kind_Branch):
+            for file_name, names, bits, counts in other_store.iterate_hits(
+                run_id, kind
+            ):
+                merged_names, merged_positions = merged_layouts.setdefault(
+                    (file_name, kind), ([], {})
+                )
+                remapped_positions = remap_positions(
+                    merged_names, merged_positions, names
+                )
+                remapped_layouts[(file_name, kind)] = remapped_positions
+                values: Sequence[int] = (
+                    decode_counts(counts)
+                    if counts is not None
+                    else [int(flag) for flag in bitset.unpack(bits, len(names))]
+                )
+                module_values = merged_values.setdefault((file_name, kind), [])
+                module_values.extend([0] * (len(merged_names) - len(module_values)))
+                for position, value in zip(remapped_positions, values):
+                    if kind == constants.store.Kind_Function:
+                        module_values[position] += value
+                    else:
+                        module_values[position] |= value
+        # the positions of the contexts refer to this run's layouts and thus
+        # they are remapped to the merged layouts, keeping their durations
+        for (
+            context_name,
+            duration,
+            file_name,
+            kind,
+            positions,
+        ) in other_store.iterate_contexts(run_id):
+            _, function_positions, branch_positions = contexts.setdefault(
+                context_name, (context_name, {}, {})
+            )
+            if duration is not None:
+                durations[context_name] = duration
+            if (file_name, kind) not in remapped_layouts:
+                continue
+            remapped_positions = remapped_layouts[(file_name, kind)]
+            # each of the stores has its own unattributed context and thus the
+            # positions of the contexts with the same name are merged
+            recorder.merge_positions(
+                function_positions
+                if kind == constants.store.Kind_Function
+                else branch_positions,
+                {file_name: [remapped_positions[position] for position in positions]},
+            )
+    if merged_run_count == 0:
+        return None
+    function_modules: Dict[str, Tuple[List[str], array]] = {}
+    branch_modules: Dict[str, Tuple[List[str], bytearray]] = {}
+    for (file_name, kind), (merged_names, _) in merged_layouts.items():
+        module_values = merged_values[(file_name, kind)]
+        module_values.extend([0] * (len(merged_names) - len(module_values)))
+        if kind == constants.store.Kind_Function:
+            function_modules[file_name] = (
+                merged_names,
+                array(constants.recorder.Counter_Type, module_values),
+            )
+        else:
+            branch_modules[file_name] = (merged_names, bytearray(module_values))
+    return coverage_store.add_run(
+        function_modules,
+        branch_modules,
+        label,
+        list(contexts.values()),
+        durations,
+    )
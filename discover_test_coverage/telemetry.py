@@ -0,0 +1,309 @@
+"""Stream the events of a running test suite to discover over a Unix domain socket."""
+
+import asyncio
+import socket
+import struct
+import threading
+import time
+from array import array
+from collections import deque
+from enum import IntEnum
+from pathlib import Path
+from typing import Deque
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+
+from rich.live import Live
+from rich.table import Table
+
+from discover_test_coverage import constants
+from discover_test_coverage import output
+
+# the header of each frame has the type of its event and the length of its
+# payload; note that both ends of a Unix domain socket run on the same host
+# and thus the frames use the native byte order of that host
+HEADER = struct.Struct(constants.telemetry.Header_Format)
+DURATION = struct.Struct(constants.telemetry.Duration_Format)
+NAME_LENGTH = struct.Struct(constants.telemetry.Name_Length_Format)
+
+
+class EventType(IntEnum):
+    """The types of the events that a test suite sends."""
+
+    TEST_START = 1
+    TEST_END = 2
+    FUNCTION_HITS = 3
+    BRANCH_HITS = 4
+
+
+# define the type of a decoded event, which has its type and its payload
+EventFrameType = Tuple[EventType, bytes]
+
+
+def encode_frame(event_type: EventType, payload: bytes) -> bytes:
+    """Encode an event as a frame with a header and a payload."""
+    return HEADER.pack(event_type, len(payload)) + payload
+
+
+def encode_test_start(test_id: str) -> bytes:
+    """Encode the event of a test case that started."""
+    return encode_frame(EventType.TEST_START, test_id.encode())
+
+
+def encode_test_end(test_id: str, duration: float) -> bytes:
+    """Encode the event of a test case that finished, with the number of seconds it ran."""
+    return encode_frame(EventType.TEST_END, DURATION.pack(duration) + test_id.encode())
+
+
+def encode_probe_hits(
+    event_type: EventType, module_name: str, positions: Sequence[int]
+) -> bytes:
+    """Encode the positions of the probes of a module that a test case hit."""
+    name = module_name.encode()
+    return encode_frame(
+        event_type,
+        NAME_LENGTH.pack(len(name))
+        + name
+        + array(constants.telemetry.Position_Type, positions).tobytes(),
+    )
+
+
+def decode_test_end(payload: bytes) -> Tuple[str, float]:
+    """Decode the test case and the duration of the event of a test case that finished."""
+    (duration,) = DURATION.unpack_from(payload)
+    name_start = DURATION.size
+    return payload[name_start:].decode(), duration
+
+
+def decode_probe_hits(payload: bytes) -> Tuple[str, array]:
+    """Decode the module and the positions of the probes that a test case hit."""
+    (name_length,) = NAME_LENGTH.unpack_from(payload)
+    name_start = NAME_LENGTH.size
+    name_end = name_start + name_length
+    positions = array(constants.telemetry.Position_Type)
+    positions.frombytes(payload[name_end:])
+    return payload[name_start:name_end].decode(), positions
+
+
+def decode_frames(buffer: bytearray) -> List[EventFrameType]:
+    """Decode the complete frames at the start of a buffer, removing them from it."""
+    events = []
+    offset = 0
+    # a frame can arrive in several parts and thus the last frame in the
+    # buffer stays there until the rest of its payload arrives
+    while len(buffer) - offset >= HEADER.size:
+        event_type, payload_length = HEADER.unpack_from(buffer, offset)
+        payload_start = offset + HEADER.size
+        frame_end = payload_start + payload_length
+        if frame_end > len(buffer):
+            break
+        events.append((EventType(event_type), bytes(buffer[payload_start:frame_end])))
+        offset = frame_end
+    del buffer[:offset]
+    return events
+
+
+class TelemetrySender:
+    """Send the frames of events in batches from a thread that never blocks the test suite."""
+
+    def __init__(
+        self,
+        socket_path: Path,
+        flush_interval: float = constants.telemetry.Flush_Interval,
+        max_pending: int = constants.telemetry.Max_Pending,
+    ):
+        """Construct a TelemetrySender that is connected to a receiver's socket."""
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.sender_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sender_socket.connect(str(socket_path))
+        # a receiver that stops reading cannot block the end of the test suite
+        self.sender_socket.settimeout(constants.telemetry.Send_Timeout)
+        # the test suite appends the frames to the end of the deque, which is
+        # safe to do while the thread takes the frames from its start, and it
+        # drops the frames that do not fit instead of waiting for the thread
+        self.pending: Deque[bytes] = deque()
+        self.dropped = 0
+        self.failed = False
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def send(self, frame: bytes) -> None:
+        """Queue a frame for the next batch, dropping it when too many frames are pending."""
+        if self.failed or len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self.pending.append(frame)
+
+    def flush(self) -> None:
+        """Send all of the pending frames with a single write."""
+        frames = []
+        while len(self.pending) > 0:
+            frames.append(self.pending.popleft())
+        if len(frames) > 0:
+            self.sender_socket.sendall(b"".join(frames))
+
+    def run(self) -> None:
+        """Send the pending frames in batches until the sender stops."""
+        while not self.stopping.wait(self.flush_interval):
+            try:
+                self.flush()
+            # the receiver stopped, which means that the test suite keeps
+            # running and that the events are dropped from now on
+            except OSError:
+                self.failed = True
+                return
+
+    def close(self) -> None:
+        """Stop the thread, send the frames that are still pending, and disconnect."""
+        self.stopping.set()
+        self.thread.join()
+        if not self.failed:
+            try:
+                self.flush()
+            except OSError:
+                self.failed = True
+        self.dropped += len(self.pending)
+        self.sender_socket.close()
+
+    def __enter__(self) -> "TelemetrySender":
+        """Enter a context in which the sender is connected."""
+        return self
+
+    def __exit__(self, *exception_details) -> None:
+        """Close the sender when leaving the context."""
+        self.close()
+
+
+def connect_sender(socket_path: Optional[str]) -> Optional[TelemetrySender]:
+    """Connect a sender to the receiver's socket, if there is a receiver."""
+    if socket_path is None:
+        return None
+    # the test suite runs the same way without a receiver, just without its events
+    try:
+        return TelemetrySender(Path(socket_path))
+    except OSError:
+        return None
+
+
+class TelemetryAggregate:
+    """Aggregate the events of one or more test suites while they run."""
+
+    def __init__(self) -> None:
+        """Construct a TelemetryAggregate without any events."""
+        self.event_count = 0
+        self.running: Dict[str, float] = {}
+        self.finished_count = 0
+        self.total_duration = 0.0
+        self.slowest: Tuple[str, float] = (constants.markers.Empty, 0.0)
+        # the positions of the probes that any of the test cases hit in each module
+        self.function_hits: Dict[str, Set[int]] = {}
+        self.branch_hits: Dict[str, Set[int]] = {}
+
+    def add(self, event_type: EventType, payload: bytes) -> None:
+        """Add an event to the aggregate."""
+        self.event_count += 1
+        if event_type == EventType.TEST_START:
+            self.running[payload.decode()] = time.monotonic()
+        elif event_type == EventType.TEST_END:
+            test_id, duration = decode_test_end(payload)
+            self.running.pop(test_id, None)
+            self.finished_count += 1
+            self.total_duration += duration
+            if duration > self.slowest[1]:
+                self.slowest = (test_id, duration)
+        else:
+            module_name, positions = decode_probe_hits(payload)
+            hits = (
+                self.function_hits
+                if event_type == EventType.FUNCTION_HITS
+                else self.branch_hits
+            )
+            hits.setdefault(module_name, set()).update(positions)
+
+    def describe(self) -> str:
+        """Describe the aggregate with a single line."""
+        return (
+            f"{self.event_count} events, {self.finished_count} tests finished "
+            f"in {self.total_duration:.2f}s, {len(self.running)} running"
+        )
+
+    def render(self) -> Table:
+        """Render the aggregate as a table."""
+        table = Table(title=self.describe(), title_justify="left")
+        table.add_column("Measure")
+        table.add_column("Value", justify="right")
+        slowest_test_id, slowest_duration = self.slowest
+        table.add_row("Slowest test", f"{slowest_test_id} {slowest_duration:.3f}s")
+        table.add_row(
+            "Functions hit",
+            str(sum(len(positions) for positions in self.function_hits.values())),
+        )
+        table.add_row(
+            "Branch arms hit",
+            str(sum(len(positions) for positions in self.branch_hits.values())),
+        )
+        table.add_row(
+            "Modules hit", str(len(set(self.function_hits) | set(self.branch_hits)))
+        )
+        return table
+
+
+async def receive_events(
+    aggregate: TelemetryAggregate,
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    """Add the events of a single connection to the aggregate until it closes."""
+    buffer = bytearray()
+    try:
+        while True:
+            data = await reader.read(constants.telemetry.Read_Size)
+            if len(data) == 0:
+                break
+            buffer += data
+            for event_type, payload in decode_frames(buffer):
+                aggregate.add(event_type, payload)
+    finally:
+        writer.close()
+
+
+def remove_socket(socket_path: Path) -> None:
+    """Remove the socket at a path, if there is one, leaving any other kind of file."""
+    if socket_path.is_socket():
+        socket_path.unlink()
+
+
+async def serve_telemetry(socket_path: Path, aggregate: TelemetryAggregate) -> None:
+    """Receive the events of the test suites until cancelled, redrawing the aggregate."""
+    # a socket that an earlier receiver left behind would stop this one from
+    # starting, while any other file at the path is never removed
+    remove_socket(socket_path)
+    telemetry_server = await asyncio.start_unix_server(
+        lambda reader, writer: receive_events(aggregate, reader, writer),
+        path=str(socket_path),
+    )
+    try:
+        with Live(console=output.console, auto_refresh=False) as live:
+            while True:
+                await asyncio.sleep(1 / constants.liveview.Frame_Rate)
+                live.update(aggregate.render(), refresh=True)
+    finally:
+        telemetry_server.close()
+        remove_socket(socket_path)
+        output.console.print(f"{constants.markers.Indent}{aggregate.describe()}")
+
+
+def start_telemetry_receiver(socket_path: Path) -> None:
+    """Start a telemetry receiver."""
+    try:
+        asyncio.run(serve_telemetry(socket_path, TelemetryAggregate()))
+    # display a diagnostic message when the receiver is manually stopped
+    except KeyboardInterrupt:
+        output.console.print(constants.discover.Telemetry_Shutdown)
+        output.console.print()
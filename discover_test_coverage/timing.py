@@ -0,0 +1,105 @@
+"""Derive the timeouts of the test runs from the durations of a baseline run."""
+
+import json
+import os
+import signal
+import subprocess
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+
+from discover_test_coverage import constants
+from discover_test_coverage import file
+
+
+def load_timings(timings_file: Path) -> Dict[str, float]:
+    """Load the duration of each test that a baseline run recorded, if any."""
+    # a file that cannot be read only means that there are no
+    # timeouts yet, which is never a reason to stop running the tests
+    try:
+        timings = json.loads(timings_file.read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(timings, dict):
+        return {}
+    return {
+        test_id: float(duration)
+        for test_id, duration in timings.items()
+        if isinstance(duration, (int, float))
+    }
+
+
+def save_timings(timings_file: Path, timings: Mapping[str, float]) -> None:
+    """Save the duration of each test, replacing the file atomically."""
+    file.write_file_replacing(
+        timings_file, json.dumps(dict(timings), indent=2, sort_keys=True)
+    )
+
+
+def estimate_durations(
+    test_ids: Sequence[str], durations: Mapping[str, float]
+) -> List[float]:
+    """Estimate the duration of each test, using the recorded durations when available."""
+    known_durations = [
+        durations[test_id] for test_id in test_ids if test_id in durations
+    ]
+    # a test without a recorded duration (e.g., a new test) is
+    # assumed to take as long as the average of the other tests
+    default_duration = (
+        sum(known_durations) / len(known_durations)
+        if len(known_durations) > 0
+        else constants.timing.Default_Duration
+    )
+    return [durations.get(test_id, default_duration) for test_id in test_ids]
+
+
+def compute_test_timeout(duration: float) -> float:
+    """Compute the timeout of a test from its duration in the baseline run."""
+    return max(constants.timing.Test_Floor, duration * constants.timing.Multiplier)
+
+
+def compute_run_timeout(
+    durations: Mapping[str, float], test_ids: Optional[Sequence[str]] = None
+) -> Optional[float]:
+    """Compute the timeout of a run of the tests, or None when there is no baseline run."""
+    if len(durations) == 0:
+        return None
+    total_duration = (
+        sum(durations.values())
+        if test_ids is None
+        else sum(estimate_durations(test_ids, durations))
+    )
+    return max(constants.timing.Run_Floor, total_duration * constants.timing.Multiplier)
+
+
+def create_timeout_environment(
+    timings_file: Optional[Path], record_timings: bool
+) -> Dict[str, str]:
+    """Create the variables that ask the plugin to enforce and to record the timings."""
+    if timings_file is None:
+        return {}
+    environment = {constants.timing.Timings_Variable: str(timings_file)}
+    if record_timings:
+        environment[constants.timing.Record_Variable] = str(timings_file)
+    return environment
+
+
+def kill_process_group(process_group_id: int) -> None:
+    """Kill every process in a process group, even when some of them already exited."""
+    try:
+        os.killpg(process_group_id, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def stop_process_group(process: subprocess.Popen) -> None:
+    """Stop a process that leads its own group, along with the rest of its group."""
+    # Windows does not have process groups and thus only the process stops there,
+    # while its children (e.g., the test suite that a shell started) keep running
+    if not hasattr(os, "killpg"):
+        process.kill()
+        return
+    kill_process_group(process.pid)
@@ -1,6 +1,6 @@
 """Transfer files."""
 
-import shutil
+from collections import Counter
 from pathlib import Path
 from typing import Callable
 
@@ -9,9 +9,9 @@ from rich.progress import Progress
 from rich.progress import TextColumn
 from rich.table import Column
 
-from discover_test_coverage import codegenerator
 from discover_test_coverage import constants
 from discover_test_coverage import file
+from discover_test_coverage import manifest
 from discover_test_coverage import output
 
 
@@ -19,6 +19,7 @@ def transfer_files(
     project_directory_path: Path,
     program_directory: Path,
     file_finder: Callable,
+    incremental: bool = False,
 ) -> int:
     """Transfer a directory of files to a hidden directory derived from existing directory."""
     # create the fully qualified directory that contains the program's source code
@@ -34,35 +35,65 @@ def transfer_files(
     hidden_program_directory = file.get_hidden_directory(
         project_directory_path, project_directory_path / program_directory
     )
-    # copy each of the individual files in the specified directory,
-    # updating progress bar after each one of the transfers
-    if len(program_files_list) > 0:
+    # determine which of the files are new or were changed since the last run,
+    # as only these files need to be mirrored into the hidden directory
+    program_manifest = manifest.load_manifest(hidden_program_directory)
+    changed_program_files_list, manifest_entries = manifest.find_changed_files(
+        program_manifest,
+        hidden_program_directory,
+        fully_qualified_program_directory,
+        program_files_list,
+        constants.manifest.Kind_Transfer,
+        manifest.compute_transformer_version(),
+    )
+    # a run that is not incremental always mirrors all of the files
+    if not incremental:
+        changed_program_files_list = program_files_list
+    # display the number of files that did not need to be mirrored again
+    reused_file_count = len(program_files_list) - len(changed_program_files_list)
+    if reused_file_count > 0:
+        output.console.print(f":sparkles: Reuse {reused_file_count} unchanged files")
+    # link each of the individual files in the specified directory into the
+    # mirrored hidden directory, updating progress bar after each transfer
+    if len(changed_program_files_list) > 0:
         with Progress() as progress:
             # create the task label for the progress bar
             task = progress.add_task(
-                ":sparkles: Copy test files",
-                total=len(program_files_list),
+                ":sparkles: Mirror files",
+                total=len(changed_program_files_list),
             )
-            # iteratively transfer the source code for each file
-            for program_file in program_files_list:
-                progress.console.print(f"Copying {file.elide_path(program_file)}")
-                # create a new pathlib Path object for the module in the hidden directory
-                instrumented_file = Path(hidden_program_directory / program_file.name)
-                # copy the existing file to the "instrumented" one in hidden directory
-                shutil.copy(program_file, instrumented_file)
-                # create a fully qualified name of this function in this module
-                # so that this detail can be displayed in the generated comment
-                comment_name = (
-                    str(__name__)
-                    + constants.markers.Dot
-                    + str(transfer_files.__qualname__)
+            # iteratively transfer each file, counting how it was transferred
+            transfer_methods: Counter = Counter()
+            for program_file in changed_program_files_list:
+                progress.console.print(f"Mirroring {file.elide_path(program_file)}")
+                # create a new pathlib Path object for the file in the hidden
+                # directory, keeping the same position in the directory structure
+                mirrored_file = file.get_hidden_file(
+                    hidden_program_directory,
+                    fully_qualified_program_directory,
+                    program_file,
+                )
+                # link the existing file to the one in the hidden directory; note
+                # that the file is not modified (e.g., by appending a comment to it)
+                # because any change would also change the linked program file
+                transfer_methods[
+                    file.link_or_copy_file(program_file, mirrored_file)
+                ] += 1
+                # record the mirrored file so that later runs can reuse it
+                relative_path, entry = manifest_entries[program_file]
+                manifest.record_entry(
+                    program_manifest, hidden_program_directory, relative_path, entry
                 )
-                # append a comment indicating that a copy took place in this file
-                with instrumented_file.open("a") as append_to_file:
-                    append_to_file.write(
-                        constants.markers.Newline
-                        + codegenerator.get_discover_comment_code(comment_name)
-                    )
                 # indicate that the current task is finished to advance progress bar
                 progress.advance(task)
+        output.logger.debug(f"Mirrored the files with: {dict(transfer_methods)}")
+    # remove the mirrors of the files that were deleted since
+    # the last run and then save the manifest for the next run
+    manifest.remove_stale_entries(
+        program_manifest,
+        hidden_program_directory,
+        constants.manifest.Kind_Transfer,
+        [relative_path for relative_path, _ in manifest_entries.values()],
+    )
+    manifest.save_manifest(hidden_program_directory, program_manifest)
     return len(program_files_list)
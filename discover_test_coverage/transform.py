@@ -1,40 +1,47 @@
 """Instrument an application and its test suite using libCST transformers."""
 
 import difflib
+import logging
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Callable
+from typing import Deque
+from typing import Iterator
+from typing import List
+from typing import Sequence
+from typing import Tuple
 
 import libcst as cst
 from libcst import Module
+from libcst import PartialParserConfig
 from rich.progress import BarColumn
 from rich.progress import Progress
 from rich.progress import TextColumn
 from rich.table import Column
 
+from discover_test_coverage import constants
 from discover_test_coverage import file
 from discover_test_coverage import instrumentation
+from discover_test_coverage import manifest
 from discover_test_coverage import output
 from discover_test_coverage import transformergenerator
-
-# global configuration of the source tree
-# that libCST creates through initial parse;
-# declared here so that it can be accessed
-# by various visit or leave methods after
-# the initial construction of CAST
-source_tree_configuration = None
+from discover_test_coverage.transformers import testfixtures
 
 
 def create_libcst_transformer(
-    instrumentation_type: instrumentation.InstrumentationType,
+    instrumentation_types: Sequence[instrumentation.InstrumentationType],
+    source_tree_configuration: PartialParserConfig,
 ) -> cst.CSTTransformer:
-    """Create the correct transformer based on the requested type of instrumentation.."""
-    # create a TransformerGenerator that knows how to create a transformer subclass
-    # based on the type on the requested type of instrumentation
-    instrumentation_type_generator = transformergenerator.TransformerGenerator(
-        instrumentation_type
+    """Create the correct transformer based on the requested types of instrumentation."""
+    # generate a transformer that adds all of the requested types of instrumentation
+    # in a single traversal of the tree, giving it the configuration of the source
+    # tree that libcst created through the initial parse so that any code that
+    # the transformer generates matches the conventions of the file
+    libcst_transformer = transformergenerator.generate_composite_transformer(
+        instrumentation_types, source_tree_configuration
     )
-    # generate the requested type of transformer
-    libcst_transformer = instrumentation_type_generator.generate()
     output.logger.debug(f"Created the transformer: {type(libcst_transformer)}")
     return libcst_transformer
 
@@ -42,8 +49,10 @@ def create_libcst_transformer(
 def transform_files_using_libcst(
     project_directory_path: Path,
     program_directory: Path,
-    instrumentation_type: instrumentation.InstrumentationType,
+    instrumentation_types: Sequence[instrumentation.InstrumentationType],
     file_finder: Callable,
+    jobs: int = constants.parallel.Default_Jobs,
+    incremental: bool = False,
 ) -> int:
     """Transform directory of files by adding instrumentation."""
     # create the fully qualified directory that contains the program's source code
@@ -55,56 +64,219 @@ def transform_files_using_libcst(
     text_column = TextColumn("{task.description}", table_column=Column(ratio=1))
     bar_column = BarColumn(bar_width=None, table_column=Column(ratio=2))
     progress = Progress(text_column, bar_column, expand=True)
-    # create a hidden directory that can store the instrumented files
+    # create a hidden directory that can store the instrumented files; note
+    # that an incremental run keeps the files that an earlier run created
     hidden_program_directory = file.create_hidden_directory(
-        project_directory_path, project_directory_path / program_directory
+        project_directory_path,
+        project_directory_path / program_directory,
+        delete_path=not incremental,
+    )
+    # load the manifest of the files that an earlier run already instrumented;
+    # when the run is not incremental the hidden directory was deleted and
+    # thus every one of the program files will be instrumented again
+    program_manifest = manifest.load_manifest(hidden_program_directory)
+    instrumentation_description = instrumentation.describe_instrumentation_types(
+        instrumentation_types
+    )
+    manifest_version = manifest.compute_transformer_version()
+    # determine which of the program files are new or were changed since the
+    # last run, as only these files need to be parsed and then instrumented
+    changed_program_files_list, manifest_entries = manifest.find_changed_files(
+        program_manifest,
+        hidden_program_directory,
+        fully_qualified_program_directory,
+        program_files_list,
+        instrumentation_description,
+        manifest_version,
     )
+    # display the number of files that did not need to be instrumented again
+    reused_file_count = len(program_files_list) - len(changed_program_files_list)
+    if reused_file_count > 0:
+        output.console.print(
+            f":sparkles: Reuse {reused_file_count} unchanged instrumented files"
+        )
     # instrument each of the individual files in the program, updating progress bar
-    if len(program_files_list) > 0:
+    if len(changed_program_files_list) > 0:
         with Progress() as progress:
             # create the instrumentation task label for the progress bar
             task = progress.add_task(
-                f":sparkles: Add {instrumentation_type} instrumentation",
-                total=len(program_files_list),
+                f":sparkles: Add {instrumentation_description} instrumentation",
+                total=len(changed_program_files_list),
             )
             # iteratively transform the source code for each of the program files
-            for program_file in program_files_list:
-                progress.console.print(f"Instrumenting {file.elide_path(program_file)}")
-                # instrument the current program file for the specific coverage type
-                instrumented_module = transform_file_using_libcst(
-                    program_file, instrumentation_type
-                )
-                # create a new pathlib Path object for the instrumented module
-                instrumented_file = Path(hidden_program_directory / program_file.name)
-                instrumented_file.write_text(instrumented_module.code)
-                # indicate that the current task is finished to advance progress bar
-                progress.advance(task)
+            # using only the current process, which is the default approach
+            if jobs == 1:
+                for program_file in changed_program_files_list:
+                    progress.console.print(
+                        f"Instrumenting {file.elide_path(program_file)}"
+                    )
+                    # instrument the current program file for the specific coverage
+                    # type and then write it to a file inside of the hidden directory
+                    write_transformed_file(
+                        program_file,
+                        file.get_hidden_file(
+                            hidden_program_directory,
+                            fully_qualified_program_directory,
+                            program_file,
+                        ),
+                        instrumentation_types,
+                    )
+                    # record the instrumented file so that later runs can reuse it
+                    relative_path, entry = manifest_entries[program_file]
+                    manifest.record_entry(
+                        program_manifest, hidden_program_directory, relative_path, entry
+                    )
+                    # indicate that the current task is finished to advance progress bar
+                    progress.advance(task)
+            # transform the source code for the program files in a pool of processes,
+            # reporting on each file in the same order as the single-process approach
+            else:
+                for program_file in transform_files_in_process_pool(
+                    changed_program_files_list,
+                    hidden_program_directory,
+                    fully_qualified_program_directory,
+                    instrumentation_types,
+                    jobs,
+                ):
+                    progress.console.print(
+                        f"Instrumenting {file.elide_path(program_file)}"
+                    )
+                    # record the instrumented file so that later runs can reuse it
+                    relative_path, entry = manifest_entries[program_file]
+                    manifest.record_entry(
+                        program_manifest, hidden_program_directory, relative_path, entry
+                    )
+                    # indicate that the current task is finished to advance progress bar
+                    progress.advance(task)
+    # remove the instrumented files for program files that were deleted
+    # since the last run and then save the manifest for the next run
+    manifest.remove_stale_entries(
+        program_manifest,
+        hidden_program_directory,
+        instrumentation_description,
+        [relative_path for relative_path, _ in manifest_entries.values()],
+    )
+    manifest.save_manifest(hidden_program_directory, program_manifest)
     return len(program_files_list)
 
 
+def transform_files_in_process_pool(
+    program_files_list: List[Path],
+    hidden_program_directory: Path,
+    program_directory: Path,
+    instrumentation_types: Sequence[instrumentation.InstrumentationType],
+    jobs: int,
+) -> Iterator[Path]:
+    """Transform files in a pool of processes, yielding each file in order once written."""
+    # bound the number of files that can be in flight at the same time so
+    # that the queued work and the pending results do not exhaust memory
+    maximum_in_flight = jobs * constants.parallel.In_Flight_Per_Job
+    # keep the pending work in the order of submission so that the files
+    # are reported in the same order as the single-process approach
+    pending_transformations: Deque[Tuple[Path, Future]] = deque()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for program_file in program_files_list:
+            # there are too many files in flight and thus it is necessary to wait
+            # for the oldest one to finish before submitting any more of them;
+            # note that result() will raise any exception from the worker process
+            if len(pending_transformations) >= maximum_in_flight:
+                finished_file, finished_future = pending_transformations.popleft()
+                finished_future.result()
+                yield finished_file
+            # submit the current program file for instrumentation in a worker process
+            future = executor.submit(
+                write_transformed_file,
+                program_file,
+                file.get_hidden_file(
+                    hidden_program_directory, program_directory, program_file
+                ),
+                instrumentation_types,
+            )
+            pending_transformations.append((program_file, future))
+        # wait for all of the remaining files to finish their instrumentation
+        while len(pending_transformations) > 0:
+            finished_file, finished_future = pending_transformations.popleft()
+            finished_future.result()
+            yield finished_file
+
+
+def write_transformed_file(
+    program_file: Path,
+    instrumented_file: Path,
+    instrumentation_types: Sequence[instrumentation.InstrumentationType],
+) -> None:
+    """Transform specified file and write the instrumented source code to a new file."""
+    # instrument the program file for the specific coverage type; note that
+    # this function is defined at module level so that a process pool can run it
+    instrumented_source_text = transform_source(
+        program_file.read_text(), instrumentation_types
+    )
+    # write the instrumented module to the provided pathlib Path object, replacing
+    # the file so that a link to the program file is never written through
+    file.write_file_replacing(instrumented_file, instrumented_source_text)
+
+
+def transform_source(
+    source_text: str,
+    instrumentation_types: Sequence[instrumentation.InstrumentationType],
+) -> str:
+    """Transform source code by adding instrumentation, avoiding libcst when possible."""
+    # the only instrumentation is the import of the test fixtures, which can be
+    # spliced into the source code after finding the docstring with the tokenizer
+    if instrumentation.order_instrumentation_types(instrumentation_types) == [
+        instrumentation.InstrumentationType.FIXTURE
+    ]:
+        instrumented_source_text = testfixtures.insert_fixture_import(source_text)
+        if instrumented_source_text is not None:
+            log_source_diff(source_text, instrumented_source_text)
+            return instrumented_source_text
+    # use libcst to add all other types of instrumentation and to add the
+    # import of the test fixtures to modules with an unusual layout
+    return transform_source_using_libcst(source_text, instrumentation_types).code
+
+
 def transform_file_using_libcst(
     program_file: Path,
-    instrumentation_type: instrumentation.InstrumentationType,
+    instrumentation_types: Sequence[instrumentation.InstrumentationType],
 ) -> Module:
     """Transform specified file by adding instrumentation for fortified coverage."""
-    global source_tree_configuration
     # extract the source code from the file so that it can be instrumented
     single_file_text = program_file.read_text()
+    return transform_source_using_libcst(single_file_text, instrumentation_types)
+
+
+def transform_source_using_libcst(
+    single_file_text: str,
+    instrumentation_types: Sequence[instrumentation.InstrumentationType],
+) -> Module:
+    """Transform source code by adding instrumentation for fortified coverage."""
     # use libcst to parse the source code of the file
     source_tree = cst.parse_module(single_file_text)
     # use the helper function to create the correct type of transformer
-    # that uses libcst to instrumented the program file
-    transformer = create_libcst_transformer(instrumentation_type)
-    source_tree_configuration = source_tree.config_for_parsing
+    # that uses libcst to instrumented the program file; note that the
+    # configuration of the source tree is specific to this file and thus
+    # it is passed to the transformer instead of being stored globally
+    transformer = create_libcst_transformer(
+        instrumentation_types, source_tree.config_for_parsing
+    )
     # visit the source code using the constructed transformer
     # so that the instrumentation exists in the modified tree
     modified_tree = source_tree.visit(transformer)
+    log_source_diff(single_file_text, modified_tree.code)
+    return modified_tree
+
+
+def log_source_diff(source_text: str, instrumented_source_text: str) -> None:
+    """Log the differences between the source code and the instrumented source code."""
+    # computing the differences is expensive and thus it only
+    # happens when the logger will actually display the result
+    if not output.logger.isEnabledFor(logging.DEBUG):
+        return
     output.logger.debug("Diff of the modified source code:")
     output.logger.debug(
         "".join(
             difflib.unified_diff(
-                single_file_text.splitlines(1), modified_tree.code.splitlines(1)  # type: ignore
+                source_text.splitlines(1), instrumented_source_text.splitlines(1)  # type: ignore
             )
         )
     )
-    return modified_tree
@@ -1,7 +1,15 @@
 """Generate different subclasses of CSTTransformer depending on requested instrumentation."""
 
+from typing import Iterable
+
 import libcst as cst
+from libcst import PartialParserConfig
 
+from discover_test_coverage import instrumentation
+from discover_test_coverage.transformers import branchcoverage
+from discover_test_coverage.transformers import composite
+from discover_test_coverage.transformers import disableschema
+from discover_test_coverage.transformers import functioncoverage
 from discover_test_coverage.transformers import testfixtures
 
 
@@ -14,17 +22,61 @@ class TransformerGenerator(object):
 
     def generate(self, *args, **kwgs) -> cst.CSTTransformer:
         """Generate a transformer based on type of instrumentation needed."""
-        return getattr(self, "generate_transformer_{}".format(self.type))(*args, **kwgs)
+        # use the value of the enum so that the name of the function does not
+        # depend on the way that a specific version of Python formats an enum
+        instrumentation_type = instrumentation.InstrumentationType(self.type)
+        return getattr(
+            self, "generate_transformer_{}".format(instrumentation_type.value)
+        )(*args, **kwgs)
 
-    def generate_transformer_function(self) -> None:
+    def generate_transformer_function(
+        self, source_tree_configuration: PartialParserConfig
+    ) -> cst.CSTTransformer:
         """Generate a fortified function coverage transformer to create an instrumented program."""
-        print("TODO: function coverage transformer")
+        transformer = functioncoverage.FunctionCoverageTransformer(
+            source_tree_configuration
+        )
+        return transformer
 
-    def generate_transformer_branch(self) -> None:
+    def generate_transformer_branch(
+        self, source_tree_configuration: PartialParserConfig
+    ) -> cst.CSTTransformer:
         """Generate a fortified branch coverage transformer to create an instrumented program."""
-        print("TODO: branch transformer")
+        transformer = branchcoverage.BranchCoverageTransformer(
+            source_tree_configuration
+        )
+        return transformer
 
-    def generate_transformer_fixture(self) -> cst.CSTTransformer:
+    def generate_transformer_schema(
+        self, source_tree_configuration: PartialParserConfig
+    ) -> cst.CSTTransformer:
+        """Generate a schema transformer to create a program whose functions can be disabled."""
+        transformer = disableschema.DisableSchemaTransformer(source_tree_configuration)
+        return transformer
+
+    def generate_transformer_fixture(
+        self, source_tree_configuration: PartialParserConfig
+    ) -> cst.CSTTransformer:
         """Generate a test fixture transformer to create an instrumented test suite."""
-        transformer = testfixtures.TestFixtureTransformer()
+        transformer = testfixtures.TestFixtureTransformer(source_tree_configuration)
         return transformer
+
+
+def generate_composite_transformer(
+    instrumentation_types: Iterable[instrumentation.InstrumentationType],
+    source_tree_configuration: PartialParserConfig,
+) -> cst.CSTTransformer:
+    """Generate one transformer that adds all of the requested types of instrumentation."""
+    # generate a transformer for each of the requested types of instrumentation,
+    # using the defined order of the types so that the output is deterministic
+    transformers = [
+        TransformerGenerator(instrumentation_type).generate(source_tree_configuration)
+        for instrumentation_type in instrumentation.order_instrumentation_types(
+            instrumentation_types
+        )
+    ]
+    # there is only one transformer and thus there is no need to compose it
+    if len(transformers) == 1:
+        return transformers[0]
+    # compose the transformers so that they all run in a single traversal
+    return composite.CompositeTransformer(transformers)
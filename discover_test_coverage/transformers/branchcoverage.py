@@ -0,0 +1,395 @@
+"""Instrument an application for branch coverage using libCST."""
+
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import cast
+
+import libcst as cst
+from libcst import PartialParserConfig
+
+from discover_test_coverage import codegenerator
+from discover_test_coverage import constants
+from discover_test_coverage import output
+from discover_test_coverage.transformers import functioncoverage
+
+
+def add_parentheses(expression: cst.BaseExpression) -> cst.BaseExpression:
+    """Add parentheses to an expression that cannot be the operand of a boolean operator."""
+    # note that these expressions have a lower precedence than the "or" operator
+    # and thus they would change meaning when used as its right operand
+    # and thus they would change meaning when used as its right operand, while
+    # a tuple without parentheses would change meaning as the element of a tuple
+    if isinstance(expression, (cst.IfExp, cst.Lambda, cst.NamedExpr, cst.Tuple)) and (
+        len(expression.lpar) == 0
+    ):
+        return expression.with_changes(lpar=[cst.LeftParen()], rpar=[cst.RightParen()])
+    return expression
+
+
+class ExitProbeTransformer(cst.CSTTransformer):
+    """Record an arm wherever a return, break, or continue statement leaves a body."""
+
+    def __init__(
+        self,
+        probe_statement: cst.SimpleStatementLine,
+        probe_expression: cst.BaseExpression,
+        record_continue: bool,
+    ):
+        """Construct an ExitProbeTransformer that adds the probes of an arm."""
+        self.probe_statement = probe_statement
+        self.probe_expression = probe_expression
+        # a continue statement leaves the body of a try statement but it
+        # stays in the loop whose body it is and thus it is not its exit
+        self.record_continue = record_continue
+        # the number of loops in the body around the current node, whose
+        # break and continue statements stay in the body
+        self.loop_depth = 0
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> Optional[bool]:
+        """Skip a nested function, whose return statements only leave that function."""
+        return False
+
+    def visit_ClassDef(self, node: cst.ClassDef) -> Optional[bool]:
+        """Skip a nested class, whose methods only leave themselves."""
+        return False
+
+    def visit_For_body(self, node: cst.For) -> None:
+        """Enter the body of a nested for loop."""
+        self.loop_depth += 1
+
+    def leave_For_body(self, node: cst.For) -> None:
+        """Leave the body of a nested for loop."""
+        self.loop_depth -= 1
+
+    def visit_While_body(self, node: cst.While) -> None:
+        """Enter the body of a nested while loop."""
+        self.loop_depth += 1
+
+    def leave_While_body(self, node: cst.While) -> None:
+        """Leave the body of a nested while loop."""
+        self.loop_depth -= 1
+
+    def add_probes(
+        self, statements: Sequence[cst.BaseSmallStatement]
+    ) -> List[cst.BaseSmallStatement]:
+        """Add the probe to each of the statements that leave the body."""
+        probed_statements: List[cst.BaseSmallStatement] = []
+        for statement in statements:
+            # the value of a return statement is evaluated before the probe, so
+            # that a value that raises an exception does not record the arm
+            if isinstance(statement, cst.Return) and statement.value is not None:
+                statement = statement.with_changes(
+                    value=cst.Subscript(
+                        value=cst.Tuple(
+                            elements=[
+                                cst.Element(add_parentheses(statement.value)),
+                                cst.Element(self.probe_expression),
+                            ]
+                        ),
+                        slice=[cst.SubscriptElement(cst.Index(cst.Integer("0")))],
+                    )
+                )
+            elif isinstance(statement, cst.Return) or (
+                self.loop_depth == 0
+                and (
+                    isinstance(statement, cst.Break)
+                    or (self.record_continue and isinstance(statement, cst.Continue))
+                )
+            ):
+                probed_statements.append(self.probe_statement.body[0])
+            probed_statements.append(statement)
+        return probed_statements
+
+    def leave_SimpleStatementLine(
+        self,
+        original_node: cst.SimpleStatementLine,
+        updated_node: cst.SimpleStatementLine,
+    ) -> cst.SimpleStatementLine:
+        """Add the probe to the statements of a line that leave the body."""
+        return updated_node.with_changes(body=self.add_probes(updated_node.body))
+
+    def leave_SimpleStatementSuite(
+        self,
+        original_node: cst.SimpleStatementSuite,
+        updated_node: cst.SimpleStatementSuite,
+    ) -> cst.SimpleStatementSuite:
+        """Add the probe to the statements of a body on its header's line that leave the body."""
+        return updated_node.with_changes(body=self.add_probes(updated_node.body))
+
+
+class BranchCoverageTransformer(cst.CSTTransformer):
+    """Transform program source code to collect fortified branch coverage."""
+
+    def __init__(self, source_tree_configuration: PartialParserConfig):
+        """Construct a BranchCoverageTransformer for a source tree."""
+        # configuration of the source tree that libcst created through
+        # the initial parse of the module that this will transform
+        self.source_tree_configuration = source_tree_configuration
+        # stack for storing the canonical name of the current class or function
+        self.stack: List[str] = []
+        # the names of the branch arms, in the order in which they were visited,
+        # so that the position of an arm's name is its dense integer ID
+        self.branch_names: List[str] = []
+        # stack for storing the IDs of the arms of the nodes that are being visited,
+        # which works because each node is left in the reverse order of visiting
+        self.branch_ids: List[Tuple[int, ...]] = []
+        # the number of decisions (e.g., if statements) that were visited
+        self.decision_count = 0
+        # construct a fully qualified name of the BranchCoverageTransformer
+        self.name = str(
+            self.__module__ + constants.markers.Dot + type(self).__qualname__
+        )
+
+    def add_branches(self, kind: str, *arms: str) -> None:
+        """Assign the next IDs to the arms of a decision, naming them by their scope."""
+        scope = constants.markers.Dot.join(self.stack) or constants.code.Module_Scope
+        decision = f"{kind}{constants.markers.Hash}{self.decision_count}"
+        self.decision_count += 1
+        branch_ids = []
+        for arm in arms:
+            branch_ids.append(len(self.branch_names))
+            self.branch_names.append(
+                constants.markers.Colon.join((scope, decision, arm))
+            )
+        self.branch_ids.append(tuple(branch_ids))
+
+    def create_probe_statement(self, branch_id: int) -> cst.SimpleStatementLine:
+        """Create the statement that records that the arm with an ID was taken."""
+        # note that the generated statement is always a simple statement
+        return cast(
+            cst.SimpleStatementLine,
+            cst.parse_statement(
+                codegenerator.get_branch_coverage_probe_code(branch_id),
+                config=self.source_tree_configuration,
+            ),
+        )
+
+    def create_probe_expression(
+        self, branch_id: int, expression: cst.BaseExpression
+    ) -> cst.BaseExpression:
+        """Wrap an expression so that evaluating it records that the arm with an ID was taken."""
+        # the call to __setitem__ returns None and thus the "or" operator
+        # always evaluates to the value of the original expression
+        return cst.BooleanOperation(
+            left=cst.parse_expression(
+                codegenerator.get_branch_coverage_probe_expression_code(branch_id),
+                config=self.source_tree_configuration,
+            ),
+            operator=cst.Or(),
+            right=add_parentheses(expression),
+            lpar=[cst.LeftParen()],
+            rpar=[cst.RightParen()],
+        )
+
+    def add_probe(self, body: cst.BaseSuite, branch_id: int) -> cst.BaseSuite:
+        """Add the statement that records an arm to the start of a body of statements."""
+        probe_statement = self.create_probe_statement(branch_id)
+        # the body is on the same line as its header (e.g., "if x: return 1")
+        # and thus the probe is added to that same line
+        if isinstance(body, cst.SimpleStatementSuite):
+            return body.with_changes(body=[probe_statement.body[0], *body.body])
+        indented_body = cast(cst.IndentedBlock, body)
+        return indented_body.with_changes(body=[probe_statement, *indented_body.body])
+
+    def add_exit_probes(
+        self, body: cst.BaseSuite, branch_id: int, record_continue: bool
+    ) -> cst.BaseSuite:
+        """Add the probes that record an arm to the statements that leave a body."""
+        exit_probe_transformer = ExitProbeTransformer(
+            self.create_probe_statement(branch_id),
+            cst.parse_expression(
+                codegenerator.get_branch_coverage_probe_expression_code(branch_id),
+                config=self.source_tree_configuration,
+            ),
+            record_continue,
+        )
+        return cast(cst.BaseSuite, body.visit(exit_probe_transformer))
+
+    def create_else(self, orelse: Optional[cst.Else], branch_id: int) -> cst.Else:
+        """Add the probe to an else clause, creating the else clause when there is none."""
+        if orelse is None:
+            return cst.Else(
+                body=cst.IndentedBlock(body=[self.create_probe_statement(branch_id)])
+            )
+        return orelse.with_changes(body=self.add_probe(orelse.body, branch_id))
+
+    def visit_ClassDef(self, node: cst.ClassDef) -> Optional[bool]:
+        """Add the name of the class to the stack of names."""
+        self.stack.append(node.name.value)
+        return True
+
+    def leave_ClassDef(
+        self, original_node: cst.ClassDef, updated_node: cst.ClassDef
+    ) -> cst.ClassDef:
+        """Remove the name of the class from the stack of names."""
+        self.stack.pop()
+        return updated_node
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> Optional[bool]:
+        """Add the name of the function to the stack of names."""
+        self.stack.append(node.name.value)
+        return True
+
+    def leave_FunctionDef(
+        self, original_node: cst.FunctionDef, updated_node: cst.FunctionDef
+    ) -> cst.FunctionDef:
+        """Remove the name of the function from the stack of names."""
+        self.stack.pop()
+        return updated_node
+
+    def visit_If(self, node: cst.If) -> Optional[bool]:
+        """Assign the IDs of the arms of an if statement."""
+        # the false arm of an if statement followed by an elif is not recorded since
+        # it is the same as evaluating the elif, which records its own two arms
+        if isinstance(node.orelse, cst.If):
+            self.add_branches(constants.branches.If, constants.branches.True_Arm)
+        else:
+            self.add_branches(
+                constants.branches.If,
+                constants.branches.True_Arm,
+                constants.branches.False_Arm,
+            )
+        return True
+
+    def leave_If(self, original_node: cst.If, updated_node: cst.If) -> cst.If:
+        """Record the arms of an if statement, adding an else clause when needed."""
+        branch_ids = self.branch_ids.pop()
+        updated_node = updated_node.with_changes(
+            body=self.add_probe(updated_node.body, branch_ids[0])
+        )
+        if len(branch_ids) > 1:
+            updated_node = updated_node.with_changes(
+                orelse=self.create_else(
+                    cast(Optional[cst.Else], updated_node.orelse), branch_ids[1]
+                )
+            )
+        return updated_node
+
+    def visit_While(self, node: cst.While) -> Optional[bool]:
+        """Assign the IDs of the arms of a while loop."""
+        self.add_branches(
+            constants.branches.While,
+            constants.branches.Loop_Arm,
+            constants.branches.Exit_Arm,
+        )
+        return True
+
+    def leave_While(
+        self, original_node: cst.While, updated_node: cst.While
+    ) -> cst.While:
+        """Record the arms of a while loop, using the else clause and each break for its exit."""
+        # the else clause of a loop runs exactly when its condition is false,
+        # while a break or a return leaves the loop without running it, and
+        # thus each of them records the exit arm
+        branch_ids = self.branch_ids.pop()
+        body = self.add_exit_probes(updated_node.body, branch_ids[1], False)
+        return updated_node.with_changes(
+            body=self.add_probe(body, branch_ids[0]),
+            orelse=self.create_else(updated_node.orelse, branch_ids[1]),
+        )
+
+    def visit_For(self, node: cst.For) -> Optional[bool]:
+        """Assign the IDs of the arms of a for loop."""
+        self.add_branches(
+            constants.branches.For,
+            constants.branches.Loop_Arm,
+            constants.branches.Exit_Arm,
+        )
+        return True
+
+    def leave_For(self, original_node: cst.For, updated_node: cst.For) -> cst.For:
+        """Record the arms of a for loop, using the else clause and each break for its exit."""
+        branch_ids = self.branch_ids.pop()
+        body = self.add_exit_probes(updated_node.body, branch_ids[1], False)
+        return updated_node.with_changes(
+            body=self.add_probe(body, branch_ids[0]),
+            orelse=self.create_else(updated_node.orelse, branch_ids[1]),
+        )
+
+    def visit_Try(self, node: cst.Try) -> Optional[bool]:
+        """Assign the IDs of the arms of a try statement with exception handlers."""
+        # a try statement without any handlers cannot have an else
+        # clause and all of its code always runs and thus it has no arms
+        arms: Sequence[str] = []
+        if len(node.handlers) > 0:
+            arms = [
+                constants.branches.Except_Arm.format(index)
+                for index in range(len(node.handlers))
+            ] + [constants.branches.Else_Arm]
+        self.add_branches(constants.branches.Try, *arms)
+        return True
+
+    def leave_Try(self, original_node: cst.Try, updated_node: cst.Try) -> cst.Try:
+        """Record the arms of a try statement, one for each handler and one for no exception."""
+        branch_ids = self.branch_ids.pop()
+        if len(branch_ids) == 0:
+            return updated_node
+        handlers = [
+            handler.with_changes(body=self.add_probe(handler.body, branch_id))
+            for handler, branch_id in zip(updated_node.handlers, branch_ids)
+        ]
+        # the body finishes without an exception when it reaches its end, which
+        # runs the else clause, or when it leaves through a return, a break, or
+        # a continue, which skips the else clause
+        return updated_node.with_changes(
+            body=self.add_exit_probes(updated_node.body, branch_ids[-1], True),
+            handlers=handlers,
+            orelse=self.create_else(updated_node.orelse, branch_ids[-1]),
+        )
+
+    def visit_BooleanOperation(self, node: cst.BooleanOperation) -> Optional[bool]:
+        """Assign the ID of the arm that evaluates the right operand."""
+        self.add_branches(constants.branches.Boolean, constants.branches.Right_Arm)
+        return True
+
+    def leave_BooleanOperation(
+        self, original_node: cst.BooleanOperation, updated_node: cst.BooleanOperation
+    ) -> cst.BooleanOperation:
+        """Record that the right operand was evaluated instead of short-circuited."""
+        branch_ids = self.branch_ids.pop()
+        return updated_node.with_changes(
+            right=self.create_probe_expression(branch_ids[0], updated_node.right)
+        )
+
+    def visit_IfExp(self, node: cst.IfExp) -> Optional[bool]:
+        """Assign the IDs of the arms of a conditional expression."""
+        self.add_branches(
+            constants.branches.If_Expression,
+            constants.branches.True_Arm,
+            constants.branches.False_Arm,
+        )
+        return True
+
+    def leave_IfExp(
+        self, original_node: cst.IfExp, updated_node: cst.IfExp
+    ) -> cst.IfExp:
+        """Record the arm of a conditional expression that was evaluated."""
+        branch_ids = self.branch_ids.pop()
+        return updated_node.with_changes(
+            body=self.create_probe_expression(branch_ids[0], updated_node.body),
+            orelse=self.create_probe_expression(branch_ids[1], updated_node.orelse),
+        )
+
+    def leave_Module(
+        self, original_node: cst.Module, updated_node: cst.Module
+    ) -> cst.Module:
+        """Register the branches of the module with the recorder when it is imported."""
+        output.logger.debug(f"Recording {len(self.branch_names)} branch arms")
+        # there are no branches in this module and thus nothing to register
+        if len(self.branch_names) == 0:
+            return updated_node
+        registration_statements = [
+            cst.parse_statement(
+                registration_code, config=self.source_tree_configuration
+            )
+            for registration_code in codegenerator.get_branch_coverage_registration_code(
+                self.branch_names
+            )
+        ]
+        # the bitmap must exist before any of the module's code runs
+        position = functioncoverage.find_start_of_code(updated_node.body)
+        statements = list(updated_node.body)
+        statements[position:position] = registration_statements
+        return updated_node.with_changes(body=statements)
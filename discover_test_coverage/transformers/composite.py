@@ -0,0 +1,96 @@
+"""Apply several libCST transformers to a module in a single traversal."""
+
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Union
+
+import libcst as cst
+from libcst import CSTNodeT
+from libcst import FlattenSentinel
+from libcst import RemovalSentinel
+
+from discover_test_coverage import constants
+from discover_test_coverage import output
+
+# the CompositeTransformer follows these rules when combining transformers:
+# -- the transformers visit each node in the order in which they were provided
+# and then leave each node in the reverse order, so the first transformer is
+# the outermost one and it leaves nodes that contain the changes of the others
+# -- when a transformer asks to skip the children of a node, it will not visit
+# or leave any of them, even when another transformer does visit the children
+# -- when a transformer removes or flattens a node, the remaining transformers
+# do not leave that node since there is no longer a single node to leave
+
+
+class CompositeTransformer(cst.CSTTransformer):
+    """Transform source code with several transformers while only visiting it once."""
+
+    def __init__(self, transformers: Sequence[cst.CSTTransformer]):
+        """Construct a CompositeTransformer from transformers that are already ordered."""
+        self.transformers = list(transformers)
+        # for each transformer, the node whose children it decided to skip
+        # or None when that transformer is visiting every node that it reaches
+        self.skipped_nodes: List[Optional[cst.CSTNode]] = [None] * len(transformers)
+        # construct a fully qualified name of the CompositeTransformer
+        self.name = str(
+            self.__module__ + constants.markers.Dot + type(self).__qualname__
+        )
+        output.logger.debug(
+            f"Composing the transformers: {[type(t) for t in self.transformers]}"
+        )
+
+    def is_active(self, index: int) -> bool:
+        """Determine if the transformer at an index is not skipping the current node."""
+        return self.skipped_nodes[index] is None
+
+    def on_visit(self, node: cst.CSTNode) -> bool:
+        """Visit a node with each active transformer, in order."""
+        visit_children = False
+        for index, transformer in enumerate(self.transformers):
+            if self.is_active(index):
+                # the transformer wants to visit the children of this node
+                if transformer.on_visit(node):
+                    visit_children = True
+                # the transformer does not want to visit the children and thus
+                # it will not be active again until it leaves this same node
+                else:
+                    self.skipped_nodes[index] = node
+        # only visit the children when at least one transformer wants to
+        return visit_children
+
+    def on_visit_attribute(self, node: cst.CSTNode, attribute: str) -> None:
+        """Visit the attribute of a node with each active transformer, in order."""
+        for index, transformer in enumerate(self.transformers):
+            if self.is_active(index):
+                transformer.on_visit_attribute(node, attribute)
+
+    def on_leave_attribute(self, original_node: cst.CSTNode, attribute: str) -> None:
+        """Leave the attribute of a node with each active transformer, in reverse order."""
+        for index in reversed(range(len(self.transformers))):
+            if self.is_active(index):
+                self.transformers[index].on_leave_attribute(original_node, attribute)
+
+    def on_leave(
+        self, original_node: CSTNodeT, updated_node: CSTNodeT
+    ) -> Union[CSTNodeT, RemovalSentinel, FlattenSentinel[CSTNodeT]]:
+        """Leave a node with each transformer that visited it, in reverse order."""
+        for index in reversed(range(len(self.transformers))):
+            # the transformer skipped the children of an enclosing node
+            # and thus it must not leave any of those children
+            if not self.is_active(index):
+                if self.skipped_nodes[index] is not original_node:
+                    continue
+                # the transformer skipped the children of this node and thus
+                # it should leave this node and then become active again
+                self.skipped_nodes[index] = None
+            left_node = self.transformers[index].on_leave(original_node, updated_node)
+            # the transformer removed or flattened the node and thus there is no
+            # longer a single node that the remaining transformers could leave
+            if isinstance(left_node, (RemovalSentinel, FlattenSentinel)):
+                for remaining_index in range(index):
+                    if self.skipped_nodes[remaining_index] is original_node:
+                        self.skipped_nodes[remaining_index] = None
+                return left_node
+            updated_node = left_node
+        return updated_node
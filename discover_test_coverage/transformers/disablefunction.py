@@ -0,0 +1,189 @@
+"""Disable a function of an application using libCST."""
+
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import cast
+
+import libcst as cst
+from libcst import PartialParserConfig
+
+from discover_test_coverage import constants
+from discover_test_coverage import output
+from discover_test_coverage.transformers import functioncoverage
+
+
+class FunctionNameCollector(cst.CSTVisitor):
+    """Collect the canonical names of all of the functions, in the order of the source code."""
+
+    def __init__(self) -> None:
+        """Construct a FunctionNameCollector."""
+        # stack for storing the canonical name of the current function, which
+        # matches the names that the function coverage transformer records
+        self.stack: List[str] = []
+        # the names of the functions, where a name appears more than once when
+        # functions share it (e.g., the getter and the setter of a property)
+        self.function_names: List[str] = []
+
+    def visit_ClassDef(self, node: cst.ClassDef) -> Optional[bool]:
+        """Add the name of the class to the stack of names."""
+        self.stack.append(node.name.value)
+        return True
+
+    def leave_ClassDef(self, original_node: cst.ClassDef) -> None:
+        """Remove the name of the class from the stack of names."""
+        self.stack.pop()
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> Optional[bool]:
+        """Record the canonical name of the function."""
+        self.stack.append(node.name.value)
+        self.function_names.append(constants.markers.Dot.join(self.stack))
+        return True
+
+    def leave_FunctionDef(self, original_node: cst.FunctionDef) -> None:
+        """Remove the name of the function from the stack of names."""
+        self.stack.pop()
+
+
+class YieldFinder(cst.CSTVisitor):
+    """Find whether a function yields, without visiting the functions nested inside of it."""
+
+    def __init__(self) -> None:
+        """Construct a YieldFinder."""
+        self.depth = 0
+        self.yields = False
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> Optional[bool]:
+        """Visit the body of the function only when it is the outermost one."""
+        self.depth += 1
+        return self.depth == 1
+
+    def leave_FunctionDef(self, original_node: cst.FunctionDef) -> None:
+        """Leave the function."""
+        self.depth -= 1
+
+    def visit_Lambda(self, node: cst.Lambda) -> Optional[bool]:
+        """Skip the lambda since a yield inside of it makes the lambda a generator."""
+        return False
+
+    def visit_Yield(self, node: cst.Yield) -> Optional[bool]:
+        """Record that the function yields."""
+        self.yields = True
+        return False
+
+
+def is_generator(function_node: cst.FunctionDef) -> bool:
+    """Determine whether a function is a generator or an asynchronous generator."""
+    yield_finder = YieldFinder()
+    function_node.visit(yield_finder)
+    return yield_finder.yields
+
+
+def find_functions(source_tree: cst.Module) -> List[Tuple[str, int]]:
+    """Find the name of each function and the number of earlier functions with its name."""
+    function_name_collector = FunctionNameCollector()
+    source_tree.visit(function_name_collector)
+    occurrences: Dict[str, int] = {}
+    functions = []
+    for function_name in function_name_collector.function_names:
+        functions.append((function_name, occurrences.get(function_name, 0)))
+        occurrences[function_name] = occurrences.get(function_name, 0) + 1
+    return functions
+
+
+class DisableFunctionTransformer(cst.CSTTransformer):
+    """Transform program source code so that one of its functions does nothing."""
+
+    def __init__(
+        self,
+        source_tree_configuration: PartialParserConfig,
+        function_name: str,
+        occurrence: int = 0,
+    ):
+        """Construct a DisableFunctionTransformer for one function of a source tree."""
+        # configuration of the source tree that libcst created through
+        # the initial parse of the module that this will transform
+        self.source_tree_configuration = source_tree_configuration
+        # the canonical name of the function to disable and the number of
+        # functions with the same name that come before it in the module
+        self.function_name = function_name
+        self.occurrence = occurrence
+        # stack for storing the canonical name of the current function
+        self.stack: List[str] = []
+        # stack for storing whether the functions being visited are disabled
+        self.disabled_stack: List[bool] = []
+        # the number of functions with each name that were already visited
+        self.occurrences: Dict[str, int] = {}
+        # whether the function was found and disabled
+        self.disabled = False
+        # construct a fully qualified name of the DisableFunctionTransformer
+        self.name = str(
+            self.__module__ + constants.markers.Dot + type(self).__qualname__
+        )
+
+    def visit_ClassDef(self, node: cst.ClassDef) -> Optional[bool]:
+        """Add the name of the class to the stack of names."""
+        self.stack.append(node.name.value)
+        return True
+
+    def leave_ClassDef(
+        self, original_node: cst.ClassDef, updated_node: cst.ClassDef
+    ) -> cst.ClassDef:
+        """Remove the name of the class from the stack of names."""
+        self.stack.pop()
+        return updated_node
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> Optional[bool]:
+        """Determine if the function is the one to disable, using its canonical name."""
+        self.stack.append(node.name.value)
+        canonical_name = constants.markers.Dot.join(self.stack)
+        occurrence = self.occurrences.get(canonical_name, 0)
+        self.occurrences[canonical_name] = occurrence + 1
+        self.disabled_stack.append(
+            canonical_name == self.function_name and occurrence == self.occurrence
+        )
+        return True
+
+    def leave_FunctionDef(
+        self, original_node: cst.FunctionDef, updated_node: cst.FunctionDef
+    ) -> cst.FunctionDef:
+        """Replace the body of the disabled function with a statement that returns."""
+        self.stack.pop()
+        if not self.disabled_stack.pop():
+            return updated_node
+        output.logger.debug(f"Disabling the function {self.function_name}")
+        self.disabled = True
+        # a disabled generator must stay a generator that yields nothing, which
+        # matches a generator that the schema's guard disables, and thus it
+        # keeps a yield after its bare return; note that returning a value is
+        # a syntax error in an asynchronous generator
+        disabled_body = (
+            constants.campaign.Disabled_Generator_Body
+            if is_generator(original_node)
+            else (constants.campaign.Disabled_Body,)
+        )
+        disabled_statements = [
+            cst.parse_statement(disabled_code, config=self.source_tree_configuration)
+            for disabled_code in disabled_body
+        ]
+        body = updated_node.body
+        # the function is defined on a single line (e.g., "def f(): return 1")
+        # and thus the function returns on that same line
+        if isinstance(body, cst.SimpleStatementSuite):
+            body = body.with_changes(
+                body=[
+                    cast(cst.SimpleStatementLine, disabled_statement).body[0]
+                    for disabled_statement in disabled_statements
+                ]
+            )
+        # the function has an indented block and thus it only keeps its
+        # docstring, when it has one, followed by the statement that returns
+        else:
+            statements = (
+                [body.body[0]]
+                if len(body.body) > 0 and functioncoverage.is_docstring(body.body[0])
+                else []
+            )
+            body = body.with_changes(body=[*statements, *disabled_statements])
+        return updated_node.with_changes(body=body)
@@ -0,0 +1,119 @@
+"""Instrument an application so that any one of its functions can be disabled at runtime."""
+
+from typing import List
+from typing import Optional
+from typing import cast
+
+import libcst as cst
+from libcst import PartialParserConfig
+
+from discover_test_coverage import codegenerator
+from discover_test_coverage import constants
+from discover_test_coverage import output
+from discover_test_coverage.transformers import functioncoverage
+
+
+class DisableSchemaTransformer(cst.CSTTransformer):
+    """Transform program source code to guard each function with a check for being disabled."""
+
+    def __init__(self, source_tree_configuration: PartialParserConfig):
+        """Construct a DisableSchemaTransformer for a source tree."""
+        # configuration of the source tree that libcst created through
+        # the initial parse of the module that this will transform
+        self.source_tree_configuration = source_tree_configuration
+        # stack for storing the canonical name of the current function
+        self.stack: List[str] = []
+        # the names of the functions, in the order in which they were visited,
+        # so that the position of a function's name is its dense integer ID
+        self.function_names: List[str] = []
+        # stack for storing the ID of the functions that are being visited
+        self.function_ids: List[int] = []
+        # construct a fully qualified name of the DisableSchemaTransformer
+        self.name = str(
+            self.__module__ + constants.markers.Dot + type(self).__qualname__
+        )
+
+    def create_parsed_statement(self, source_code_statement: str) -> cst.BaseStatement:
+        """Create a parsed statement that matches the conventions of the source tree."""
+        return cst.parse_statement(
+            source_code_statement, config=self.source_tree_configuration
+        )
+
+    def visit_ClassDef(self, node: cst.ClassDef) -> Optional[bool]:
+        """Add the name of the class to the stack of names."""
+        self.stack.append(node.name.value)
+        return True
+
+    def leave_ClassDef(
+        self, original_node: cst.ClassDef, updated_node: cst.ClassDef
+    ) -> cst.ClassDef:
+        """Remove the name of the class from the stack of names."""
+        self.stack.pop()
+        return updated_node
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> Optional[bool]:
+        """Assign the next ID to the function, using its canonical name."""
+        self.stack.append(node.name.value)
+        self.function_ids.append(len(self.function_names))
+        self.function_names.append(constants.markers.Dot.join(self.stack))
+        # visit the body of the function so that nested functions are guarded too
+        return True
+
+    def leave_FunctionDef(
+        self, original_node: cst.FunctionDef, updated_node: cst.FunctionDef
+    ) -> cst.FunctionDef:
+        """Add the statement that returns when the function is disabled at the start of its body."""
+        self.stack.pop()
+        function_id = self.function_ids.pop()
+        output.logger.debug(
+            f"Guarding the function {self.function_names[function_id]} "
+            f"with the ID {function_id}"
+        )
+        guard_statement = self.create_parsed_statement(
+            codegenerator.get_schema_guard_code(function_id)
+        )
+        body = updated_node.body
+        # the function is defined on a single line (e.g., "def f(): return 1")
+        # and thus it becomes an indented block since the guard is an if statement
+        if isinstance(body, cst.SimpleStatementSuite):
+            body = cst.IndentedBlock(
+                body=[
+                    guard_statement,
+                    cst.SimpleStatementLine(
+                        body=body.body, trailing_whitespace=body.trailing_whitespace
+                    ),
+                ]
+            )
+        # the function has an indented block and thus the guard is added
+        # as its own line, after the docstring when the function has one
+        else:
+            position = (
+                1
+                if len(body.body) > 0 and functioncoverage.is_docstring(body.body[0])
+                else 0
+            )
+            statements = list(body.body)
+            statements.insert(position, guard_statement)
+            body = body.with_changes(body=statements)
+        return updated_node.with_changes(body=body)
+
+    def leave_Module(
+        self, original_node: cst.Module, updated_node: cst.Module
+    ) -> cst.Module:
+        """Register the functions of the module with the schema when it is imported."""
+        # there are no functions in this module and thus nothing to register
+        if len(self.function_names) == 0:
+            return updated_node
+        registration_statements = [
+            cast(
+                cst.SimpleStatementLine, self.create_parsed_statement(registration_code)
+            )
+            for registration_code in codegenerator.get_schema_registration_code(
+                self.function_names
+            )
+        ]
+        # the slot must exist before the module defines any functions
+        position = functioncoverage.find_start_of_code(updated_node.body)
+        statements = list(updated_node.body)
+        statements[position:position] = registration_statements
+        return updated_node.with_changes(body=statements)
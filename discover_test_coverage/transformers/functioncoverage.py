@@ -1,69 +1,151 @@
-# flake8: noqa
-# type: ignore
-
 """Instrument an application for function coverage using libCST."""
 
 from typing import List
 from typing import Optional
-from typing import Tuple
+from typing import Sequence
+from typing import Union
+from typing import cast
 
 import libcst as cst
+from libcst import PartialParserConfig
 
+from discover_test_coverage import codegenerator
 from discover_test_coverage import constants
 from discover_test_coverage import output
-from discover_test_coverage import transform
+
+
+def is_docstring(statement: Union[cst.BaseStatement, cst.BaseSmallStatement]) -> bool:
+    """Determine if a statement is a docstring."""
+    # a docstring is a statement line that only contains a string
+    if isinstance(statement, cst.SimpleStatementLine):
+        if len(statement.body) != 1:
+            return False
+        statement = statement.body[0]
+    return isinstance(statement, cst.Expr) and isinstance(
+        statement.value, (cst.SimpleString, cst.ConcatenatedString)
+    )
+
+
+def is_future_import(statement: cst.BaseStatement) -> bool:
+    """Determine if a statement imports from the __future__ module."""
+    return (
+        isinstance(statement, cst.SimpleStatementLine)
+        and isinstance(statement.body[0], cst.ImportFrom)
+        and isinstance(statement.body[0].module, cst.Name)
+        and statement.body[0].module.value == constants.code.Future_Module
+    )
+
+
+def find_start_of_code(statements: Sequence) -> int:
+    """Find the position of the first statement after the docstring and __future__ imports."""
+    # note that the instrumentation can only be added after the docstring and
+    # the __future__ imports, since a docstring must be the first statement
+    # and the __future__ imports must come before any other statement
+    position = 0
+    if len(statements) > 0 and is_docstring(statements[0]):
+        position = 1
+    while position < len(statements) and is_future_import(statements[position]):
+        position += 1
+    return position
 
 
 class FunctionCoverageTransformer(cst.CSTTransformer):
     """Transform program source code to collect fortified function coverage."""
 
-    def __init__(self):  # noqa
+    def __init__(self, source_tree_configuration: PartialParserConfig):
+        """Construct a FunctionCoverageTransformer for a source tree."""
+        # configuration of the source tree that libcst created through
+        # the initial parse of the module that this will transform
+        self.source_tree_configuration = source_tree_configuration
         # stack for storing the canonical name of the current function
-        self.stack: List[Tuple[str, ...]] = []
-        # construct a fully qualified name of the TestFixtureTransformer
+        self.stack: List[str] = []
+        # the names of the functions, in the order in which they were visited,
+        # so that the position of a function's name is its dense integer ID
+        self.function_names: List[str] = []
+        # stack for storing the ID of the functions that are being visited
+        self.function_ids: List[int] = []
+        # construct a fully qualified name of the FunctionCoverageTransformer
         self.name = str(
             self.__module__ + constants.markers.Dot + type(self).__qualname__
         )
 
-    def visit_ClassDef(self, node: cst.ClassDef) -> Optional[bool]:  # noqa
-        self.stack.append(node.name.value)  # type: ignore
+    def create_parsed_statement(
+        self, source_code_statement: str
+    ) -> cst.SimpleStatementLine:
+        """Create a parsed statement that matches the conventions of the source tree."""
+        # note that all of the generated statements are simple statements
+        return cast(
+            cst.SimpleStatementLine,
+            cst.parse_statement(
+                source_code_statement, config=self.source_tree_configuration
+            ),
+        )
+
+    def visit_ClassDef(self, node: cst.ClassDef) -> Optional[bool]:
+        """Add the name of the class to the stack of names."""
+        self.stack.append(node.name.value)
+        return True
 
     def leave_ClassDef(
-        self, original_node: cst.ClassDef, updated_node: cst.ClassDef  # noqa
-    ) -> cst.CSTNode:  # noqa
+        self, original_node: cst.ClassDef, updated_node: cst.ClassDef
+    ) -> cst.ClassDef:
+        """Remove the name of the class from the stack of names."""
         self.stack.pop()
         return updated_node
 
-    def visit_FunctionDef(self, node: cst.FunctionDef) -> Optional[bool]:  # noqa
-        self.stack.append(node.name.value)  # type:ignore
-        return False
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> Optional[bool]:
+        """Assign the next ID to the function, using its canonical name."""
+        self.stack.append(node.name.value)
+        self.function_ids.append(len(self.function_names))
+        self.function_names.append(constants.markers.Dot.join(self.stack))
+        # visit the body of the function so that nested functions are counted too
+        return True
 
     def leave_FunctionDef(
         self, original_node: cst.FunctionDef, updated_node: cst.FunctionDef
-    ) -> cst.CSTNode:  # noqa
-        # key = tuple(self.stack)
+    ) -> cst.FunctionDef:
+        """Add the statement that counts a call to the function at the start of its body."""
         self.stack.pop()
+        function_id = self.function_ids.pop()
         output.logger.debug(
-            f"current function definition node's name: {original_node.name}"
+            f"Counting calls to function {self.function_names[function_id]} "
+            f"with the ID {function_id}"
         )
-        output.logger.debug(f"contents of the stack after the pop() call: {self.stack}")
-        return updated_node.with_changes(decorators=[cst.Decorator(cst.Name("sample"))])
+        probe_statement = self.create_parsed_statement(
+            codegenerator.get_function_coverage_probe_code(function_id)
+        )
+        body = updated_node.body
+        # the function is defined on a single line (e.g., "def f(): return 1")
+        # and thus the counting statement is added to that same line
+        if isinstance(body, cst.SimpleStatementSuite):
+            position = find_start_of_code(body.body)
+            small_statements = list(body.body)
+            small_statements.insert(position, probe_statement.body[0])
+            body = body.with_changes(body=small_statements)
+        # the function has an indented block and thus the counting statement is
+        # added as its own line, after the docstring when the function has one
+        else:
+            position = 1 if len(body.body) > 0 and is_docstring(body.body[0]) else 0
+            statements = list(body.body)
+            statements.insert(position, probe_statement)
+            body = body.with_changes(body=statements)
+        return updated_node.with_changes(body=body)
 
     def leave_Module(
         self, original_node: cst.Module, updated_node: cst.Module
-    ) -> cst.CSTNode:  # noqa
-        output.logger.debug("start --->")
-        output.logger.debug(f"current module node's header: {original_node.header}")
-        output.logger.debug("---> end")
-        # TODO: Add in correct location and add correct import to a
-        # module that exists inside of the fortify-coverage package
-        updated_node = updated_node.with_changes(
-            header=(
-                cst.parse_statement(
-                    "from fortify import sample # leave_Module",
-                    config=transform.source_tree_configuration,
-                ),
-                *updated_node.header,
+    ) -> cst.Module:
+        """Register the functions of the module with the recorder when it is imported."""
+        # there are no functions in this module and thus nothing to register
+        if len(self.function_names) == 0:
+            return updated_node
+        registration_statements = [
+            self.create_parsed_statement(registration_code)
+            for registration_code in codegenerator.get_function_coverage_registration_code(
+                self.function_names
             )
-        )
-        return updated_node
+        ]
+        # the counters must exist before the module defines any functions
+        position = find_start_of_code(updated_node.body)
+        statements = list(updated_node.body)
+        statements[position:position] = registration_statements
+        return updated_node.with_changes(body=statements)
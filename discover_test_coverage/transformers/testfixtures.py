@@ -1,7 +1,14 @@
 """Instrument an application coverage tracking using libCST."""
 
+import io
+import tokenize
+from typing import List
+from typing import Optional
+from typing import Tuple
+
 import libcst as cst
 from libcst import Expr
+from libcst import PartialParserConfig
 from libcst import SimpleStatementLine
 from libcst import SimpleString
 
@@ -30,11 +37,109 @@ def detect_module_docstring(node: cst.Module) -> bool:
     return has_module_docstring
 
 
+def find_fixture_import_offset(source_text: str) -> Optional[Tuple[int, bool]]:
+    """Find where the test fixture import belongs in source code using the tokenizer."""
+    # note that this function returns the offset at which the import belongs and
+    # whether the module has a docstring, or None when the layout of the source
+    # code is unusual enough that only libcst can reliably find where it belongs
+    # the libcst code generation changes the line endings and the byte order mark
+    # of the source code and thus these unusual files must use the slower approach
+    if constants.markers.Carriage_Return in source_text or source_text.startswith(
+        constants.markers.Byte_Order_Mark
+    ):
+        return None
+    # record the offset at which each of the lines starts while the tokenizer
+    # reads them so that a token's position can be converted to an offset;
+    # note that the tokenizer is lazy and only reads the start of the file
+    line_offsets: List[int] = []
+    source_text_io = io.StringIO(source_text)
+
+    def readline() -> str:
+        """Read the next line of source code, recording the offset at which it starts."""
+        line_offsets.append(source_text_io.tell())
+        return source_text_io.readline()
+
+    try:
+        # the source code declares an encoding other than UTF-8 and thus
+        # it must use the slower approach that can handle this encoding
+        encoding, _ = tokenize.detect_encoding(
+            io.BytesIO(source_text.encode()).readline
+        )
+        if encoding not in constants.tokens.Supported_Encodings:
+            return None
+        # find the first token that is not a comment or a blank line
+        tokens = tokenize.generate_tokens(readline)
+        first_token = next(
+            token
+            for token in tokens
+            if token.type not in (tokenize.COMMENT, tokenize.NL)
+        )
+        # the module does not contain any statements or it starts with a parenthesized
+        # expression that could be a docstring and thus it must use the slower approach
+        if first_token.type == tokenize.ENDMARKER or first_token.string == "(":
+            return None
+        # the offset of the start of the line that contains the first statement,
+        # which is where the import belongs when the module has no docstring
+        first_statement_offset = line_offsets[first_token.start[0] - 1]
+        # the first statement does not start with a string that is not formatted
+        # and thus the module does not have a docstring
+        string_prefix = first_token.string[
+            : len(first_token.string) - len(first_token.string.lstrip("bBfFrRuU"))
+        ]
+        if first_token.type != tokenize.STRING or "f" in string_prefix.lower():
+            return (first_statement_offset, False)
+        # a docstring is a string that is followed only by a comment and then the
+        # end of the logical line, which must be on the line where the string ends
+        next_token = next(token for token in tokens if token.type != tokenize.COMMENT)
+        if next_token.type != tokenize.NEWLINE:
+            return (first_statement_offset, False)
+        if (
+            next_token.string != constants.markers.Newline
+            or next_token.start[0] != first_token.end[0]
+        ):
+            return None
+        # the import belongs at the start of the line after the docstring
+        return (line_offsets[next_token.start[0] - 1] + next_token.end[1], True)
+    except (SyntaxError, tokenize.TokenError, StopIteration):
+        return None
+
+
+def insert_fixture_import(source_text: str) -> Optional[str]:
+    """Insert the test fixture import into source code without parsing it with libcst."""
+    # note that this function returns the same source code that the
+    # TestFixtureTransformer would create or None when libcst must add the import
+    fixture_import_offset = find_fixture_import_offset(source_text)
+    if fixture_import_offset is None:
+        return None
+    offset, module_has_docstring = fixture_import_offset
+    # use the same name as the transformer in the generated comment
+    name = str(
+        TestFixtureTransformer.__module__
+        + constants.markers.Dot
+        + TestFixtureTransformer.__qualname__
+    )
+    # the module has a docstring and thus the import statement goes after it
+    if module_has_docstring:
+        import_code = codegenerator.get_test_instrumentation_docstring_code(name)
+    # the module does not have a docstring and thus the import statement goes
+    # before the first statement and it is followed by a blank line
+    else:
+        import_code = (
+            codegenerator.get_test_instrumentation_no_docstring_code(name)
+            + constants.markers.Newline
+        )
+    # splice the import statement into the source code
+    return source_text[:offset] + import_code + source_text[offset:]
+
+
 class TestFixtureTransformer(cst.CSTTransformer):
     """Transform test suite source code to collect information about test execution."""
 
-    def __init__(self):
+    def __init__(self, source_tree_configuration: PartialParserConfig):
         """Construct a TestFixtureTransformer and give it a name."""
+        # store the configuration of the source tree that libcst created
+        # through the initial parse of the module that this will transform
+        self.source_tree_configuration = source_tree_configuration
         # construct a fully qualified name of the TestFixtureTransformer
         self.name = str(
             self.__module__ + constants.markers.Dot + type(self).__qualname__
@@ -58,7 +163,7 @@ class TestFixtureTransformer(cst.CSTTransformer):
             )
             instrumentation_type_generator = (
                 codegenerator.InstrumentedSourceCodeGenerator(
-                    import_statement_type, self.name
+                    import_statement_type, self.name, self.source_tree_configuration
                 )
             )
             # generate the concrete abstract syntax tree for a test with a docstring
@@ -80,7 +185,7 @@ class TestFixtureTransformer(cst.CSTTransformer):
             )
             instrumentation_type_generator = (
                 codegenerator.InstrumentedSourceCodeGenerator(
-                    import_statement_type, self.name
+                    import_statement_type, self.name, self.source_tree_configuration
                 )
             )
             # generate the concrete abstract syntax tree for a test with no docstring
@@ -89,7 +194,7 @@ class TestFixtureTransformer(cst.CSTTransformer):
             empty_line_type = codegenerator.InstrumentationTypeSourceCode.EMPTY_LINE
             instrumentation_type_generator = (
                 codegenerator.InstrumentedSourceCodeGenerator(
-                    empty_line_type, self.name
+                    empty_line_type, self.name, self.source_tree_configuration
                 )
             )
             # generate the concrete abstract syntax tree for blank line of source code
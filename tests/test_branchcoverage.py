@@ -0,0 +1,112 @@
+"""Test cases for the branchcoverage module."""
+
+from discover_test_coverage import instrumentation
+from discover_test_coverage import recorder
+from discover_test_coverage import transform
+
+SOURCE_CODE = '''"""A module."""
+
+
+def sign(number):
+    if number > 0:
+        return 1
+    elif number < 0: return -1
+    return 0
+
+
+def first_positive(numbers):
+    for number in numbers:
+        if number > 0:
+            break
+    else:
+        return None
+    return number
+
+
+def divide(first, second):
+    try:
+        return first / second
+    except ZeroDivisionError:
+        return None
+
+
+def describe(flag, value):
+    return (flag and value) or (lambda: value) if value else "none"
+'''
+
+
+def test_branch_coverage_records_each_arm_that_was_taken():
+    """Ensure that the instrumented branches set the bits of the arms that were taken."""
+    instrumented_source_code = transform.transform_source(
+        SOURCE_CODE, [instrumentation.InstrumentationType.BRANCH]
+    )
+    namespace = {"__name__": "branches"}
+    exec(compile(instrumented_source_code, "branches.py", "exec"), namespace)
+    try:
+        # the instrumented functions keep the meaning of the original functions
+        assert namespace["sign"](5) == 1
+        assert namespace["first_positive"]([-1, 2]) == 2
+        assert namespace["divide"](1, 0) is None
+        assert namespace["describe"](True, 3) == 3
+        branches = recorder.collect_branches()["branches"]
+        assert branches["sign:if#0:true"]
+        assert not branches["sign:if#1:true"]
+        assert not branches["sign:if#1:false"]
+        assert branches["first_positive:for#2:loop"]
+        # the break leaves the loop and thus it records the exit arm
+        assert branches["first_positive:for#2:exit"]
+        assert branches["first_positive:if#3:true"]
+        assert branches["first_positive:if#3:false"]
+        assert branches["divide:try#4:except0"]
+        assert not branches["divide:try#4:else"]
+        assert branches["describe:ifexp#5:true"]
+        assert not branches["describe:ifexp#5:false"]
+        assert branches["describe:boolean#7:right"]
+        assert not branches["describe:boolean#6:right"]
+    finally:
+        recorder.registered_branch_modules.pop("branches")
+
+
+EXIT_SOURCE_CODE = """
+def find(numbers, target):
+    for number in numbers:
+        for _ in range(2):
+            break
+        if number == target: break
+    return number
+
+
+def parse(text):
+    while True:
+        try:
+            if text == "skip":
+                continue
+            return int(text)
+        except ValueError:
+            return None
+"""
+
+
+def test_branch_coverage_records_exits_that_skip_the_else_clause():
+    """Ensure that a break, continue, or return records the exit of a loop or a try statement."""
+    instrumented_source_code = transform.transform_source(
+        EXIT_SOURCE_CODE, [instrumentation.InstrumentationType.BRANCH]
+    )
+    namespace = {"__name__": "exits"}
+    exec(compile(instrumented_source_code, "exits.py", "exec"), namespace)
+    try:
+        assert namespace["find"]([1, 2, 3], 2) == 2
+        branches = recorder.collect_branches()["exits"]
+        # the break of the inner loop only records the exit of the inner loop
+        assert branches["find:for#0:exit"]
+        assert branches["find:for#1:exit"]
+        # a return whose value raises an exception does not record the else arm
+        assert namespace["parse"]("nan") is None
+        branches = recorder.collect_branches()["exits"]
+        assert not branches["parse:try#4:else"]
+        assert branches["parse:while#3:exit"]
+        assert namespace["parse"]("5") == 5
+        branches = recorder.collect_branches()["exits"]
+        assert branches["parse:try#4:else"]
+    finally:
+        recorder.registered_branch_modules.pop("exits")
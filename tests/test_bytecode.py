@@ -0,0 +1,47 @@
+"""Test cases for the bytecode module."""
+
+import os
+
+from discover_test_coverage import bytecode
+from discover_test_coverage import instrumentation
+
+
+def test_bytecode_cache_stores_and_loads_code(tmp_path):
+    """Ensure that cached code is found for the same source code and instrumentation."""
+    bytecode_cache = bytecode.BytecodeCache(tmp_path, 1048576)
+    source_bytes = b"VALUE = 1\n"
+    fixture_key = bytecode_cache.compute_key(
+        source_bytes, [instrumentation.InstrumentationType.FIXTURE], "a/m.py", "a.m"
+    )
+    function_key = bytecode_cache.compute_key(
+        source_bytes, [instrumentation.InstrumentationType.FUNCTION], "a/m.py", "a.m"
+    )
+    other_module_key = bytecode_cache.compute_key(
+        source_bytes, [instrumentation.InstrumentationType.FIXTURE], "b/m.py", "b.m"
+    )
+    assert len({fixture_key, function_key, other_module_key}) == 3
+    assert bytecode_cache.load(fixture_key, source_bytes) is None
+    bytecode_cache.store(fixture_key, source_bytes, compile(source_bytes, "m", "exec"))
+    namespace: dict = {}
+    exec(bytecode_cache.load(fixture_key, source_bytes), namespace)
+    assert namespace["VALUE"] == 1
+    # the cached code is not used for a file whose source code changed
+    assert bytecode_cache.load(fixture_key, b"VALUE = 2\n") is None
+
+
+def test_bytecode_cache_evicts_least_recently_used_code(tmp_path):
+    """Ensure that a full cache deletes the code that was used least recently."""
+    code = compile("VALUE = 1\n", "m", "exec")
+    bytecode_cache = bytecode.BytecodeCache(tmp_path, 1048576)
+    for key in ("a", "b", "c"):
+        bytecode_cache.store(key, b"", code)
+    # make the first code the most recently used one
+    for timestamp, key in enumerate(("b", "c", "a")):
+        os.utime(bytecode_cache.get_cached_file(key), (timestamp, timestamp))
+    cached_file_size = bytecode_cache.get_cached_file("a").stat().st_size
+    assert bytecode_cache.total_size == 3 * cached_file_size
+    bytecode_cache.maximum_size = int(2.5 * cached_file_size)
+    assert bytecode_cache.evict() == 1
+    assert bytecode_cache.total_size == 2 * cached_file_size
+    assert not bytecode_cache.get_cached_file("b").exists()
+    assert bytecode_cache.get_cached_file("a").exists()
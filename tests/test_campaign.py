@@ -0,0 +1,332 @@
+"""Test cases for the campaign module."""
+
+import inspect
+import os
+import sys
+from array import array
+from pathlib import Path
+
+import pytest
+
+from discover_test_coverage import campaign
+from discover_test_coverage import file
+from discover_test_coverage import forkclient
+from discover_test_coverage import instrumentation
+from discover_test_coverage import store
+from discover_test_coverage import timing
+from discover_test_coverage import transform
+
+SOURCE_CODE = '''"""Compute details about shapes."""
+
+
+def area(side):
+    """Compute the area of a square."""
+    return side * side
+
+
+def perimeter(side): return 4 * side
+
+
+class Square:
+    @property
+    def side(self):
+        return self._side
+
+    @side.setter
+    def side(self, value):
+        self._side = value
+'''
+
+TEST_CODE = """from program.shapes import area
+
+
+def test_area():
+    assert area(2) == 4
+"""
+
+
+def test_disable_source_replaces_the_body_of_one_function():
+    """Ensure that only the requested function is disabled, keeping its docstring."""
+    disabled_source_code = campaign.disable_source(SOURCE_CODE, "area", 0)
+    assert (
+        '"""Compute the area of a square."""\n    return None\n' in disabled_source_code
+    )
+    assert "return side * side" not in disabled_source_code
+    assert "def perimeter(side): return None\n" in campaign.disable_source(
+        SOURCE_CODE, "perimeter", 0
+    )
+    # the setter of the property has the same name as the getter
+    disabled_setter_source_code = campaign.disable_source(SOURCE_CODE, "Square.side", 1)
+    assert "return self._side" in disabled_setter_source_code
+    assert "self._side = value" not in disabled_setter_source_code
+    assert campaign.disable_source(SOURCE_CODE, "volume", 0) is None
+
+
+GENERATOR_SOURCE_CODE = """def count(limit):
+    for index in range(limit):
+        yield index
+
+
+async def stream(limit):
+    for index in range(limit):
+        yield index
+
+
+def make_counter():
+    def count():
+        yield 1
+
+    return count
+"""
+
+
+def test_disable_source_keeps_generators_as_generators():
+    """Ensure that a disabled generator, even an asynchronous one, yields nothing."""
+    namespace: dict = {}
+    exec(campaign.disable_source(GENERATOR_SOURCE_CODE, "count", 0), namespace)
+    assert list(namespace["count"](3)) == []
+    namespace = {}
+    exec(campaign.disable_source(GENERATOR_SOURCE_CODE, "stream", 0), namespace)
+    assert inspect.isasyncgenfunction(namespace["stream"])
+    # a function that only returns a generator is not a generator itself
+    namespace = {}
+    exec(campaign.disable_source(GENERATOR_SOURCE_CODE, "make_counter", 0), namespace)
+    assert namespace["make_counter"]() is None
+
+
+def test_create_workspace_only_links_the_modules_of_the_program(tmp_path):
+    """Ensure that writing to the tests or data files of a workspace never changes the project."""
+    project_directory = tmp_path / "project"
+    (project_directory / "program").mkdir(parents=True)
+    (project_directory / "program" / "shapes.py").write_text(SOURCE_CODE)
+    (project_directory / "tests").mkdir()
+    (project_directory / "tests" / "test_shapes.py").write_text(TEST_CODE)
+    (project_directory / "tests" / "data.json").write_text("{}")
+    workspace_directory = tmp_path / "workspace"
+    campaign.create_workspace(
+        project_directory, workspace_directory, Path("program"), tmp_path / ".discover"
+    )
+    assert (workspace_directory / "program" / "shapes.py").stat().st_ino == (
+        project_directory / "program" / "shapes.py"
+    ).stat().st_ino
+    # a test that writes to its data file only changes the workspace's file
+    with open(workspace_directory / "tests" / "data.json", "w") as data_file:
+        data_file.write("[]")
+    assert (project_directory / "tests" / "data.json").read_text() == "{}"
+    assert (workspace_directory / "tests" / "test_shapes.py").read_text() == TEST_CODE
+
+
+def test_run_campaign_classifies_each_disabled_function(tmp_path, monkeypatch):
+    """Ensure that a campaign runs the tests against each disabled function."""
+    # the plugin records the durations of the tests in the baseline run
+    monkeypatch.setenv("PYTHONPATH", str(Path(campaign.__file__).parents[1]))
+    project_directory = tmp_path / "project"
+    (project_directory / "program").mkdir(parents=True)
+    (project_directory / "program" / "shapes.py").write_text(SOURCE_CODE)
+    (project_directory / "tests").mkdir()
+    (project_directory / "tests" / "test_shapes.py").write_text(TEST_CODE)
+    results, _ = campaign.run_campaign(
+        project_directory,
+        Path("program"),
+        tmp_path / ".discover",
+        f"{sys.executable} -m pytest -q -p no:cacheprovider tests",
+        2,
+    )
+    outcomes = {
+        campaign.describe_point(point): outcome for point, outcome, _, _ in results
+    }
+    assert outcomes == {
+        "program/shapes.py::area#0": campaign.Outcome.DETECTED,
+        "program/shapes.py::perimeter#0": campaign.Outcome.UNDETECTED,
+        "program/shapes.py::Square.side#0": campaign.Outcome.UNDETECTED,
+        "program/shapes.py::Square.side#1": campaign.Outcome.UNDETECTED,
+    }
+    # the project's module was never changed by disabling its functions
+    assert (project_directory / "program" / "shapes.py").read_text() == SOURCE_CODE
+    # the timeouts of the disabled functions derive from the baseline run
+    assert list(timing.load_timings(tmp_path / ".discover" / "timings.json")) == [
+        "tests/test_shapes.py::test_area"
+    ]
+
+
+def test_run_campaign_only_runs_the_covering_tests(tmp_path, monkeypatch):
+    """Ensure that each disabled function only runs the tests that called it."""
+    # the plugin selects the covering tests from a file
+    monkeypatch.setenv("PYTHONPATH", str(Path(campaign.__file__).parents[1]))
+    project_directory = tmp_path / "project"
+    (project_directory / "program").mkdir(parents=True)
+    (project_directory / "program" / "shapes.py").write_text(SOURCE_CODE)
+    (project_directory / "tests").mkdir()
+    (project_directory / "tests" / "test_shapes.py").write_text(
+        TEST_CODE + "\n\ndef test_nothing():\n    assert True\n"
+    )
+    with store.CoverageStore(tmp_path / ".discover" / "coverage.sqlite") as coverage:
+        coverage.add_run(
+            {"program.shapes": (("area", "perimeter"), array("Q", [1, 0]))},
+            {},
+            contexts=[
+                ("tests/test_shapes.py::test_area", {"program.shapes": [0]}, {}),
+                ("tests/test_shapes.py::test_nothing", {}, {}),
+            ],
+        )
+    results, test_count = campaign.run_campaign(
+        project_directory,
+        Path("program"),
+        tmp_path / ".discover",
+        f"{sys.executable} -m pytest -q -p no:cacheprovider",
+        2,
+        select_covering_tests=True,
+    )
+    executed_tests = {
+        point[1]: (outcome, executed_test_count)
+        for point, outcome, _, executed_test_count in results
+    }
+    assert executed_tests["area"] == (campaign.Outcome.DETECTED, 1)
+    assert executed_tests["perimeter"] == (campaign.Outcome.UNDETECTED, 0)
+    # each of the four functions would have run both of the tests
+    assert campaign.count_saved_executions(results, test_count) == 7
+
+
+@pytest.mark.parametrize("use_fork_server", [False, True])
+def test_run_campaign_with_the_schema_never_writes_disabled_modules(
+    tmp_path, monkeypatch, use_fork_server
+):
+    """Ensure that a campaign with the schema disables each function at runtime."""
+    project_directory = tmp_path / "project"
+    (project_directory / "program").mkdir(parents=True)
+    (project_directory / "program" / "shapes.py").write_text(SOURCE_CODE)
+    (project_directory / "tests").mkdir()
+    (project_directory / "tests" / "test_shapes.py").write_text(TEST_CODE)
+    # the program with the schema cannot run without instrument-program
+    with pytest.raises(ValueError):
+        campaign.find_schema_files(project_directory, Path("program"))
+    transform.transform_files_using_libcst(
+        project_directory,
+        Path("program"),
+        [instrumentation.InstrumentationType.SCHEMA],
+        file.find_python_files,
+    )
+    # the tests import the instrumented program, which imports this package
+    monkeypatch.setenv("PYTHONPATH", str(Path(campaign.__file__).parents[1]))
+    monkeypatch.setattr(campaign, "disable_source", None)
+    test_runs = []
+    run_test_command = campaign.run_test_command
+    monkeypatch.setattr(
+        campaign,
+        "run_test_command",
+        lambda *arguments: test_runs.append(arguments) or run_test_command(*arguments),
+    )
+    results, _ = campaign.run_campaign(
+        project_directory,
+        Path("program"),
+        tmp_path / ".discover",
+        f"{sys.executable} -m pytest -q -p no:cacheprovider tests",
+        2,
+        use_schema=True,
+        use_fork_server=use_fork_server,
+    )
+    outcomes = {point[1:]: outcome for point, outcome, _, _ in results}
+    assert outcomes == {
+        ("area", 0): campaign.Outcome.DETECTED,
+        ("perimeter", 0): campaign.Outcome.UNDETECTED,
+        ("Square.side", 0): campaign.Outcome.UNDETECTED,
+        ("Square.side", 1): campaign.Outcome.UNDETECTED,
+    }
+    # the fork server runs every point after the baseline run of the test suite
+    assert len(test_runs) == (1 if use_fork_server else 5)
+    assert (
+        campaign.get_unit_name(("program/shapes.py", "area", 0), Path("program"))
+        == "program.shapes::area#0"
+    )
+
+
+def test_run_disabled_point_stops_a_failed_fork_server(tmp_path, monkeypatch):
+    """Ensure that the points after a fork server failed never retry its pipes."""
+    test_runs = []
+    monkeypatch.setattr(
+        campaign,
+        "run_test_command",
+        lambda *arguments: test_runs.append(arguments) or (0, 0.1),
+    )
+    # the fork server stops right away, as it would when it cannot collect the tests
+    fork_client = forkclient.ForkClient("exit 0", tmp_path, dict(os.environ))
+    fork_client_run = fork_client.run
+    fork_runs = []
+    monkeypatch.setattr(
+        fork_client,
+        "run",
+        lambda *arguments: fork_runs.append(arguments) or fork_client_run(*arguments),
+    )
+    for function_name in ("area", "perimeter"):
+        point, outcome, _, _ = campaign.run_disabled_point(
+            ("program/shapes.py", function_name, 0),
+            tmp_path,
+            tmp_path,
+            Path("program"),
+            "pytest",
+            None,
+            use_schema=True,
+            fork_client=fork_client,
+        )
+        assert outcome == campaign.Outcome.UNDETECTED
+    assert fork_client.stopped
+    assert len(fork_runs) == 1
+    assert len(test_runs) == 2
+    fork_client.close()
+
+
+def test_run_campaign_resumes_from_the_journal(tmp_path, monkeypatch):
+    """Ensure that a resumed campaign only runs the points with changed inputs."""
+    monkeypatch.setenv("PYTHONPATH", str(Path(campaign.__file__).parents[1]))
+    project_directory = tmp_path / "project"
+    (project_directory / "program").mkdir(parents=True)
+    (project_directory / "program" / "shapes.py").write_text(SOURCE_CODE)
+    (project_directory / "tests").mkdir()
+    (project_directory / "tests" / "test_shapes.py").write_text(TEST_CODE)
+    arguments = (
+        project_directory,
+        Path("program"),
+        tmp_path / ".discover",
+        f"{sys.executable} -m pytest -q -p no:cacheprovider tests",
+        2,
+    )
+    results, _ = campaign.run_campaign(*arguments)
+    test_runs = []
+    run_test_command = campaign.run_test_command
+    monkeypatch.setattr(
+        campaign,
+        "run_test_command",
+        lambda *arguments: test_runs.append(arguments) or run_test_command(*arguments),
+    )
+    resumed_results, _ = campaign.run_campaign(*arguments, resume=True)
+    assert sorted(resumed_results) == sorted(results)
+    assert len(test_runs) == 0
+    # changing the tests changes the inputs of every point
+    (project_directory / "tests" / "test_shapes.py").write_text(
+        TEST_CODE + "\n\ndef test_nothing():\n    assert True\n"
+    )
+    campaign.run_campaign(*arguments, resume=True)
+    assert len(test_runs) == 5
+
+
+def test_find_covering_tests_maps_hidden_tests_and_code_outside_of_tests(tmp_path):
+    """Ensure that hidden tests map to the original tests and unattributed code to all tests."""
+    project_directory = tmp_path / "project"
+    (project_directory / "program").mkdir(parents=True)
+    (project_directory / "program" / "shapes.py").write_text(SOURCE_CODE)
+    (project_directory / "src" / "tests").mkdir(parents=True)
+    (project_directory / "src" / "tests" / "test_shapes.py").write_text(TEST_CODE)
+    points = [("program/shapes.py", "area", 0), ("program/shapes.py", "perimeter", 0)]
+    with store.CoverageStore(tmp_path / "coverage.sqlite") as coverage:
+        coverage.add_run(
+            {"program.shapes": (("area", "perimeter"), array("Q", [1, 1]))},
+            {},
+            contexts=[
+                (".tests/test_shapes.py::test_area", {"program.shapes": [0]}, {}),
+                ("<unattributed>", {"program.shapes": [1]}, {}),
+            ],
+        )
+        assert campaign.find_covering_tests(coverage, points, project_directory) == {
+            points[0]: ["src/tests/test_shapes.py::test_area"],
+            points[1]: None,
+        }
@@ -0,0 +1,97 @@
+"""Test cases for the disableschema module."""
+
+import asyncio
+
+from discover_test_coverage import instrumentation
+from discover_test_coverage import schema
+from discover_test_coverage import transform
+
+SOURCE_CODE = '''"""A module."""
+
+from __future__ import annotations
+
+
+def add(first, second):
+    """Add two numbers."""
+    return first + second
+
+
+def one(): return 1
+
+
+class Counter:
+    @property
+    def count(self):
+        return 2
+
+    @count.setter
+    def count(self, value):
+        raise ValueError(value)
+'''
+
+
+def test_schema_disables_the_active_unit_at_runtime():
+    """Ensure that one instrumented module can disable any of its functions at runtime."""
+    instrumented_source_code = transform.transform_source(
+        SOURCE_CODE,
+        [
+            instrumentation.InstrumentationType.SCHEMA,
+            instrumentation.InstrumentationType.FUNCTION,
+        ],
+    )
+    namespace = {"__name__": "counting"}
+    exec(compile(instrumented_source_code, "counting.py", "exec"), namespace)
+    try:
+        # none of the functions are disabled until a unit is activated
+        assert namespace["add"](1, 2) == 3
+        assert namespace["add"].__doc__ == "Add two numbers."
+        assert namespace["one"]() == 1
+        schema.activate("counting::add#0")
+        assert namespace["add"](1, 2) is None
+        assert namespace["one"]() == 1
+        # the setter of the property has the same name as the getter
+        schema.activate("counting::Counter.count#1")
+        assert namespace["add"](1, 2) == 3
+        counter = namespace["Counter"]()
+        counter.count = 5
+        assert counter.count == 2
+        schema.activate(None)
+        assert namespace["one"]() == 1
+    finally:
+        schema.activate(None)
+        schema.registered_modules.pop("counting")
+        namespace["_discover_recorder"].registered_modules.pop("counting")
+
+
+GENERATOR_SOURCE_CODE = """def count(limit):
+    yield from range(limit)
+
+
+async def stream(limit):
+    for index in range(limit):
+        yield index
+"""
+
+
+def test_schema_disables_generators_and_asynchronous_generators():
+    """Ensure that a disabled generator, even an asynchronous one, yields nothing."""
+    instrumented_source_code = transform.transform_source(
+        GENERATOR_SOURCE_CODE, [instrumentation.InstrumentationType.SCHEMA]
+    )
+    namespace = {"__name__": "streaming"}
+    exec(compile(instrumented_source_code, "streaming.py", "exec"), namespace)
+
+    async def collect(limit):
+        return [index async for index in namespace["stream"](limit)]
+
+    try:
+        assert list(namespace["count"](2)) == [0, 1]
+        assert asyncio.run(collect(2)) == [0, 1]
+        schema.activate("streaming::count#0")
+        assert list(namespace["count"](2)) == []
+        schema.activate("streaming::stream#0")
+        assert list(namespace["count"](2)) == [0, 1]
+        assert asyncio.run(collect(2)) == []
+    finally:
+        schema.activate(None)
+        schema.registered_modules.pop("streaming")
@@ -0,0 +1,85 @@
+"""Test cases for the file module."""
+
+from pathlib import Path
+
+from discover_test_coverage import constants
+from discover_test_coverage import file
+
+
+def create_files(directory: Path, *relative_paths: str) -> None:
+    """Create empty files at the relative paths inside of a directory."""
+    for relative_path in relative_paths:
+        created_file = directory / relative_path
+        created_file.parent.mkdir(parents=True, exist_ok=True)
+        created_file.touch()
+
+
+def test_walk_files_matches_sorted_rglob(tmp_path):
+    """Ensure that walking without exclusions finds files in the order of rglob."""
+    create_files(
+        tmp_path, "a.py", "a/b.py", "a/c/conftest.py", "b.txt", "z/y.py", "a-b.py"
+    )
+    walked_files = list(
+        file.walk_files(tmp_path, exclude_patterns=(), use_gitignore=False)
+    )
+    assert walked_files == sorted(tmp_path.rglob("*.py"))
+
+
+def test_walk_files_prunes_excluded_and_ignored_directories(tmp_path):
+    """Ensure that walking skips excluded directories and files that git ignores."""
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".gitignore").write_text("build/\n*.gen.py\n!keep.gen.py\n/docs\n")
+    create_files(
+        tmp_path,
+        "src/module.py",
+        "src/build/built.py",
+        "src/.venv/lib/site.py",
+        "src/__pycache__/cached.py",
+        "src/node_modules/node.py",
+        "src/pkg/made.gen.py",
+        "src/pkg/keep.gen.py",
+        "src/pkg/ignored.py",
+        "docs/conf.py",
+        ".tests/conftest.py",
+    )
+    (tmp_path / "src" / "pkg" / ".gitignore").write_text("ignored.py\n")
+    conftest_files, not_conftest_files = file.partition_python_files(tmp_path)
+    assert conftest_files == []
+    assert [path.relative_to(tmp_path).as_posix() for path in not_conftest_files] == [
+        "src/module.py",
+        "src/pkg/keep.gen.py",
+    ]
+
+
+def test_walk_files_keeps_hidden_files_but_prunes_hidden_directories(tmp_path):
+    """Ensure that the default exclusions only skip the hidden directories."""
+    create_files(tmp_path, ".coveragerc", ".env", "setup.cfg", ".tox/log.txt")
+    walked_files = file.walk_files(
+        tmp_path, (constants.wildcards.All_Files,), use_gitignore=False
+    )
+    assert [path.relative_to(tmp_path).as_posix() for path in walked_files] == [
+        ".coveragerc",
+        ".env",
+        "setup.cfg",
+    ]
+
+
+def test_link_or_copy_file_mirrors_nested_files_without_collisions(tmp_path):
+    """Ensure that mirroring keeps the directory structure and links the files."""
+    create_files(tmp_path / "src", "pkg/__init__.py", "pkg/sub/__init__.py")
+    (tmp_path / "src" / "pkg" / "data.json").write_text("{}")
+    hidden_directory = tmp_path / ".src"
+    for source_file in file.find_files_not_python(tmp_path / "src") + (
+        file.find_python_files(tmp_path / "src")
+    ):
+        mirrored_file = file.get_hidden_file(
+            hidden_directory, tmp_path / "src", source_file
+        )
+        transfer_method = file.link_or_copy_file(source_file, mirrored_file)
+        assert mirrored_file.read_bytes() == source_file.read_bytes()
+        assert transfer_method == constants.file.Hard_Link
+    assert (hidden_directory / "pkg" / "sub" / "__init__.py").exists()
+    assert (hidden_directory / "pkg" / "data.json").exists()
+    # replacing the contents of a mirrored file must not change its source file
+    file.write_file_replacing(hidden_directory / "pkg" / "data.json", "[]")
+    assert (tmp_path / "src" / "pkg" / "data.json").read_text() == "{}"
@@ -0,0 +1,75 @@
+"""Test cases for the forkserver module."""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+from discover_test_coverage import forkclient
+
+TEST_CODE = """import os
+import time
+
+
+def test_passes():
+    assert True
+
+
+def test_fails():
+    assert False
+
+
+def test_sleeps():
+    time.sleep(30)
+
+
+def test_times_out():
+    os._exit(124)
+"""
+
+
+@pytest.mark.skipif(not forkclient.is_available(), reason="requires os.fork")
+def test_fork_server_runs_each_request_in_a_forked_session(tmp_path):
+    """Ensure that the fork server runs the requested tests and survives a timeout."""
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_sleeping.py").write_text(TEST_CODE)
+    environment = {
+        **os.environ,
+        "PYTHONPATH": str(Path(forkclient.__file__).parents[1]),
+    }
+    with forkclient.ForkClient(
+        f"{sys.executable} -m pytest -q -p no:cacheprovider -p no:randomly tests",
+        tmp_path,
+        environment,
+    ) as fork_client:
+        exit_code, _ = fork_client.run(
+            None, ["tests/test_sleeping.py::test_passes"], None
+        )
+        assert exit_code == 0
+        exit_code, _ = fork_client.run(
+            None,
+            [
+                "tests/test_sleeping.py::test_passes",
+                "tests/test_sleeping.py::test_fails",
+            ],
+            None,
+        )
+        assert exit_code == 1
+        exit_code, duration = fork_client.run(
+            None, ["tests/test_sleeping.py::test_sleeps"], 0.5
+        )
+        assert exit_code is None
+        assert duration < 10
+        # the server keeps serving after one of its children timed out
+        exit_code, _ = fork_client.run(
+            None, ["tests/test_sleeping.py::test_passes"], None
+        )
+        assert exit_code == 0
+        exit_code, _ = fork_client.run(None, ["tests/test_sleeping.py::missing"], None)
+        assert exit_code == 5
+        # the plugin stopped a child that ran for longer than a test's own timeout
+        exit_code, _ = fork_client.run(
+            None, ["tests/test_sleeping.py::test_times_out"], None
+        )
+        assert exit_code is None
@@ -0,0 +1,83 @@
+"""Test cases for the functioncoverage module."""
+
+from discover_test_coverage import instrumentation
+from discover_test_coverage import recorder
+from discover_test_coverage import store
+from discover_test_coverage import transform
+
+SOURCE_CODE = '''"""A module."""
+
+from __future__ import annotations
+
+
+def add(first, second):
+    """Add two numbers."""
+    return first + second
+
+
+def one(): return 1
+
+
+class Calculator:
+    def twice(self, number):
+        def double(value):
+            return add(value, value)
+        return double(number)
+'''
+
+
+def test_function_coverage_counts_calls_by_function_id(tmp_path):
+    """Ensure that the instrumented functions count their calls in the recorder."""
+    instrumented_source_code = transform.transform_source(
+        SOURCE_CODE, [instrumentation.InstrumentationType.FUNCTION]
+    )
+    namespace = {"__name__": "calculator"}
+    exec(compile(instrumented_source_code, "calculator.py", "exec"), namespace)
+    try:
+        assert namespace["Calculator"]().twice(2) == 4
+        assert namespace["add"].__doc__ == "Add two numbers."
+        assert namespace["annotations"]
+        assert recorder.collect()["calculator"] == {
+            "add": 1,
+            "one": 0,
+            "Calculator.twice": 1,
+            "Calculator.twice.double": 1,
+        }
+        with store.CoverageStore(tmp_path / "coverage.sqlite") as coverage_store:
+            run_id = coverage_store.add_run(recorder.registered_modules, {})
+            coverage_report = store.export_report(coverage_store, run_id)
+        assert coverage_report["function_coverage"]["calculator"]["add"] == 1
+    finally:
+        recorder.registered_modules.pop("calculator")
+
+
+PROPERTY_SOURCE_CODE = """
+class Square:
+    @property
+    def side(self):
+        return self._side
+
+    @side.setter
+    def side(self, value):
+        self._side = value
+"""
+
+
+def test_function_coverage_sums_the_calls_to_functions_with_the_same_name(tmp_path):
+    """Ensure that the calls to the getter and the setter of a property are both counted."""
+    instrumented_source_code = transform.transform_source(
+        PROPERTY_SOURCE_CODE, [instrumentation.InstrumentationType.FUNCTION]
+    )
+    namespace = {"__name__": "square"}
+    exec(compile(instrumented_source_code, "square.py", "exec"), namespace)
+    try:
+        square = namespace["Square"]()
+        square.side = 2
+        assert square.side == 2
+        assert recorder.collect()["square"] == {"Square.side": 2}
+        with store.CoverageStore(tmp_path / "coverage.sqlite") as coverage_store:
+            run_id = coverage_store.add_run(recorder.registered_modules, {})
+            coverage_report = store.export_report(coverage_store, run_id)
+        assert coverage_report["function_coverage"]["square"] == {"Square.side": 2}
+    finally:
+        recorder.registered_modules.pop("square")
@@ -0,0 +1,198 @@
+"""Test cases for the impact module."""
+
+import subprocess
+from array import array
+
+from discover_test_coverage import impact
+from discover_test_coverage import store
+
+OLD_SOURCE_CODE = """
+import math
+
+
+def area(radius):
+    return math.pi * radius * radius
+
+
+class Circle:
+    def perimeter(self, radius):
+        return 2 * math.pi * radius
+"""
+
+NEW_SOURCE_CODE = """
+import math
+
+
+def area(radius):
+    return math.pi * radius ** 2
+
+
+class Circle:
+    def perimeter(self, radius):
+        return 2 * math.pi * radius
+
+    def diameter(self, radius):
+        return 2 * radius
+"""
+
+
+def test_find_changed_functions_compares_function_bodies():
+    """Ensure that only the functions with different code are changed."""
+    assert impact.find_changed_functions(OLD_SOURCE_CODE, NEW_SOURCE_CODE) == {
+        "area",
+        "Circle.diameter",
+    }
+    # a change to the code that runs on import changes the whole module
+    assert (
+        impact.find_changed_functions(
+            OLD_SOURCE_CODE, NEW_SOURCE_CODE.replace("import math", "import cmath")
+        )
+        is None
+    )
+    assert impact.find_changed_functions(None, NEW_SOURCE_CODE) is None
+
+
+def test_find_changed_modules_reads_the_revision_with_git(tmp_path):
+    """Ensure that a changed file is compared to its version in a revision."""
+    for command in (
+        ["git", "init", "-q"],
+        ["git", "config", "user.email", "tester@example.com"],
+        ["git", "config", "user.name", "tester"],
+    ):
+        subprocess.run(command, cwd=tmp_path, check=True)
+    (tmp_path / "shapes").mkdir()
+    (tmp_path / "shapes" / "circle.py").write_text(OLD_SOURCE_CODE)
+    subprocess.run(["git", "add", "."], cwd=tmp_path, check=True)
+    subprocess.run(
+        ["git", "commit", "-q", "-m", "Add circle"], cwd=tmp_path, check=True
+    )
+    (tmp_path / "shapes" / "circle.py").write_text(NEW_SOURCE_CODE)
+    (tmp_path / "README.md").write_text("# Shapes\n")
+    changed_files = impact.find_changed_files(tmp_path, "HEAD")
+    assert changed_files == ["README.md", "shapes/circle.py"]
+    assert impact.find_changed_modules(tmp_path, changed_files, "HEAD") == {
+        "shapes/circle.py": {"area", "Circle.diameter"}
+    }
+
+
+def test_select_impacted_tests_uses_the_latest_contexts(tmp_path):
+    """Ensure that the selected tests covered a change or have no recorded coverage."""
+    assert impact.match_module_names(
+        "src/shapes/circle.py", ["circle", "shapes.circle", "shapes", "square"]
+    ) == ["circle", "shapes.circle"]
+    function_modules = {
+        "shapes.circle": (("area", "Circle.perimeter"), array("Q", [1, 1]))
+    }
+    with store.CoverageStore(tmp_path / "coverage.sqlite") as coverage_store:
+        coverage_store.add_run(
+            function_modules,
+            {},
+            contexts=[
+                ("tests/test_circle.py::test_area", {"shapes.circle": [0]}, {}),
+                ("tests/test_circle.py::test_perimeter", {"shapes.circle": [1]}, {}),
+                ("tests/test_square.py::test_area", {}, {}),
+            ],
+        )
+        # a later run that only ran one of the tests does not hide the others
+        coverage_store.add_run(
+            function_modules,
+            {},
+            contexts=[("tests/test_circle.py::test_area", {"shapes.circle": [0]}, {})],
+        )
+        test_ids = [
+            "tests/test_circle.py::test_area",
+            "tests/test_circle.py::test_perimeter",
+            "tests/test_circle.py::test_diameter",
+            "tests/test_square.py::test_area",
+        ]
+        assert impact.select_impacted_tests(
+            test_ids, coverage_store, {"src/shapes/circle.py": {"area"}}
+        ) == [
+            "tests/test_circle.py::test_area",
+            "tests/test_circle.py::test_diameter",
+        ]
+        # a changed conftest.py file impacts all of the tests in its directory
+        assert (
+            impact.select_impacted_tests(
+                test_ids, coverage_store, {"tests/conftest.py": None}
+            )
+            == test_ids
+        )
+
+
+def test_select_impacted_tests_runs_all_tests_for_code_outside_of_tests(tmp_path):
+    """Ensure that a change to code that ran outside of the tests selects all of them."""
+    function_modules = {
+        "shapes.circle": (("area", "Circle.perimeter"), array("Q", [1, 1]))
+    }
+    test_ids = [
+        "tests/test_circle.py::test_area",
+        "tests/test_circle.py::test_perimeter",
+    ]
+    with store.CoverageStore(tmp_path / "coverage.sqlite") as coverage_store:
+        coverage_store.add_run(
+            function_modules,
+            {},
+            contexts=[
+                ("tests/test_circle.py::test_area", {"shapes.circle": [0]}, {}),
+                ("tests/test_circle.py::test_perimeter", {}, {}),
+                ("<unattributed>", {"shapes.circle": [1]}, {}),
+            ],
+        )
+        # the perimeter was only computed while the tests were collected
+        assert (
+            impact.select_impacted_tests(
+                test_ids, coverage_store, {"src/shapes/circle.py": {"Circle.perimeter"}}
+            )
+            == test_ids
+        )
+        assert impact.select_impacted_tests(
+            test_ids, coverage_store, {"src/shapes/circle.py": {"area"}}
+        ) == ["tests/test_circle.py::test_area"]
+
+
+def test_select_impacted_tests_runs_all_tests_for_modules_without_coverage(tmp_path):
+    """Ensure that a changed helper of the tests or an unknown module selects all tests."""
+    function_modules = {"shapes.circle": (("area",), array("Q", [1]))}
+    test_ids = [
+        "tests/test_circle.py::test_area",
+        "tests/test_square.py::test_area",
+    ]
+    with store.CoverageStore(tmp_path / "coverage.sqlite") as coverage_store:
+        coverage_store.add_run(
+            function_modules,
+            {},
+            contexts=[
+                ("tests/test_circle.py::test_area", {"shapes.circle": [0]}, {}),
+                ("tests/test_square.py::test_area", {}, {}),
+            ],
+        )
+        assert impact.select_impacted_tests(
+            test_ids, coverage_store, {"tests/test_circle.py": None}
+        ) == ["tests/test_circle.py::test_area"]
+        # the tests import the helper module, which is not in the program coverage
+        assert (
+            impact.select_impacted_tests(
+                test_ids, coverage_store, {"tests/helpers.py": None}
+            )
+            == test_ids
+        )
+        assert (
+            impact.select_impacted_tests(
+                test_ids, coverage_store, {"src/shapes/hexagon.py": None}
+            )
+            == test_ids
+        )
+
+
+def test_find_unselectable_files_keeps_all_but_python_and_documentation():
+    """Ensure that a change to a configuration or data file means that all tests run."""
+    assert impact.find_unselectable_files(
+        [
+            "README.md",
+            "docs/index.rst",
+            "shapes/circle.py",
+            "pytest.ini",
+            "tests/data/circle.json",
+        ]
+    ) == ["pytest.ini", "tests/data/circle.json"]
@@ -0,0 +1,169 @@
+"""Test cases for the importhook module."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from discover_test_coverage import bytecode
+from discover_test_coverage import constants
+from discover_test_coverage import importhook
+from discover_test_coverage import instrumentation
+from discover_test_coverage import store
+
+
+def test_import_hook_instruments_only_program_modules(tmp_path, monkeypatch):
+    """Ensure that the import hook instruments program modules without writing files."""
+    program_directory = tmp_path / "program"
+    (program_directory / "hookedpkg").mkdir(parents=True)
+    (program_directory / "hookedpkg" / "__init__.py").write_text("")
+    (program_directory / "hookedpkg" / "module.py").write_text("VALUE = 1\n")
+    (tmp_path / "hookedother.py").write_text("VALUE = 2\n")
+    monkeypatch.syspath_prepend(str(program_directory))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    # mark the instrumented source code so that the test can detect it
+    monkeypatch.setattr(
+        importhook.transform,
+        "transform_source",
+        lambda source_text, _: source_text + "INSTRUMENTED = True\n",
+    )
+    importhook.install(program_directory, [instrumentation.InstrumentationType.FIXTURE])
+    try:
+        import hookedother
+        import hookedpkg.module
+    finally:
+        importhook.uninstall()
+        for module_name in ("hookedpkg", "hookedpkg.module", "hookedother"):
+            sys.modules.pop(module_name, None)
+    assert hookedpkg.module.INSTRUMENTED
+    assert not hasattr(hookedother, "INSTRUMENTED")
+    # the instrumented modules are never cached as bytecode
+    assert not (program_directory / "hookedpkg" / "__pycache__").exists()
+    assert not any(
+        isinstance(finder, importhook.InstrumentingFinder) for finder in sys.meta_path
+    )
+
+
+def test_import_hook_reuses_cached_code(tmp_path, monkeypatch):
+    """Ensure that a warm bytecode cache skips instrumenting the module again."""
+    program_directory = tmp_path / "program"
+    program_directory.mkdir()
+    (program_directory / "cachedmodule.py").write_text("VALUE = 1\n")
+    monkeypatch.syspath_prepend(str(program_directory))
+    transformed_sources = []
+    monkeypatch.setattr(
+        importhook.transform,
+        "transform_source",
+        lambda source_text, _: transformed_sources.append(source_text) or source_text,
+    )
+    bytecode_cache = bytecode.BytecodeCache(tmp_path / "bytecode", 1048576)
+    for _ in range(2):
+        importhook.install(
+            program_directory,
+            [instrumentation.InstrumentationType.FIXTURE],
+            bytecode_cache,
+        )
+        try:
+            import cachedmodule
+        finally:
+            importhook.uninstall()
+            sys.modules.pop("cachedmodule", None)
+        assert cachedmodule.VALUE == 1
+    assert len(transformed_sources) == 1
+
+
+def test_plugin_instruments_modules_that_conftest_imports(tmp_path):
+    """Ensure that the plugin installs the import hook before pytest loads conftest.py."""
+    (tmp_path / "prog").mkdir()
+    (tmp_path / "prog" / "__init__.py").write_text("")
+    (tmp_path / "prog" / "shapes.py").write_text("def area():\n    return 1\n")
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "conftest.py").write_text("from prog import shapes\n")
+    (tmp_path / "tests" / "test_shapes.py").write_text(
+        "from discover_test_coverage import recorder\n"
+        "\n"
+        "\n"
+        "def test_area():\n"
+        '    assert "prog.shapes" in recorder.registered_modules\n'
+    )
+    configuration_file = tmp_path / "discover.json"
+    configuration_file.write_text(
+        json.dumps(
+            {
+                "project_directory": str(tmp_path),
+                "program_directory": "prog",
+                "discover_dir": str(tmp_path / ".discover"),
+                "instrumentation_types": ["function"],
+                constants.importhook.Enabled_Key: True,
+                constants.importhook.Cache_Size_Key: 0,
+            }
+        )
+    )
+    completed_process = subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "discover_test_coverage.plugin"],
+        cwd=tmp_path,
+        env={
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(
+                [str(tmp_path), str(Path(__file__).parent.parent)]
+            ),
+            constants.importhook.Configuration_Variable: str(configuration_file),
+        },
+        capture_output=True,
+        text=True,
+    )
+    assert completed_process.returncode == 0, completed_process.stdout
+
+
+def test_plugin_records_the_code_that_runs_outside_of_the_tests(tmp_path):
+    """Ensure that the plugin records the hits outside of the tests as unattributed."""
+    (tmp_path / "prog").mkdir()
+    (tmp_path / "prog" / "__init__.py").write_text("")
+    (tmp_path / "prog" / "shapes.py").write_text(
+        "def area():\n    return 1\n\n\ndef perimeter():\n    return 4\n"
+    )
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "conftest.py").write_text(
+        "from prog import shapes\n\nshapes.area()\n"
+    )
+    (tmp_path / "tests" / "test_shapes.py").write_text(
+        "from prog import shapes\n\n\ndef test_perimeter():\n"
+        "    assert shapes.perimeter() == 4\n"
+    )
+    configuration_file = tmp_path / "discover.json"
+    configuration_file.write_text(
+        json.dumps(
+            {
+                "project_directory": str(tmp_path),
+                "program_directory": "prog",
+                "discover_dir": str(tmp_path / ".discover"),
+                "instrumentation_types": ["function"],
+                constants.importhook.Enabled_Key: True,
+                constants.importhook.Cache_Size_Key: 0,
+                constants.store.Key: str(tmp_path / "coverage.sqlite"),
+            }
+        )
+    )
+    completed_process = subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "discover_test_coverage.plugin"],
+        cwd=tmp_path,
+        env={
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(
+                [str(tmp_path), str(Path(__file__).parent.parent)]
+            ),
+            constants.importhook.Configuration_Variable: str(configuration_file),
+        },
+        capture_output=True,
+        text=True,
+    )
+    assert completed_process.returncode == 0, completed_process.stdout
+    with store.CoverageStore(tmp_path / "coverage.sqlite") as coverage_store:
+        run_id = coverage_store.find_latest_run()
+        assert coverage_store.find_context_hits(run_id, "<unattributed>") == {
+            "function": {"prog.shapes": ["area"]}
+        }
+        assert coverage_store.find_context_hits(
+            run_id, "tests/test_shapes.py::test_perimeter"
+        ) == {"function": {"prog.shapes": ["perimeter"]}}
@@ -0,0 +1,44 @@
+"""Test cases for the journal module."""
+
+import os
+
+from discover_test_coverage import journal
+
+
+def test_journal_keeps_completed_units_across_crashes(tmp_path):
+    """Ensure that a reopened journal finds the completed units with the same inputs."""
+    journal_file = tmp_path / ".discover" / "journal.jsonl"
+    with journal.Journal(journal_file, compact_interval=2) as unit_journal:
+        unit_journal.record("shard-0", "hash-0", "passed", duration=1.0)
+        unit_journal.record("shard-1", "hash-1", "failed")
+        unit_journal.record("shard-0", "hash-2", "passed")
+    # a crash while appending leaves behind a partial last line
+    with open(journal_file, "a") as journal_lines:
+        journal_lines.write('{"unit": "shard-2", "inpu')
+    with journal.Journal(journal_file) as unit_journal:
+        assert unit_journal.find_completed("shard-0", "hash-0") is None
+        assert unit_journal.find_completed("shard-0", "hash-2")["outcome"] == "passed"
+        assert unit_journal.find_completed("shard-1", "hash-1")["outcome"] == "failed"
+        assert unit_journal.find_completed("shard-2", "hash-3") is None
+    # the compacted journal only keeps the latest entry of each unit
+    assert len(journal_file.read_text().splitlines()) == 2
+    # a journal that does not resume starts over
+    with journal.Journal(journal_file, resume=False) as unit_journal:
+        assert unit_journal.find_completed("shard-1", "hash-1") is None
+    assert journal_file.read_text() == ""
+    assert journal.hash_inputs("a", 1) == journal.hash_inputs("a", 1)
+    assert journal.hash_inputs("a", 1) != journal.hash_inputs("a", 2)
+
+
+def test_write_entries_without_syncing_the_directory(tmp_path, monkeypatch):
+    """Ensure that a platform that cannot open a directory still writes the journal."""
+
+    def open_directory(path, flags):
+        raise PermissionError(path)
+
+    monkeypatch.setattr(os, "open", open_directory)
+    journal_file = tmp_path / "journal.jsonl"
+    journal.write_entries(journal_file, [{"unit": "program/shapes.py::area#0"}])
+    assert journal.read_entries(journal_file) == {
+        "program/shapes.py::area#0": {"unit": "program/shapes.py::area#0"}
+    }
@@ -0,0 +1,101 @@
+"""Test cases for the monitoring module."""
+
+import sys
+
+import pytest
+
+from discover_test_coverage import importhook
+from discover_test_coverage import instrumentation
+from discover_test_coverage import monitoring
+from discover_test_coverage import plugin
+from discover_test_coverage import recorder
+
+SOURCE_CODE = """
+def sign(number):
+    if number > 0:
+        return 1
+    return 0
+
+
+class Shape:
+    def area(self):
+        def square(side):
+            return side * side
+        return square(2)
+"""
+
+
+def test_get_function_name_matches_function_coverage_names():
+    """Ensure that the names of functions match the ones of the function transformer."""
+    namespace: dict = {}
+    exec(compile(SOURCE_CODE, "shapes.py", "exec"), namespace)
+    area_code = namespace["Shape"].area.__code__
+    square_code = next(
+        constant for constant in area_code.co_consts if hasattr(constant, "co_name")
+    )
+    assert monitoring.get_function_name(area_code) == "Shape.area"
+    assert monitoring.get_function_name(square_code) == "Shape.area.square"
+    assert monitoring.get_function_name((lambda: None).__code__) is None
+
+
+@pytest.mark.skipif(not monitoring.is_available(), reason="requires sys.monitoring")
+def test_monitoring_collector_records_functions_and_branches(tmp_path, monkeypatch):
+    """Ensure that the collector records the called functions and the taken branches."""
+    (tmp_path / "monitoredshapes.py").write_text(SOURCE_CODE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    collector = monitoring.MonitoringCollector(
+        tmp_path,
+        [
+            instrumentation.InstrumentationType.FUNCTION,
+            instrumentation.InstrumentationType.BRANCH,
+        ],
+    )
+    collector.start()
+    try:
+        import monitoredshapes
+
+        for number in (1, 0, 1):
+            monitoredshapes.sign(number)
+        collector.take_context("test_sign")
+        monitoredshapes.sign(1)
+        collector.take_context("test_positive_sign")
+    finally:
+        collector.stop()
+        sys.modules.pop("monitoredshapes", None)
+    contexts = collector.record()
+    try:
+        # the restarted events record the coverage of each context separately
+        assert [context_name for context_name, _, _ in contexts] == [
+            "test_sign",
+            "test_positive_sign",
+        ]
+        assert contexts[1][1] == {"monitoredshapes": [0]}
+        assert contexts[1][2] == {"monitoredshapes": [0]}
+        assert recorder.collect()["monitoredshapes"] == {"sign": 1}
+        assert recorder.collect_branches()["monitoredshapes"] == {
+            "sign:3->4": True,
+            "sign:3->5": True,
+        }
+    finally:
+        recorder.registered_modules.pop("monitoredshapes")
+        recorder.registered_branch_modules.pop("monitoredshapes")
+
+
+@pytest.mark.skipif(monitoring.is_available(), reason="requires no sys.monitoring")
+def test_monitoring_backend_falls_back_to_import_hook(tmp_path):
+    """Ensure that an interpreter without sys.monitoring instruments while importing."""
+    configuration = {
+        "backend": instrumentation.CollectionBackend.MONITORING.value,
+        "project_directory": str(tmp_path),
+        "program_directory": "program",
+        "discover_dir": str(tmp_path / ".discover"),
+        "instrumentation_types": ["function"],
+    }
+    try:
+        assert plugin.start_collection(configuration) is None
+        assert any(
+            isinstance(finder, importhook.InstrumentingFinder)
+            for finder in sys.meta_path
+        )
+    finally:
+        importhook.uninstall()
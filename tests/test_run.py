@@ -0,0 +1,97 @@
+"""Test cases for the run module."""
+
+import os
+import shlex
+import sys
+from pathlib import Path
+
+import pytest
+
+from discover_test_coverage import run
+
+
+def create_test_directories(tmp_path):
+    """Create an original and an instrumented test directory."""
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_a.py").write_text("original")
+    (tmp_path / ".tests").mkdir()
+    (tmp_path / ".tests" / "test_a.py").write_text("instrumented")
+
+
+def test_swap_test_directories_and_restore_them(tmp_path):
+    """Ensure that swapping renames the directories and then restores them."""
+    create_test_directories(tmp_path)
+    test_directory_backup = run.prepare_for_coverage_monitoring(tmp_path, "tests", True)
+    assert (tmp_path / "tests" / "test_a.py").read_text() == "instrumented"
+    assert (test_directory_backup / "test_a.py").read_text() == "original"
+    run.finalize_coverage_monitoring(tmp_path / "tests", test_directory_backup, True)
+    # the instrumented tests are kept in the hidden directory for the next run
+    assert (tmp_path / "tests" / "test_a.py").read_text() == "original"
+    assert (tmp_path / ".tests" / "test_a.py").read_text() == "instrumented"
+    assert not test_directory_backup.exists()
+
+
+def test_recover_test_directory_after_interrupted_run(tmp_path):
+    """Ensure that the original tests are restored after a run that crashed."""
+    create_test_directories(tmp_path)
+    run.prepare_for_coverage_monitoring(tmp_path, "tests", True)
+    assert run.recover_test_directory(tmp_path, "tests")
+    assert (tmp_path / "tests" / "test_a.py").read_text() == "original"
+    assert (tmp_path / ".tests" / "test_a.py").read_text() == "instrumented"
+    # there is nothing left to recover
+    assert not run.recover_test_directory(tmp_path, "tests")
+
+
+def test_swap_without_instrumented_tests_keeps_original_tests(tmp_path):
+    """Ensure that a failed swap does not leave the original tests in the backup."""
+    create_test_directories(tmp_path)
+    (tmp_path / ".tests" / "test_a.py").unlink()
+    (tmp_path / ".tests").rmdir()
+    with pytest.raises(OSError):
+        run.prepare_for_coverage_monitoring(tmp_path, "tests", True)
+    assert (tmp_path / "tests" / "test_a.py").read_text() == "original"
+
+
+def test_hidden_mode_never_changes_the_original_tests(tmp_path):
+    """Ensure that the hidden mode runs the tests in the hidden directory."""
+    create_test_directories(tmp_path)
+    run.prepare_for_coverage_monitoring(
+        tmp_path, "tests", True, run.TestDirectoryMode.HIDDEN
+    )
+    assert (tmp_path / "tests" / "test_a.py").read_text() == "original"
+    test_run_command = run.create_hidden_test_run_command(tmp_path, "tests", "pytest")
+    assert test_run_command == f"pytest {tmp_path / '.tests'} --rootdir {tmp_path}"
+
+
+def test_hidden_test_run_command_quotes_paths_with_spaces(tmp_path):
+    """Ensure that the hidden mode's command keeps a project path with spaces intact."""
+    project_directory = tmp_path / "my project"
+    test_run_command = run.create_hidden_test_run_command(
+        project_directory, "tests", "pytest"
+    )
+    assert shlex.split(test_run_command) == [
+        "pytest",
+        str(project_directory / ".tests"),
+        "--rootdir",
+        str(project_directory),
+    ]
+
+
+def test_collect_test_ids_ignores_the_verbosity_of_the_test_command(
+    tmp_path, monkeypatch
+):
+    """Ensure that the tests are collected even when the command and configuration are quiet."""
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_a.py").write_text(
+        "def test_one():\n    pass\n\n\ndef test_two():\n    pass\n"
+    )
+    (tmp_path / "pytest.ini").write_text("[pytest]\naddopts = -q\n")
+    monkeypatch.setenv(
+        "PYTHONPATH",
+        os.pathsep.join([str(Path(run.__file__).parents[1]), *sys.path]),
+    )
+    assert run.collect_test_ids(
+        tmp_path,
+        Path("tests"),
+        f"{sys.executable} -m pytest -q -p no:cacheprovider",
+    ) == ["tests/test_a.py::test_one", "tests/test_a.py::test_two"]
@@ -0,0 +1,17 @@
+"""Test cases for the selection module."""
+
+from pathlib import Path
+
+from discover_test_coverage import selection
+
+
+def test_test_selection_saves_the_tests_in_a_file_while_they_run():
+    """Ensure that the selected tests are passed through a file that is removed afterwards."""
+    test_ids = ["tests/test_a.py::test_one", "tests/test_a.py::test_two[a b]"]
+    with selection.TestSelection(test_ids) as test_selection:
+        selection_file = Path(test_selection.environment["DISCOVER_SELECTION"])
+        assert selection.load_selection(selection_file) == test_ids
+    assert not selection_file.exists()
+    # running all of the tests does not need a file or a variable
+    with selection.TestSelection(None) as test_selection:
+        assert test_selection.environment == {}
@@ -0,0 +1,131 @@
+"""Tests for the server module."""
+
+import asyncio
+import socket
+import threading
+
+from discover_test_coverage import debug
+from discover_test_coverage import liveview
+from discover_test_coverage import server
+
+
+def test_syslog_server_writes_received_messages(tmp_path):
+    """Ensure that the syslog server cleans, counts, and writes the messages it receives."""
+    log_file = tmp_path / "syslog.log"
+
+    async def send_messages():
+        syslog_server = server.SyslogServer(log_file, display=False)
+        address = await syslog_server.start(port=0)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client_socket:
+            for index in range(10):
+                client_socket.sendto(f"<15>message {index}".encode(), address)
+        while syslog_server.counters.received < 10:
+            await asyncio.sleep(0.01)
+        await syslog_server.stop()
+        return syslog_server.counters
+
+    counters = asyncio.run(send_messages())
+    assert (counters.received, counters.dropped, counters.written) == (10, 0, 10)
+    assert log_file.read_text().splitlines() == [f"message {i}" for i in range(10)]
+
+
+def test_syslog_server_writes_without_blocking_the_event_loop(tmp_path):
+    """Ensure that the event loop keeps running while the server writes a batch."""
+    writing = threading.Event()
+    finish_writing = threading.Event()
+    received_while_writing = []
+
+    async def write_slowly():
+        syslog_server = server.SyslogServer(tmp_path / "syslog.log", display=False)
+        log_writer_write = syslog_server.log_writer.write
+
+        def write(messages):
+            writing.set()
+            finish_writing.wait(5)
+            received_while_writing.append(syslog_server.counters.received)
+            log_writer_write(messages)
+
+        syslog_server.log_writer.write = write
+        address = await syslog_server.start(port=0)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client_socket:
+            client_socket.sendto(b"<15>first", address)
+            while not writing.is_set():
+                await asyncio.sleep(0.01)
+            # the datagram arrives while the first batch is still being written
+            client_socket.sendto(b"<15>second", address)
+            while syslog_server.counters.received < 2:
+                await asyncio.sleep(0.01)
+        finish_writing.set()
+        await syslog_server.stop()
+        return syslog_server.counters
+
+    counters = asyncio.run(write_slowly())
+    assert (counters.received, counters.dropped, counters.written) == (2, 0, 2)
+    assert received_while_writing[0] == 2
+    assert (tmp_path / "syslog.log").read_text() == "first\nsecond\n"
+
+
+def test_syslog_protocol_drops_messages_when_queue_is_full():
+    """Ensure that the syslog protocol counts the messages that do not fit in the queue."""
+
+    async def receive_messages():
+        counters = server.SyslogCounters()
+        protocol = server.SyslogProtocol(asyncio.Queue(maxsize=2), counters)
+        for _ in range(5):
+            protocol.datagram_received(b"message", ("127.0.0.1", 0))
+        return counters
+
+    counters = asyncio.run(receive_messages())
+    assert (counters.received, counters.dropped) == (5, 3)
+
+
+def test_rotating_log_writer_rotates_like_rotating_file_handler(tmp_path):
+    """Ensure that the log writer moves a full log file to a single backup."""
+    log_file = tmp_path / "syslog.log"
+    log_writer = server.RotatingLogWriter(log_file, max_bytes=20, backup_count=1)
+    log_writer.write(["first", "second"])
+    log_writer.write(["third", "fourth", "fifth"])
+    log_writer.close()
+    assert (tmp_path / "syslog.log.1").read_text() == "first\nsecond\nthird\n"
+    assert log_file.read_text() == "fourth\nfifth\n"
+    assert not (tmp_path / "syslog.log.2").exists()
+
+
+def test_parse_message_finds_level_from_priority():
+    """Ensure that the level of a message comes from the severity of its priority."""
+    assert server.parse_message(b"<15>debugging\x00") == (
+        debug.DebugLevel.DEBUG,
+        "debugging",
+    )
+    assert server.parse_message(b"<12>careful") == (
+        debug.DebugLevel.WARNING,
+        "careful",
+    )
+    assert server.parse_message(b"<130>failed") == (
+        debug.DebugLevel.CRITICAL,
+        "failed",
+    )
+    assert server.parse_message(b"plain") == (debug.DebugLevel.DEBUG, "plain")
+
+
+def test_live_view_counts_all_messages_and_filters_the_tail():
+    """Ensure that the live view counts every level but only keeps the filtered messages."""
+    view = liveview.LiveView(debug.DebugLevel.WARNING, "disk", tail_size=2)
+    view.add(
+        [
+            (debug.DebugLevel.DEBUG, "disk read"),
+            (debug.DebugLevel.ERROR, "disk full"),
+            (debug.DebugLevel.WARNING, "network slow"),
+            (debug.DebugLevel.WARNING, "disk slow"),
+            (debug.DebugLevel.CRITICAL, "disk gone"),
+        ]
+    )
+    assert view.level_counts[debug.DebugLevel.WARNING] == 2
+    assert view.total == 5
+    assert list(view.tail) == [
+        (debug.DebugLevel.WARNING, "disk slow"),
+        (debug.DebugLevel.CRITICAL, "disk gone"),
+    ]
+    assert view.measure_rate(10.0) == 0.0
+    view.add([(debug.DebugLevel.INFO, "more")] * 5)
+    assert view.measure_rate(10.5) == 10.0
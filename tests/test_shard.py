@@ -0,0 +1,93 @@
+"""Test cases for the shard module."""
+
+import sys
+from array import array
+
+from discover_test_coverage import run
+from discover_test_coverage import shard
+from discover_test_coverage import store
+
+
+def test_balance_tests_uses_recorded_durations():
+    """Ensure that the longest tests are spread across the shards."""
+    test_ids = ["test_a", "test_b", "test_c", "test_d", "test_new"]
+    durations = {"test_a": 8.0, "test_b": 1.0, "test_c": 7.0, "test_d": 2.0}
+    shards = shard.balance_tests(test_ids, durations, 2)
+    # the new test is assumed to take the average time of the other tests
+    assert shards == [["test_a", "test_b", "test_d"], ["test_c", "test_new"]]
+    # there are never more shards than there are tests
+    assert shard.balance_tests(["test_a"], {}, 4) == [["test_a"]]
+
+
+def test_merge_shard_coverage_combines_the_shards(tmp_path):
+    """Ensure that the coverage of the shards is merged into a single run."""
+    shard_directories = [shard.get_shard_directory(tmp_path, index) for index in (0, 1)]
+    for index, shard_directory in enumerate(shard_directories):
+        with store.CoverageStore(shard_directory / "coverage.sqlite") as shard_store:
+            shard_store.add_run(
+                {"shapes": (("area", "perimeter"), array("Q", [index + 1, index]))},
+                {
+                    "shapes": (
+                        ("area:if#0:true", "area:if#0:false"),
+                        bytearray([index, 0]),
+                    )
+                },
+                contexts=[(f"test_{index}", {"shapes": [0]}, {})],
+                durations={f"test_{index}": index + 0.5},
+            )
+    run_id = shard.merge_shard_coverage(tmp_path, shard_directories)
+    with store.CoverageStore(tmp_path / "coverage.sqlite") as coverage_store:
+        assert store.export_report(coverage_store, run_id) == {
+            "function_coverage": {"shapes": {"area": 3, "perimeter": 1}},
+            "branch_coverage": {
+                "shapes": {"area:if#0:true": True, "area:if#0:false": False}
+            },
+        }
+        assert coverage_store.list_contexts(run_id) == ["test_0", "test_1"]
+        assert coverage_store.find_latest_durations() == {"test_0": 0.5, "test_1": 1.5}
+
+
+def test_run_test_shards_runs_every_shard(tmp_path):
+    """Ensure that every shard runs with its own environment and log file."""
+    test_shards = [
+        ([f"shard{index}"], {"SHARD_NAME": f"shard{index}"}, tmp_path / f"{index}.log")
+        for index in range(3)
+    ]
+    run.run_test_shards(
+        tmp_path,
+        tmp_path / "tests",
+        f"{sys.executable} -c 'import os, sys; print(os.environ[\"SHARD_NAME\"], sys.argv)'",
+        False,
+        run.TestDirectoryMode.SWAP,
+        test_shards,
+    )
+    for index in range(3):
+        assert (tmp_path / f"{index}.log").read_text().startswith(f"shard{index}")
+
+
+def test_merge_shard_coverage_merges_modules_with_different_layouts(tmp_path):
+    """Ensure that the shards whose modules have different probes are merged by name."""
+    shard_directories = [shard.get_shard_directory(tmp_path, index) for index in (0, 1)]
+    layouts = [("area", "perimeter"), ("area", "volume", "perimeter")]
+    for index, shard_directory in enumerate(shard_directories):
+        with store.CoverageStore(shard_directory / "coverage.sqlite") as shard_store:
+            shard_store.add_run(
+                {"shapes": (layouts[index], array("Q", [1] * len(layouts[index])))},
+                {},
+                contexts=[
+                    (f"test_{index}", {"shapes": [len(layouts[index]) - 1]}, {}),
+                    ("<unattributed>", {"shapes": [0]}, {}),
+                ],
+            )
+    run_id = shard.merge_shard_coverage(tmp_path, shard_directories)
+    with store.CoverageStore(tmp_path / "coverage.sqlite") as coverage_store:
+        assert store.export_report(coverage_store, run_id)["function_coverage"] == {
+            "shapes": {"area": 2, "perimeter": 2, "volume": 1}
+        }
+        # the positions of the second shard's contexts refer to the merged layout
+        assert coverage_store.find_context_hits(run_id, "test_1") == {
+            "function": {"shapes": ["perimeter"]}
+        }
+        assert coverage_store.find_context_hits(run_id, "<unattributed>") == {
+            "function": {"shapes": ["area"]}
+        }
@@ -0,0 +1,95 @@
+"""Test cases for the store and bitset modules."""
+
+from array import array
+
+from discover_test_coverage import bitset
+from discover_test_coverage import recorder
+from discover_test_coverage import store
+
+
+def test_bitset_pack_and_unpack_round_trip():
+    """Ensure that packing flags into a bitset and unpacking it keeps the flags."""
+    flags = [True, False, False, True, True, False, False, False, True]
+    packed = bitset.pack(flags)
+    assert packed == bytes([0b00011001, 0b00000001])
+    assert bitset.unpack(packed, len(flags)) == flags
+    assert bitset.count(packed) == 4
+    assert bitset.pack([]) == b""
+
+
+def test_coverage_store_appends_runs_and_converts_reports(tmp_path):
+    """Ensure that runs are appended and can be converted to and from JSON reports."""
+    function_modules = {"shapes": (("area", "perimeter"), array("Q", [3, 0]))}
+    branch_modules = {
+        "shapes": (("area:if#0:true", "area:if#0:false"), bytearray(b"\x01\x00"))
+    }
+    with store.CoverageStore(tmp_path / "coverage.sqlite") as coverage_store:
+        first_run_id = coverage_store.add_run(function_modules, branch_modules, "first")
+        function_modules["shapes"][1][1] = 1
+        second_run_id = coverage_store.add_run(function_modules, {}, "second")
+        coverage_report = store.export_report(coverage_store, first_run_id)
+        assert coverage_report == {
+            "function_coverage": {"shapes": {"area": 3, "perimeter": 0}},
+            "branch_coverage": {
+                "shapes": {"area:if#0:true": True, "area:if#0:false": False}
+            },
+        }
+        # the two runs share the interned layout of the module's functions
+        assert coverage_store.connection.execute(
+            "SELECT COUNT(*) FROM layouts"
+        ).fetchone() == (2,)
+        assert coverage_store.find_covering_runs("perimeter") == [second_run_id]
+        assert coverage_store.find_latest_run() == second_run_id
+    # a report that is imported again exports the same report
+    with store.CoverageStore(tmp_path / "other.sqlite") as coverage_store:
+        run_id = store.import_report(coverage_store, coverage_report)
+        assert store.export_report(coverage_store, run_id) == coverage_report
+
+
+def test_encode_positions_stores_runs_of_positions():
+    """Ensure that positions are encoded as runs that take space for each run."""
+    positions = [0, 1, 2, 3, 10, 500, 501]
+    encoded = bitset.encode_positions(positions)
+    assert bitset.decode_positions(encoded) == positions
+    assert bitset.decode_positions(bitset.encode_positions([])) == []
+    # a long run of positions takes the same space as a short one
+    assert len(bitset.encode_positions(range(100_000))) <= 6
+
+
+def test_coverage_store_finds_the_hits_of_contexts(tmp_path):
+    """Ensure that the hits of each taken context are stored and found by name."""
+    hits = recorder.register("contextshapes", ("area", "perimeter", "volume"))
+    try:
+        hits[0] += 1
+        first_context = recorder.take_context()
+        hits[0] += 2
+        hits[2] += 1
+        second_context = recorder.take_context()
+        assert first_context == ({"contextshapes": [0]}, {})
+        assert second_context == ({"contextshapes": [0, 2]}, {})
+        # the hits of the contexts that were taken still count towards the run
+        assert recorder.collect()["contextshapes"] == {
+            "area": 3,
+            "perimeter": 0,
+            "volume": 1,
+        }
+        with store.CoverageStore(tmp_path / "coverage.sqlite") as coverage_store:
+            run_id = coverage_store.add_run(
+                recorder.get_function_totals(),
+                {},
+                contexts=[
+                    ("test_area", *first_context),
+                    ("test_volume", *second_context),
+                ],
+            )
+            assert coverage_store.list_contexts(run_id) == ["test_area", "test_volume"]
+            assert coverage_store.find_context_hits(run_id, "test_volume") == {
+                "function": {"contextshapes": ["area", "volume"]}
+            }
+            assert coverage_store.find_covering_contexts(run_id, "area") == [
+                "test_area",
+                "test_volume",
+            ]
+    finally:
+        recorder.registered_modules.pop("contextshapes")
+        recorder.accumulated_modules.pop("contextshapes", None)
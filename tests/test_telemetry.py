@@ -0,0 +1,93 @@
+"""Tests for the telemetry module."""
+
+import asyncio
+import socket
+
+import pytest
+
+from discover_test_coverage import telemetry
+
+
+def test_decode_frames_keeps_partial_frame_in_buffer():
+    """Ensure that the frames are decoded once all of their parts arrive."""
+    frames = telemetry.encode_test_start("tests/test_a.py::test_a") + (
+        telemetry.encode_probe_hits(
+            telemetry.EventType.FUNCTION_HITS, "program.shapes", [0, 3, 7]
+        )
+    )
+    buffer = bytearray(frames[:-5])
+    events = telemetry.decode_frames(buffer)
+    assert events == [(telemetry.EventType.TEST_START, b"tests/test_a.py::test_a")]
+    buffer += frames[-5:]
+    [(event_type, payload)] = telemetry.decode_frames(buffer)
+    assert event_type == telemetry.EventType.FUNCTION_HITS
+    module_name, positions = telemetry.decode_probe_hits(payload)
+    assert (module_name, list(positions)) == ("program.shapes", [0, 3, 7])
+    assert len(buffer) == 0
+
+
+def test_sender_delivers_batched_events_to_aggregate(tmp_path):
+    """Ensure that the events that the sender queues reach the receiver's aggregate."""
+    socket_path = tmp_path / "telemetry.sock"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as receiver_socket:
+        receiver_socket.bind(str(socket_path))
+        receiver_socket.listen()
+        with telemetry.TelemetrySender(socket_path, flush_interval=0.01) as sender:
+            sender.send(telemetry.encode_test_start("test_a"))
+            sender.send(
+                telemetry.encode_probe_hits(
+                    telemetry.EventType.BRANCH_HITS, "program.shapes", [1, 2]
+                )
+            )
+            sender.send(telemetry.encode_test_end("test_a", 0.25))
+        connection, _ = receiver_socket.accept()
+        buffer = bytearray()
+        with connection:
+            while data := connection.recv(4096):
+                buffer += data
+    aggregate = telemetry.TelemetryAggregate()
+    for event_type, payload in telemetry.decode_frames(buffer):
+        aggregate.add(event_type, payload)
+    assert sender.dropped == 0
+    assert aggregate.event_count == 3
+    assert aggregate.finished_count == 1
+    assert aggregate.running == {}
+    assert aggregate.slowest == ("test_a", 0.25)
+    assert aggregate.branch_hits == {"program.shapes": {1, 2}}
+
+
+def test_connect_sender_without_receiver_returns_none(tmp_path):
+    """Ensure that a test suite without a receiver runs without a sender."""
+    assert telemetry.connect_sender(None) is None
+    assert telemetry.connect_sender(str(tmp_path / "missing.sock")) is None
+
+
+def test_serve_telemetry_only_removes_sockets(tmp_path):
+    """Ensure that the receiver replaces a stale socket but never removes another file."""
+    socket_path = tmp_path / "telemetry.sock"
+    # a socket that an earlier receiver left behind stays after it is closed
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale_socket:
+        stale_socket.bind(str(socket_path))
+
+    async def serve_briefly():
+        receiver_task = asyncio.create_task(
+            telemetry.serve_telemetry(socket_path, telemetry.TelemetryAggregate())
+        )
+        # the receiver is listening once a client can connect to its socket
+        while not receiver_task.done():
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client_socket:
+                if client_socket.connect_ex(str(socket_path)) == 0:
+                    break
+            await asyncio.sleep(0.01)
+        receiver_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await receiver_task
+
+    asyncio.run(serve_briefly())
+    assert not socket_path.exists()
+    socket_path.write_text("not a socket")
+    with pytest.raises(OSError):
+        asyncio.run(
+            telemetry.serve_telemetry(socket_path, telemetry.TelemetryAggregate())
+        )
+    assert socket_path.read_text() == "not a socket"
@@ -0,0 +1,73 @@
+"""Test cases for the testfixtures module."""
+
+import libcst as cst
+import pytest
+
+from discover_test_coverage import codegenerator
+from discover_test_coverage.transformers import testfixtures
+
+# source code of modules that the tokenizer can instrument
+COMMON_SOURCE_CODE = [
+    '"""Doc."""\nimport os\n',
+    '"""Doc."""\n',
+    '"""Doc.\n\nMore."""\n\n\ndef f():\n    pass\n',
+    '"""Doc."""\n\n\n# comment\nimport os\n',
+    '#!/usr/bin/env python\n"""Doc."""\n\nimport os\n',
+    '# c\n"""Doc."""  # trailing\nx = 1\n',
+    '\n"""Doc."""\nimport os\n',
+    '    \n"""Doc."""\n',
+    "r'''Raw.'''\nx = 1\n",
+    'b"bytes"\nx = 1\n',
+    "import os\n",
+    "import os",
+    "# c1\n\n# c2\nimport os\n",
+    "if True:\n    pass\n",
+    '"""Doc."""; x = 1\n',
+    '"a" "b"\nx = 1\n',
+    'f"doc"\n',
+    '"""Doc.""".strip()\n',
+]
+
+# source code of modules that only libcst can instrument
+UNUSUAL_SOURCE_CODE = [
+    "",
+    "\n\n",
+    "# only comment\n",
+    '"""Doc."""',
+    "'''Doc.'''\r\nimport os\r\n",
+    '\ufeff"""Doc."""\n',
+    '(\n"""Doc."""\n)\nx = 1\n',
+    '"""Doc."""\\\n\nx = 1\n',
+    '# -*- coding: latin-1 -*-\n"""Doc."""\n',
+]
+
+
+@pytest.fixture(autouse=True)
+def fixed_discover_comment(monkeypatch):
+    """Use a generated comment that does not depend on the current time."""
+    monkeypatch.setattr(
+        codegenerator,
+        "get_discover_comment_code",
+        lambda name: f"# discover-test-coverage instrumentation by {name}\n",
+    )
+
+
+def transform_using_libcst(source_text: str) -> str:
+    """Add the test fixture import to source code using the TestFixtureTransformer."""
+    source_tree = cst.parse_module(source_text)
+    transformer = testfixtures.TestFixtureTransformer(source_tree.config_for_parsing)
+    return source_tree.visit(transformer).code
+
+
+@pytest.mark.parametrize("source_text", COMMON_SOURCE_CODE)
+def test_insert_fixture_import_matches_transformer(source_text):
+    """Ensure that the tokenizer creates exactly the same code as the transformer."""
+    instrumented_source_text = testfixtures.insert_fixture_import(source_text)
+    assert instrumented_source_text is not None
+    assert instrumented_source_text == transform_using_libcst(source_text)
+
+
+@pytest.mark.parametrize("source_text", UNUSUAL_SOURCE_CODE)
+def test_insert_fixture_import_falls_back_for_unusual_layouts(source_text):
+    """Ensure that the tokenizer does not instrument modules with unusual layouts."""
+    assert testfixtures.insert_fixture_import(source_text) is None
@@ -0,0 +1,96 @@
+"""Test cases for the timing module."""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from discover_test_coverage import plugin
+from discover_test_coverage import run
+from discover_test_coverage import timing
+
+TEST_CODE = """def test_fast():
+    assert True
+
+
+def test_also_fast():
+    assert True
+"""
+
+
+def test_timeouts_derive_from_the_baseline_durations():
+    """Ensure that the timeouts use a multiplier of the baseline and a floor."""
+    durations = {"test_a": 20.0, "test_b": 0.1}
+    assert timing.compute_test_timeout(20.0) == 60.0
+    assert timing.compute_test_timeout(0.1) == 5.0
+    assert timing.compute_run_timeout({}) is None
+    assert timing.compute_run_timeout(durations, ["test_b"]) == 30.0
+    # the new test is assumed to take the average time of the other tests
+    assert timing.compute_run_timeout(durations, ["test_a", "test_new"]) == 120.0
+
+
+def test_run_process_group_stops_the_whole_group():
+    """Ensure that a run that times out is stopped along with its children."""
+    start_time = time.perf_counter()
+    assert run.run_process_group("sleep 30 & sleep 30", 0.5) is None
+    assert time.perf_counter() - start_time < 10
+    # the plugin exits with a special exit code when a test timed out
+    assert run.run_process_group("exit 124", None) is None
+    assert run.run_process_group("exit 1", None) == 1
+
+
+def test_run_process_group_stops_the_process_without_process_groups(monkeypatch):
+    """Ensure that a run that times out stops even where there are no process groups."""
+    monkeypatch.delattr(os, "killpg")
+    start_time = time.perf_counter()
+    assert run.run_process_group("sleep 30", 0.5) is None
+    assert time.perf_counter() - start_time < 10
+
+
+def test_baseline_run_records_the_duration_of_each_test(tmp_path, monkeypatch):
+    """Ensure that the plugin records the durations of the tests in a baseline run."""
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_fast.py").write_text(TEST_CODE)
+    timings_file = tmp_path / ".discover" / "timings.json"
+    timing.save_timings(timings_file, {"tests/test_fast.py::test_gone": 1.0})
+    monkeypatch.setenv(
+        "PYTHONPATH",
+        os.pathsep.join([str(Path(timing.__file__).parents[1]), *sys.path]),
+    )
+    return_codes = run.run_test_suite_with_optional_coverage(
+        tmp_path,
+        Path("tests"),
+        f"{sys.executable} -m pytest -q -p no:cacheprovider "
+        "-p discover_test_coverage.plugin",
+        test_ids=["tests/test_fast.py::test_fast"],
+        timings_file=timings_file,
+        record_timings=True,
+    )
+    assert return_codes == [0]
+    # the durations of the tests that did not run are kept
+    assert set(timing.load_timings(timings_file)) == {
+        "tests/test_fast.py::test_gone",
+        "tests/test_fast.py::test_fast",
+    }
+
+
+def test_timed_out_baseline_run_saves_the_finished_durations(tmp_path, monkeypatch):
+    """Ensure that a baseline run that stops on a timeout still records its durations."""
+    timings_file = tmp_path / "timings.json"
+    timing.save_timings(timings_file, {"tests/test_fast.py::test_gone": 1.0})
+    monkeypatch.setattr(plugin, "timings_file", timings_file)
+    monkeypatch.setattr(plugin, "durations", {"tests/test_fast.py::test_fast": 0.5})
+
+    def exit_process(exit_code):
+        raise SystemExit(exit_code)
+
+    monkeypatch.setattr(os, "_exit", exit_process)
+    with pytest.raises(SystemExit) as exit_information:
+        plugin.stop_test_suite("tests/test_fast.py::test_hung")
+    assert exit_information.value.code == 124
+    assert timing.load_timings(timings_file) == {
+        "tests/test_fast.py::test_gone": 1.0,
+        "tests/test_fast.py::test_fast": 0.5,
+    }
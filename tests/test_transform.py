@@ -0,0 +1,148 @@
+"""Test cases for the transform module."""
+
+from pathlib import Path
+
+import libcst as cst
+
+from discover_test_coverage import constants
+from discover_test_coverage import file
+from discover_test_coverage import instrumentation
+from discover_test_coverage import manifest
+from discover_test_coverage import transform
+from discover_test_coverage.transformers import composite
+
+
+def create_test_files(directory: Path) -> None:
+    """Create a directory of test files with and without docstrings."""
+    directory.mkdir(parents=True)
+    for index in range(6):
+        # alternate between test files with and without a docstring
+        docstring = f'"""Test number {index}."""\n\n' if index % 2 == 0 else ""
+        (directory / f"test_module{index}.py").write_text(docstring + "import pytest\n")
+
+
+def read_without_discover_comments(directory: Path) -> str:
+    """Read all of the files in a directory, ignoring the time-stamped comments."""
+    lines = []
+    for python_file in file.find_python_files(directory):
+        for line in python_file.read_text().splitlines():
+            if not line.startswith(constants.code.Discover_Comment):
+                lines.append(line)
+    return constants.markers.Newline.join(lines)
+
+
+def test_transform_files_in_process_pool_matches_single_process(tmp_path):
+    """Ensure that instrumenting with a pool of processes produces the same files."""
+    project_directory = tmp_path / "project"
+    create_test_files(project_directory / "tests")
+    hidden_directory = project_directory / ".tests"
+    # instrument the files using a single process
+    transformed_count = transform.transform_files_using_libcst(
+        project_directory,
+        Path("tests"),
+        [instrumentation.InstrumentationType.FIXTURE],
+        file.find_python_files,
+    )
+    single_process_text = read_without_discover_comments(hidden_directory)
+    # instrument the files using a pool of processes with few files in flight
+    transformed_count_pool = transform.transform_files_using_libcst(
+        project_directory,
+        Path("tests"),
+        [instrumentation.InstrumentationType.FIXTURE],
+        file.find_python_files,
+        jobs=2,
+    )
+    process_pool_text = read_without_discover_comments(hidden_directory)
+    assert transformed_count == transformed_count_pool == 6
+    assert "from libdtc.testfixture import *" in single_process_text
+    assert single_process_text == process_pool_text
+
+
+def test_incremental_transform_only_finds_changed_files(tmp_path):
+    """Ensure that an incremental run only needs to instrument the changed files."""
+    project_directory = tmp_path / "project"
+    create_test_files(project_directory / "tests")
+    hidden_directory = project_directory / ".tests"
+    transform.transform_files_using_libcst(
+        project_directory,
+        Path("tests"),
+        [instrumentation.InstrumentationType.FIXTURE],
+        file.find_python_files,
+        incremental=True,
+    )
+    program_files_list = file.find_python_files(project_directory / "tests")
+    # nothing changed since the files were instrumented
+    changed_files_list, _ = manifest.find_changed_files(
+        manifest.load_manifest(hidden_directory),
+        hidden_directory,
+        project_directory / "tests",
+        program_files_list,
+        instrumentation.InstrumentationType.FIXTURE.value,
+        manifest.compute_transformer_version(),
+    )
+    assert changed_files_list == []
+    # change one of the files and then delete another one
+    program_files_list[0].write_text("import os\n")
+    program_files_list[-1].unlink()
+    transform.transform_files_using_libcst(
+        project_directory,
+        Path("tests"),
+        [instrumentation.InstrumentationType.FIXTURE],
+        file.find_python_files,
+        incremental=True,
+    )
+    # the changed file was instrumented again and the deleted file was removed
+    assert "import os" in (hidden_directory / program_files_list[0].name).read_text()
+    assert not (hidden_directory / program_files_list[-1].name).exists()
+    program_manifest = manifest.load_manifest(hidden_directory)
+    assert len(program_manifest[instrumentation.InstrumentationType.FIXTURE.value]) == 5
+
+
+def test_manifest_keeps_entries_of_kinds_that_write_same_path(tmp_path):
+    """Ensure that a file another kind overwrote is no longer current for the first kind."""
+    hidden_file = tmp_path / "conftest.py"
+    fixture_entry = manifest.create_manifest_entry("a", "fixture", "1")
+    transfer_entry = manifest.create_manifest_entry("b", "transfer", "1")
+    program_manifest: manifest.ManifestType = {}
+    hidden_file.write_text("# fixture\n")
+    manifest.record_entry(program_manifest, tmp_path, "conftest.py", fixture_entry)
+    hidden_file.write_text("# transferred conftest\n")
+    manifest.record_entry(program_manifest, tmp_path, "conftest.py", transfer_entry)
+    assert set(program_manifest) == {"fixture", "transfer"}
+    assert not manifest.is_entry_current(
+        program_manifest, tmp_path, "conftest.py", fixture_entry
+    )
+    assert manifest.is_entry_current(
+        program_manifest, tmp_path, "conftest.py", transfer_entry
+    )
+    # the stale fixture entry does not delete the file that the transfer wrote
+    manifest.remove_stale_entries(program_manifest, tmp_path, "fixture", [])
+    assert hidden_file.exists()
+
+
+class SuffixTransformer(cst.CSTTransformer):
+    """Add a suffix to every name, optionally skipping the body of functions."""
+
+    def __init__(self, suffix: str, skip_functions: bool = False):
+        """Construct a SuffixTransformer with a suffix."""
+        self.suffix = suffix
+        self.skip_functions = skip_functions
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> bool:
+        """Skip the children of functions when requested."""
+        return not self.skip_functions
+
+    def leave_Name(self, original_node: cst.Name, updated_node: cst.Name) -> cst.Name:
+        """Add the suffix to the name."""
+        return updated_node.with_changes(value=updated_node.value + self.suffix)
+
+
+def test_composite_transformer_orders_and_skips_transformers():
+    """Ensure that a composite transformer follows its ordering and skipping rules."""
+    source_tree = cst.parse_module("y\ndef f():\n    x\n")
+    composite_transformer = composite.CompositeTransformer(
+        [SuffixTransformer("_c", skip_functions=True), SuffixTransformer("_a")]
+    )
+    modified_tree = source_tree.visit(composite_transformer)
+    # the first transformer leaves each node last and does not see function bodies
+    assert modified_tree.code == "y_a_c\ndef f_a():\n    x_a\n"